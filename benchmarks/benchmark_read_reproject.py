@@ -0,0 +1,66 @@
+"""
+Benchmark of `read.read_reproject` on a (time, band, y, x) stack: one warp for the whole stack against one warp per 2D
+slice (the previous implementation).
+
+    python benchmarks/benchmark_read_reproject.py --time 12 --bands 13 --size 1024 --num-threads 1 4 --resampling nearest
+"""
+import argparse
+import itertools
+import time
+import numpy as np
+import rasterio
+import rasterio.warp
+from georeader import read
+from georeader.geotensor import GeoTensor
+
+
+def reproject_per_slice(data:GeoTensor, data_like:GeoTensor,
+                        resampling:rasterio.warp.Resampling) -> np.ndarray:
+    """ One `rasterio.warp.reproject` call per 2D slice """
+    destination = np.zeros(data.shape[:-2] + data_like.shape[-2:], dtype=data.dtype)
+    for idx in itertools.product(*[range(s) for s in data.shape[:-2]]):
+        rasterio.warp.reproject(data.values[idx], destination[idx], src_transform=data.transform, src_crs=data.crs,
+                                dst_transform=data_like.transform, dst_crs=data_like.crs,
+                                src_nodata=data.fill_value_default, dst_nodata=data.fill_value_default,
+                                resampling=resampling)
+    return destination
+
+
+def best_time(fun, repeat:int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fun()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--time", type=int, default=6)
+    parser.add_argument("--bands", type=int, default=13)
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--num-threads", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--resampling", default="cubic_spline", choices=[r.name for r in rasterio.warp.Resampling])
+    args = parser.parse_args()
+
+    values = np.random.default_rng(0).integers(1, 10_000, size=(args.time, args.bands, args.size, args.size))
+    data = GeoTensor(values.astype(np.float32), transform=rasterio.Affine(10, 0, 500_000, 0, -10, 4_500_000),
+                     crs="EPSG:32630", fill_value_default=0)
+    transform_like, width, height = rasterio.warp.calculate_default_transform(data.crs, "EPSG:4326", args.size,
+                                                                              args.size, *data.bounds)
+    data_like = GeoTensor(np.zeros((height, width), dtype=np.float32), transform=transform_like, crs="EPSG:4326")
+    resampling = rasterio.warp.Resampling[args.resampling]
+
+    print(f"Input {data.shape} {data.dtype} -> output {data.shape[:-2] + data_like.shape[-2:]}")
+    t_loop = best_time(lambda: reproject_per_slice(data, data_like, resampling), args.repeat)
+    print(f"{'per 2D slice':<28} {t_loop:8.3f}s")
+    for num_threads in args.num_threads:
+        t = best_time(lambda: read.read_reproject_like(data, data_like, resampling=resampling,
+                                                       num_threads=num_threads), args.repeat)
+        print(f"{f'single call num_threads={num_threads}':<28} {t:8.3f}s  x{t_loop / t:.2f}")
+
+
+if __name__ == "__main__":
+    main()
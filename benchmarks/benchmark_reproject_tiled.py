@@ -0,0 +1,56 @@
+"""
+Scaling of `reproject_tiled.read_reproject_tiled` with the number of workers: reprojects a synthetic Sentinel-2 like
+scene (10m, UTM 30N) to UTM 31N at 10m.
+
+    python benchmarks/benchmark_reproject_tiled.py --size 10980 --bands 4 --num-workers 1 8 16 32
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import rasterio
+import rasterio.warp
+from georeader import reproject_tiled, rasterio_reader
+
+
+def create_scene(path:str, size:int, bands:int) -> None:
+    profile = {"driver": "GTiff", "height": size, "width": size, "count": bands, "dtype": "uint16",
+               "crs": "EPSG:32630", "transform": rasterio.Affine(10, 0, 699960, 0, -10, 4500000), "nodata": 0,
+               "tiled": True, "blockxsize": 512, "blockysize": 512, "compress": "lzw"}
+    rng = np.random.default_rng(0)
+    with rasterio.open(path, "w", **profile) as dst:
+        for band in range(1, bands + 1):
+            dst.write(rng.integers(1, 10_000, size=(size, size), dtype=np.uint16), band)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=4096)
+    parser.add_argument("--bands", type=int, default=4)
+    parser.add_argument("--tile-size", type=int, default=1024)
+    parser.add_argument("--executor", default="thread", choices=["thread", "process"])
+    parser.add_argument("--num-workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count()])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "scene.tif")
+        create_scene(path, args.size, args.bands)
+        reader = rasterio_reader.RasterioReader(path)
+        bounds = rasterio.warp.transform_bounds(reader.crs, "EPSG:32631", *reader.bounds)
+
+        print(f"Scene {reader.shape} -> EPSG:32631 10m, tiles of {args.tile_size}, {os.cpu_count()} cpus")
+        time_1 = None
+        for num_workers in sorted(set(args.num_workers)):
+            start = time.perf_counter()
+            reproject_tiled.read_reproject_tiled(reader, dst_crs="EPSG:32631", bounds=bounds,
+                                                 resolution_dst_crs=10,
+                                                 tile_size=(args.tile_size, args.tile_size),
+                                                 num_workers=num_workers, executor=args.executor)
+            elapsed = time.perf_counter() - start
+            time_1 = elapsed if time_1 is None else time_1
+            print(f"num_workers={num_workers:<4} {elapsed:8.2f}s  speedup x{time_1 / elapsed:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Throughput of `read.read_reproject_like` reprojecting many rasters on the same grid onto a fixed destination grid:
+fresh GDAL warps (`cache_plan=False`) against a cached `ReprojectionPlan` (`cache_plan=True`).
+
+    python benchmarks/benchmark_reprojection_plan.py --rasters 100 --bands 4 --size 512 --resampling bilinear
+"""
+import argparse
+import time
+import numpy as np
+import rasterio
+import rasterio.warp
+from georeader import read, reprojection_plan
+from georeader.geotensor import GeoTensor
+
+
+def throughput(rasters, data_like:GeoTensor, resampling:rasterio.warp.Resampling, cache_plan:bool) -> float:
+    """ Rasters reprojected per second """
+    start = time.perf_counter()
+    for data in rasters:
+        read.read_reproject_like(data, data_like, resampling=resampling, cache_plan=cache_plan)
+    return len(rasters) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rasters", type=int, default=50)
+    parser.add_argument("--bands", type=int, default=4)
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--resampling", default="bilinear", choices=["nearest", "bilinear"])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    transform = rasterio.Affine(10, 0, 500_000, 0, -10, 4_500_000)
+    rasters = [GeoTensor(rng.integers(1, 10_000, size=(args.bands, args.size, args.size)).astype(np.uint16),
+                         transform=transform, crs="EPSG:32630", fill_value_default=0)
+               for _ in range(args.rasters)]
+    bounds = rasterio.transform.array_bounds(args.size, args.size, transform)
+    transform_like, width, height = rasterio.warp.calculate_default_transform("EPSG:32630", "EPSG:4326",
+                                                                              args.size, args.size, *bounds)
+    data_like = GeoTensor(np.zeros((height, width), dtype=np.uint16), transform=transform_like, crs="EPSG:4326")
+    resampling = rasterio.warp.Resampling[args.resampling]
+
+    print(f"{args.rasters} rasters {rasters[0].shape} -> {data_like.shape} {args.resampling}")
+    t_gdal = throughput(rasters, data_like, resampling, cache_plan=False)
+    print(f"{'GDAL warp':<28} {t_gdal:8.1f} rasters/s")
+
+    reprojection_plan.clear_cache()
+    start = time.perf_counter()
+    read.read_reproject_like(rasters[0], data_like, resampling=resampling, cache_plan=True)
+    print(f"{'plan creation':<28} {time.perf_counter() - start:8.3f}s")
+    t_plan = throughput(rasters, data_like, resampling, cache_plan=True)
+    print(f"{'cached ReprojectionPlan':<28} {t_plan:8.1f} rasters/s  x{t_plan / t_gdal:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Bounded pools of workers for the functions that process a list of windows in parallel
+(`reproject_tiled.read_reproject_tiled` and `mosaic.spatial_mosaic`).
+
+`imap_bounded` keeps at most `2 * num_workers` items in flight, so the results that are waiting to be consumed do not
+pile up in memory. Process pools use the "spawn" start method (forking a process that has initialized GDAL is not
+safe) and send the shared state (e.g. the readers) once per worker with an `initializer`.
+"""
+import multiprocessing
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Iterator, Optional, Sequence, Tuple, TypeVar
+from georeader import tracing
+
+T = TypeVar("T")
+
+
+def imap_bounded(fn:Callable[[T], Any], items:Sequence[T], num_workers:int=1, executor:str="thread",
+                 ordered:bool=True, fn_process:Optional[Callable[..., Any]]=None,
+                 args_process:Optional[Callable[[T], Tuple]]=None,
+                 initializer:Optional[Callable[..., None]]=None, initargs:Tuple=(),
+                 thread_name_prefix:str="georeader") -> Iterator[Tuple[T, Any]]:
+    """
+    Yields `(item, fn(item))` for the `items` computed sequentially or in a pool of `num_workers`.
+
+    Args:
+        fn: function called with each item (sequentially or in the pool of threads).
+        items: items to process.
+        num_workers: number of workers. With 1 (or a single item) the items are processed sequentially.
+        executor: "thread" or "process".
+        ordered: if `True` the results are yielded in the order of `items` otherwise as soon as they are computed.
+        fn_process: picklable function (defined at module level) called in the worker processes as
+            `fn_process(*args_process(item))`. Required with `executor="process"`.
+        args_process: arguments of `fn_process` for each item. Defaults to `(item,)`.
+        initializer: function called once in each worker process with `initargs` (e.g. to set the readers in a
+            global of the module).
+        initargs: arguments of `initializer`.
+        thread_name_prefix: prefix of the names of the threads.
+
+    Returns:
+        Iterator of `(item, result)`. If it is not consumed completely the pending items are cancelled when it is
+        closed.
+    """
+    assert num_workers >= 1, f"num_workers must be greater or equal than 1 found {num_workers}"
+    assert executor in ["thread", "process"], f"executor must be 'thread' or 'process' found {executor}"
+    if (num_workers == 1) or (len(items) <= 1):
+        for item in items:
+            yield item, fn(item)
+        return
+
+    pool: Executor
+    if executor == "thread":
+        pool = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix=thread_name_prefix)
+        fn_bound = tracing.bind(fn)
+        submit: Callable[[T], Future] = lambda item: pool.submit(fn_bound, item)
+    else:
+        assert fn_process is not None, "fn_process is required with executor='process'"
+        if args_process is None:
+            args_process = lambda item: (item,)
+        pool = ProcessPoolExecutor(max_workers=num_workers, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=initializer, initargs=initargs)
+        submit = lambda item: pool.submit(fn_process, *args_process(item))
+
+    max_pending = 2 * num_workers
+    items_iter = iter(items)
+    pending: Deque[Tuple[Future, T]] = deque()
+    try:
+        for item in items_iter:
+            pending.append((submit(item), item))
+            if len(pending) >= max_pending:
+                break
+
+        while len(pending) > 0:
+            if ordered:
+                future, item = pending.popleft()
+            else:
+                done, _ = wait([f for f, _ in pending], return_when=FIRST_COMPLETED)
+                idx = next(i for i, (f, _) in enumerate(pending) if f in done)
+                future, item = pending[idx]
+                del pending[idx]
+
+            result = future.result()
+            for item_next in items_iter:
+                pending.append((submit(item_next), item_next))
+                break
+            yield item, result
+    finally:
+        for future, _ in pending:
+            future.cancel()
+        pool.shutdown(wait=True)
@@ -0,0 +1,123 @@
+"""
+asyncio helpers to read rasters without blocking the event loop (e.g. to serve tiles from an async web server).
+
+The blocking reads run in a bounded pool of threads (GDAL releases the GIL while reading and decoding). Concurrent
+identical requests are coalesced: they share a single underlying read. Arrays returned to coalesced requests are the
+same object and should not be modified in place.
+
+Timeouts and cancellation only affect the caller: the shared read keeps running while other callers wait for it, and
+it is cancelled (if it has not started yet) when all its callers are gone.
+"""
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+import rasterio.windows
+
+# Maximum number of blocking reads running at the same time
+DEFAULT_MAX_WORKERS = 8
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """ Returns the pool of threads where the blocking reads run """
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=DEFAULT_MAX_WORKERS, thread_name_prefix="georeader-aio")
+        return _EXECUTOR
+
+
+def set_max_workers(max_workers:int) -> None:
+    """ Replaces the pool of threads by a new one with `max_workers` threads. Reads already submitted are not affected """
+    global _EXECUTOR
+    assert max_workers >= 1, f"max_workers must be greater or equal than 1 found {max_workers}"
+    with _EXECUTOR_LOCK:
+        executor_old = _EXECUTOR
+        _EXECUTOR = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="georeader-aio")
+    if executor_old is not None:
+        executor_old.shutdown(wait=False)
+
+
+class _SharedRead:
+    """ Future of a blocking read shared by all the callers waiting for it """
+    def __init__(self, future:asyncio.Future):
+        self.future = future
+        self.waiters = 0
+
+
+# Reads in flight per event loop
+_INFLIGHT: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, _SharedRead]]" = weakref.WeakKeyDictionary()
+
+
+async def run_coalesced(key:Optional[Hashable], fn:Callable[[], Any], timeout:Optional[float]=None) -> Any:
+    """
+    Runs the blocking function `fn` in the pool of threads. Concurrent calls with the same `key` share one call to
+    `fn`.
+
+    Args:
+        key: key of the request. If None the request is not coalesced.
+        fn: blocking function without arguments.
+        timeout: Optional timeout in seconds for this caller. Raises `asyncio.TimeoutError` if exceeded.
+
+    Returns:
+        result of `fn()`
+    """
+    loop = asyncio.get_running_loop()
+    inflight = _INFLIGHT.setdefault(loop, {})
+
+    shared = inflight.get(key) if key is not None else None
+    if shared is None:
+        shared = _SharedRead(loop.run_in_executor(get_executor(), fn))
+        if key is not None:
+            inflight[key] = shared
+
+            def _remove(_future, key=key, shared=shared):
+                if inflight.get(key) is shared:
+                    del inflight[key]
+
+            shared.future.add_done_callback(_remove)
+
+    shared.waiters += 1
+    try:
+        # shield: a caller that times out or is cancelled does not cancel the read of the others
+        return await asyncio.wait_for(asyncio.shield(shared.future), timeout)
+    finally:
+        shared.waiters -= 1
+        if (shared.waiters == 0) and not shared.future.done():
+            # Nobody waits for this read anymore (cancelled if it did not start)
+            shared.future.cancel()
+            if key is not None and inflight.get(key) is shared:
+                del inflight[key]
+
+
+def window_key(window:Optional[rasterio.windows.Window]) -> Optional[Tuple[float, float, float, float]]:
+    """ Hashable key of a window (or of a tuple of slices) """
+    if window is None:
+        return None
+    if isinstance(window, tuple):
+        window = rasterio.windows.Window.from_slices(*window)
+    return window.col_off, window.row_off, window.width, window.height
+
+
+def reader_key(reader:Any) -> Hashable:
+    """ Key that identifies what `reader` reads (two readers with the same key return the same data) """
+    window_focus = getattr(reader, "window_focus", None)
+    indexes = getattr(reader, "indexes", None)
+    rio_env_options = getattr(reader, "rio_env_options", None)
+    return (tuple(reader.paths), getattr(reader, "overview_level", None), getattr(reader, "stack", None),
+            window_key(window_focus), tuple(indexes) if indexes is not None else None,
+            getattr(reader, "fill_value_default", None),
+            tuple(sorted((k, str(v)) for k, v in rio_env_options.items())) if rio_env_options is not None else None,
+            getattr(reader, "use_memmap", None))
+
+
+def read_key(reader:Any, method:str, window:Optional[rasterio.windows.Window]=None,
+             boundless:bool=True, indexes:Optional[Any]=None) -> Hashable:
+    """ Key of a call to `reader.<method>(window=window, boundless=boundless, indexes=indexes)` """
+    if isinstance(indexes, list):
+        indexes = tuple(indexes)
+    return method, reader_key(reader), window_key(window), boundless, indexes
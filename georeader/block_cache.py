@@ -0,0 +1,98 @@
+"""
+Byte bounded LRU cache of decoded raster blocks.
+
+Samplers that read overlapping windows decode the same compressed tiles over and over. The `BlockCache` stores the
+decoded internal blocks of the rasters (the grid of `RasterioReader.block_windows`) so that `RasterioReader.read`
+builds the windows from the cached blocks and only reads the missing ones.
+
+Entries are keyed by `(path, overview_level, band, block_row, block_col)`.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+import numpy as np
+
+# Default size of the cache: 256MB
+DEFAULT_MAX_BYTES = 256 * 2**20
+
+
+class BlockCache:
+    """
+    LRU cache of decoded blocks bounded by the number of bytes stored.
+
+    Args:
+        max_bytes: maximum number of bytes of the decoded blocks stored in the cache.
+
+    Attributes:
+        hits: number of blocks served from the cache.
+        misses: number of blocks that had to be read.
+        evictions: number of blocks removed to keep the size of the cache below `max_bytes`.
+        nbytes: current size of the cache in bytes.
+
+    """
+    def __init__(self, max_bytes:int=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._blocks: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key:Hashable) -> Optional[np.ndarray]:
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is None:
+                self.misses += 1
+                return None
+            self._blocks.move_to_end(key)
+            self.hits += 1
+            return block
+
+    def put(self, key:Hashable, block:np.ndarray) -> None:
+        if block.nbytes > self.max_bytes:
+            return
+
+        # Blocks are shared between reads: make them read only to avoid corrupting the cache
+        block.flags.writeable = False
+        with self._lock:
+            if key in self._blocks:
+                self.nbytes -= self._blocks.pop(key).nbytes
+            self._blocks[key] = block
+            self.nbytes += block.nbytes
+            while self.nbytes > self.max_bytes:
+                _, block_evicted = self._blocks.popitem(last=False)
+                self.nbytes -= block_evicted.nbytes
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._blocks = OrderedDict()
+            self.nbytes = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        if total == 0:
+            return 0.
+        return self.hits / total
+
+    def stats(self) -> Dict[str, float]:
+        """ Returns a dict with the counters of the cache """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "hit_ratio": self.hit_ratio, "nbytes": self.nbytes, "max_bytes": self.max_bytes,
+                    "blocks": len(self._blocks)}
+
+    def __getstate__(self) -> Dict[str, int]:
+        # The cached blocks are not pickled: the copy is an empty cache of the same size
+        return {"max_bytes": self.max_bytes}
+
+    def __setstate__(self, state:Dict[str, int]) -> None:
+        self.__init__(max_bytes=state["max_bytes"])
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    def __repr__(self) -> str:
+        return f"BlockCache({self.stats()})"
@@ -0,0 +1,205 @@
+"""
+Dask arrays backed by georeader readers and GeoData backed by dask arrays.
+
+`to_dask` builds a dask array whose chunks are read with `read.read_from_window`. The reader is stored only once in
+the graph and each chunk task only holds its window (`dask.array.from_array` getter tasks), so the graph stays small
+and the tasks can be sent to the workers of a cluster (readers are picklable). By default the spatial chunks are
+multiples of the internal blocks of the file and aligned with them, so every block is read by a single task::
+
+    array = reader.to_dask()  # same as dask_utils.to_dask(reader)
+    mean = array.mean(axis=(-2, -1)).compute()
+
+`DaskGeoData` goes the other way: it wraps a dask array with its transform and crs as a GeoData. Windows are sliced
+lazily and the array is only computed on `load`.
+
+`dask` is an optional dependency of georeader.
+"""
+from typing import Any, Optional, Tuple, Union
+import numpy as np
+import rasterio
+import rasterio.windows
+from georeader.abstract_reader import AbstractGeoData, GeoData
+from georeader.geotensor import GeoTensor
+from georeader import read
+from georeader import window_utils
+
+# Target spatial shape of the chunks. With internal blocks the chunks are the largest multiple of the blocks that
+# fits in this shape (at least one block)
+DEFAULT_CHUNK_SHAPE = (2048, 2048)
+
+
+def _chunk_sizes(size:int, chunk:int, offset:int=0) -> Tuple[int, ...]:
+    """ Sizes of the chunks of an axis of `size` pixels with boundaries at the multiples of `chunk` minus `offset` """
+    sizes = []
+    start = 0
+    stop = chunk - (offset % chunk)
+    while start < size:
+        stop = min(stop, size)
+        sizes.append(stop - start)
+        start, stop = stop, stop + chunk
+    return tuple(sizes)
+
+
+def spatial_chunks(data_in:GeoData,
+                   chunks:Optional[Tuple[int, int]]=None) -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+    """
+    Chunk sizes of the "y" and "x" dims of `data_in` (in the format of `dask.array`).
+
+    Args:
+        data_in: GeoData. If it has a `block_shape` (e.g. `RasterioReader`) the default chunks are multiples of the
+            blocks aligned with the blocks of the file.
+        chunks: Optional. (height, width) of the chunks. If not provided the chunks are computed from
+            `DEFAULT_CHUNK_SHAPE` and the blocks of `data_in`.
+
+    Returns:
+        sizes of the chunks of the "y" and "x" dims
+    """
+    height, width = data_in.shape[-2:]
+    if chunks is not None:
+        return _chunk_sizes(height, int(chunks[0])), _chunk_sizes(width, int(chunks[1]))
+
+    block_shape = getattr(data_in, "block_shape", None)
+    if block_shape is None:
+        return _chunk_sizes(height, DEFAULT_CHUNK_SHAPE[0]), _chunk_sizes(width, DEFAULT_CHUNK_SHAPE[1])
+
+    chunk_shape = tuple(max(target // block, 1) * block for target, block in zip(DEFAULT_CHUNK_SHAPE, block_shape))
+
+    # Blocks are aligned with the origin of the file, not with the window focus of the reader
+    window_focus = getattr(data_in, "window_focus", None)
+    offset = (0, 0) if window_focus is None else (int(window_focus.row_off), int(window_focus.col_off))
+    return _chunk_sizes(height, chunk_shape[0], offset[0]), _chunk_sizes(width, chunk_shape[1], offset[1])
+
+
+class _WindowGetter:
+    """
+    Array-like view of a GeoData (`shape`, `dtype`, `ndim` and `__getitem__` with slices) for `dask.array.from_array`.
+    Each slice is read with `read.read_from_window`.
+    """
+    def __init__(self, data_in:GeoData):
+        self.data_in = data_in
+        self.shape = tuple(data_in.shape)
+        self.dtype = np.dtype(data_in.dtype)
+        self.ndim = len(self.shape)
+
+    def __getitem__(self, index:Tuple[slice, ...]) -> np.ndarray:
+        if not isinstance(index, tuple):
+            index = (index,)
+        index = index + (slice(None),) * (self.ndim - len(index))
+        row_start, row_stop, _ = index[-2].indices(self.shape[-2])
+        col_start, col_stop, _ = index[-1].indices(self.shape[-1])
+        index_other = index[:-2] + (slice(None), slice(None))
+        if (row_stop <= row_start) or (col_stop <= col_start):
+            return np.empty(self.shape[:-2] + (0, 0), dtype=self.dtype)[index_other]
+
+        window = rasterio.windows.Window(row_off=row_start, col_off=col_start,
+                                         height=row_stop - row_start, width=col_stop - col_start)
+        values = read.read_from_window(self.data_in, window, return_only_data=True, trigger_load=True)
+        return np.asarray(values)[index_other]
+
+
+def to_dask(data_in:GeoData, chunks:Optional[Tuple[int, int]]=None) -> 'dask.array.Array':
+    """
+    Returns a dask array with the values of `data_in` (see module docstring).
+
+    Args:
+        data_in: GeoData (e.g. `RasterioReader`, `S2Image` or `GeoTensor`).
+        chunks: Optional. (height, width) of the chunks. The non-spatial dims are not chunked. If not provided the
+            chunks are aligned to the internal blocks of the file (see `spatial_chunks`).
+
+    Returns:
+        dask array with the shape and dtype of `data_in`
+    """
+    import dask.array as da
+
+    shape = tuple(data_in.shape)
+    chunks_all = tuple((s,) for s in shape[:-2]) + spatial_chunks(data_in, chunks)
+    if isinstance(data_in, GeoTensor):
+        return da.from_array(np.asanyarray(data_in.values), chunks=chunks_all)
+
+    return da.from_array(_WindowGetter(data_in), chunks=chunks_all, lock=False, fancy=False,
+                         meta=np.empty((0,) * len(shape), dtype=data_in.dtype))
+
+
+class DaskGeoData(AbstractGeoData):
+    """
+    GeoData backed by a dask array. Windows are sliced lazily and the array is computed on `load`.
+
+    Args:
+        array: dask array with dims ("y", "x"), ("band", "y", "x") or ("time", "band", "y", "x").
+        transform: geotransform of the array.
+        crs: crs of the array.
+        fill_value_default: value of the pixels outside the array (boundless reads).
+
+    """
+    def __init__(self, array:'dask.array.Array', transform:rasterio.Affine, crs:Any,
+                 fill_value_default:Optional[Union[int, float]]=0):
+        super().__init__()
+        if (array.ndim < 2) or (array.ndim > 4):
+            raise ValueError(f"Expected 2d-4d array found {array.shape}")
+        self.array = array
+        self._transform = transform
+        self._crs = crs
+        self.fill_value_default = fill_value_default
+        self.dtype = array.dtype
+        self.dims = ("time", "band", "y", "x")[-array.ndim:]
+
+    @property
+    def shape(self) -> Tuple:
+        return tuple(self.array.shape)
+
+    @property
+    def transform(self) -> rasterio.Affine:
+        return self._transform
+
+    @property
+    def crs(self) -> Any:
+        return self._crs
+
+    @property
+    def values(self) -> np.ndarray:
+        return self.load().values
+
+    def __repr__(self) -> str:
+        return f"""
+         DaskGeoData with chunksize {self.array.chunksize}
+         Transform: {self.transform}
+         Shape: {self.shape}
+         Resolution: {self.res}
+         Bounds: {self.bounds}
+         CRS: {self.crs}
+         fill_value_default: {self.fill_value_default}
+        """
+
+    def read_from_window(self, window:rasterio.windows.Window, boundless:bool=True) -> '__class__':
+        """
+        Returns a new DaskGeoData with the spatial dimensions sliced (as `GeoTensor.read_from_window`).
+
+        Args:
+            window: window to slice the current DaskGeoData
+            boundless: if `True` the array is padded with `self.fill_value_default` where the window is outside of it.
+
+        Returns:
+            DaskGeoData
+
+        Raises:
+            rasterio.windows.WindowError if `window` does not intersect the data
+        """
+        import dask.array as da
+
+        window_data = rasterio.windows.Window(col_off=0, row_off=0, width=self.shape[-1], height=self.shape[-2])
+        if not boundless:
+            window = rasterio.windows.intersection(window, window_data)
+
+        slice_dict, pad_width = window_utils.get_slice_pad(window_data, window)
+        array = self.array[(Ellipsis, slice_dict["y"], slice_dict["x"])]
+        if any(p != 0 for p in pad_width["x"] + pad_width["y"]):
+            pad = ((0, 0),) * (array.ndim - 2) + (tuple(pad_width["y"]), tuple(pad_width["x"]))
+            array = da.pad(array, pad, mode="constant", constant_values=self.fill_value_default)
+
+        return DaskGeoData(array, transform=rasterio.windows.transform(window, self.transform), crs=self.crs,
+                           fill_value_default=self.fill_value_default)
+
+    def load(self, boundless:bool=True) -> GeoTensor:
+        """ Computes the dask array and returns it as a GeoTensor """
+        return GeoTensor(np.asarray(self.array.compute()), transform=self.transform, crs=self.crs,
+                         fill_value_default=self.fill_value_default)
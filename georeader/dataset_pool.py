@@ -0,0 +1,196 @@
+"""
+Per-process pool of open rasterio datasets.
+
+Opening a remote COG involves fetching its header and (re)establishing the HTTP connection. When many small chips are
+read from the same files this cost dominates. The `DatasetPool` keeps the `rasterio.DatasetReader` handles open and
+reuses them between calls. It is keyed by `(path, overview_level, rio_env_options)`.
+
+The pool is fork safe: if the process id changes (e.g. inside a `multiprocessing` or a `torch.utils.data.DataLoader`
+worker) the pool is rebuilt from scratch and the handles inherited from the parent are never used.
+
+Handles are lent exclusively: while a handle is in use by one thread, other threads asking for the same key will
+get a different handle.
+"""
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple
+import rasterio
+from georeader import tracing
+
+# Maximum number of open datasets (in use + idle) per process
+DEFAULT_MAX_OPEN = 64
+
+
+def _pool_key(path:str, overview_level:Optional[int]=None,
+              rio_env_options:Optional[Dict[str, Any]]=None) -> Tuple[Hashable, ...]:
+    if rio_env_options is None:
+        rio_env_options = {}
+    env_key = tuple(sorted((k, str(v)) for k, v in rio_env_options.items()))
+    return path, overview_level, env_key
+
+
+def open_options(overview_level:Optional[int]=None) -> Dict[str, Any]:
+    """
+    kwargs of `rasterio.open` to open the pyramid level `overview_level`. The `overview_level` option is not set for
+    the full resolution since GDAL then ignores the overviews of the file (e.g. in reads with `out_shape`).
+    """
+    if overview_level is None:
+        return {}
+    return {"overview_level": overview_level}
+
+
+class DatasetPool:
+    """
+    LRU pool of open `rasterio.DatasetReader` objects.
+
+    Args:
+        max_open: maximum number of open datasets. When exceeded the least recently used idle handles are closed.
+
+    Attributes:
+        hits: number of times a handle was reused.
+        misses: number of times a handle had to be opened.
+        evictions: number of handles closed to keep the number of open files below `max_open`.
+
+    """
+    def __init__(self, max_open:int=DEFAULT_MAX_OPEN):
+        assert max_open > 0, f"max_open must be positive found {max_open}"
+        self.max_open = max_open
+        self._reset()
+
+    def _reset(self) -> None:
+        # Handles inherited from other process are dropped without closing them (they belong to the parent)
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._idle: "OrderedDict[Hashable, List[rasterio.DatasetReader]]" = OrderedDict()
+        self._n_open = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _check_pid(self) -> None:
+        if self._pid != os.getpid():
+            self._reset()
+
+    def _evict_one(self) -> bool:
+        """ Closes the least recently used idle handle. Must be called with the lock acquired """
+        if len(self._idle) == 0:
+            return False
+        key, handles = next(iter(self._idle.items()))
+        src = handles.pop(0)
+        if len(handles) == 0:
+            del self._idle[key]
+        self._n_open -= 1
+        self.evictions += 1
+        src.close()
+        return True
+
+    def _acquire(self, key:Hashable, path:str, overview_level:Optional[int]) -> rasterio.DatasetReader:
+        self._check_pid()
+        with self._lock:
+            handles = self._idle.get(key)
+            if handles:
+                src = handles.pop()
+                if len(handles) == 0:
+                    del self._idle[key]
+                self.hits += 1
+                return src
+
+            self.misses += 1
+            while (self._n_open >= self.max_open) and self._evict_one():
+                pass
+            self._n_open += 1
+
+        try:
+            with tracing.timed("open_time"):
+                src = rasterio.open(path, "r", **open_options(overview_level))
+            tracing.add(files_opened=1)
+            return src
+        except BaseException:
+            with self._lock:
+                self._n_open -= 1
+            raise
+
+    def _release(self, key:Hashable, src:rasterio.DatasetReader, discard:bool=False) -> None:
+        if self._pid != os.getpid():
+            # Pool was reset in between (the handle belongs to other pool generation)
+            return
+
+        with self._lock:
+            if discard or src.closed or (self._n_open > self.max_open):
+                self._n_open -= 1
+                if not src.closed:
+                    src.close()
+                return
+
+            self._idle.setdefault(key, []).append(src)
+            self._idle.move_to_end(key)
+
+    @contextmanager
+    def open(self, path:str, overview_level:Optional[int]=None,
+             rio_env_options:Optional[Dict[str, Any]]=None) -> Iterator[rasterio.DatasetReader]:
+        """
+        Context manager that lends an open dataset. The dataset is returned to the pool on exit (it must not be closed
+        by the caller). If an exception is raised inside the context the handle is discarded.
+
+        Args:
+            path: path of the raster.
+            overview_level: overview level to open (as in `rasterio.open`)
+            rio_env_options: GDAL options. The `rasterio.Env` is active inside the context.
+
+        """
+        if rio_env_options is None:
+            rio_env_options = {}
+        key = _pool_key(path, overview_level, rio_env_options)
+        with rasterio.Env(**rio_env_options):
+            src = self._acquire(key, path, overview_level)
+            try:
+                yield src
+            except BaseException:
+                self._release(key, src, discard=True)
+                raise
+            self._release(key, src)
+
+    def clear(self) -> None:
+        """ Closes all the idle handles """
+        self._check_pid()
+        with self._lock:
+            while self._evict_one():
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        """ Returns a dict with the counters of the pool """
+        self._check_pid()
+        with self._lock:
+            n_idle = sum(len(h) for h in self._idle.values())
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "open": self._n_open, "idle": n_idle}
+
+    def __repr__(self) -> str:
+        return f"DatasetPool(max_open={self.max_open}, stats={self.stats()})"
+
+
+_DATASET_POOL: Optional[DatasetPool] = None
+_DATASET_POOL_LOCK = threading.Lock()
+
+
+def get_dataset_pool() -> DatasetPool:
+    """ Returns the per-process `DatasetPool` used by readers created with `use_dataset_pool=True`"""
+    global _DATASET_POOL
+    if _DATASET_POOL is None:
+        with _DATASET_POOL_LOCK:
+            # Checked again with the lock: concurrent first calls must not create two pools
+            if _DATASET_POOL is None:
+                _DATASET_POOL = DatasetPool()
+    return _DATASET_POOL
+
+
+def set_max_open(max_open:int) -> None:
+    """ Sets the maximum number of open datasets of the per-process pool """
+    pool = get_dataset_pool()
+    assert max_open > 0, f"max_open must be positive found {max_open}"
+    pool.max_open = max_open
+    with pool._lock:
+        while (pool._n_open > pool.max_open) and pool._evict_one():
+            pass
@@ -1,11 +1,12 @@
 
+import os
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from typing import Any, Dict, Union, Tuple, Optional, List
 import rasterio
 import rasterio.windows
 from georeader import window_utils
 from georeader.window_utils import window_bounds
-from itertools import product
 from shapely.geometry import Polygon
 import numbers
 
@@ -93,6 +94,29 @@ class GeoTensor:
     def load(self) -> '__class__':
         return self
 
+    def to_dask(self, chunks:Optional[Tuple[int, int]]=None) -> 'dask.array.Array':
+        """
+        Returns a dask array of the values (see `dask_utils.to_dask`).
+
+        Args:
+            chunks: Optional. (height, width) of the chunks. Defaults to `dask_utils.DEFAULT_CHUNK_SHAPE`.
+
+        Returns:
+            dask array
+        """
+        from georeader import dask_utils
+        return dask_utils.to_dask(self, chunks=chunks)
+
+    def __reduce_ex__(self, protocol:int):
+        # Pickle only the data of the array as a plain contiguous array (views and memory maps are not pickled with
+        # their base). With protocol 5 numpy sends it as an out-of-band buffer (no copies with `buffer_callback`).
+        # Other attributes of the instance are restored from the state.
+        values = self.values
+        if isinstance(values, np.ndarray):
+            values = np.ascontiguousarray(values).view(np.ndarray)
+        state = {k: v for k, v in self.__dict__.items() if k != "values"}
+        return self.__class__, (values, self.transform, self.crs, self.fill_value_default), state
+
     def __copy__(self) -> '__class__':
         return GeoTensor(self.values.copy(), self.transform, self.crs, self.fill_value_default)
 
@@ -215,7 +239,7 @@ class GeoTensor:
     def resize(self, output_shape:Tuple[int,int],
                anti_aliasing:bool=True, anti_aliasing_sigma:Optional[Union[float,np.ndarray]]=None,
                interpolation:Optional[str]="bilinear",
-               mode_pad:str="constant")-> '__class__':
+               mode_pad:str="constant", num_threads:Optional[int]=None)-> '__class__':
         """
         Resize the geotensor to match a certain size output_shape. This function works with GeoTensors of 2D, 3D and 4D.
         The geoinformation of the output tensor is changed accordingly.
@@ -229,6 +253,7 @@ class GeoTensor:
                 downsampling factor, where s > 1
             interpolation: – algorithm used for resizing: 'nearest' | 'bilinear' | ‘bicubic’
             mode_pad: mode pad for resize function
+            num_threads: number of threads resizing bands concurrently. Defaults to the number of cpus.
 
         Returns:
              resized GeoTensor
@@ -259,31 +284,33 @@ class GeoTensor:
             from skimage.transform import resize
             # https://scikit-image.org/docs/stable/api/skimage.transform.html#skimage.transform.resize
             output_tensor = np.ndarray(input_shape[:-2]+output_shape, dtype=self.dtype)
-            if len(input_shape) == 4:
-                for i,j in product(range(0,input_shape[0]), range(0, input_shape[1])):
-                    if (not anti_aliasing) or (anti_aliasing_sigma is None) or isinstance(anti_aliasing_sigma, numbers.Number):
-                        anti_aliasing_sigma_iter = anti_aliasing_sigma
-                    else:
-                        anti_aliasing_sigma_iter = anti_aliasing_sigma[i, j]
-                    output_tensor[i,j] = resize(self.values[i,j], output_shape, order=ORDERS[interpolation],
-                                                anti_aliasing=anti_aliasing, preserve_range=False,
-                                                cval=self.fill_value_default,mode=mode_pad,
-                                                anti_aliasing_sigma=anti_aliasing_sigma_iter)
-            elif len(input_shape) == 3:
-                for i in range(0,input_shape[0]):
-                    if (not anti_aliasing) or (anti_aliasing_sigma is None) or isinstance(anti_aliasing_sigma, numbers.Number):
-                        anti_aliasing_sigma_iter = anti_aliasing_sigma
-                    else:
-                        anti_aliasing_sigma_iter = anti_aliasing_sigma[i]
-                    output_tensor[i] = resize(self.values[i], output_shape, order=ORDERS[interpolation],
-                                              anti_aliasing=anti_aliasing, preserve_range=False,
-                                              cval=self.fill_value_default,mode=mode_pad,
-                                              anti_aliasing_sigma=anti_aliasing_sigma_iter)
-            else:
+
+            # Each band is resized independently: skimage clips the output of each call to the range of its input
+            def resize_iter(idx):
+                if (not anti_aliasing) or (anti_aliasing_sigma is None) or isinstance(anti_aliasing_sigma, numbers.Number):
+                    anti_aliasing_sigma_iter = anti_aliasing_sigma
+                else:
+                    anti_aliasing_sigma_iter = anti_aliasing_sigma[idx]
+                output_tensor[idx] = resize(self.values[idx], output_shape, order=ORDERS[interpolation],
+                                            anti_aliasing=anti_aliasing, preserve_range=False,
+                                            cval=self.fill_value_default,mode=mode_pad,
+                                            anti_aliasing_sigma=anti_aliasing_sigma_iter)
+
+            if len(input_shape) == 2:
                 output_tensor[...] = resize(self.values, output_shape, order=ORDERS[interpolation],
                                             anti_aliasing=anti_aliasing, preserve_range=False,
                                             cval=self.fill_value_default,mode=mode_pad,
                                             anti_aliasing_sigma=anti_aliasing_sigma)
+            else:
+                indexes = list(np.ndindex(*input_shape[:-2]))
+                if num_threads is None:
+                    num_threads = os.cpu_count() or 1
+                if (num_threads <= 1) or (len(indexes) == 1):
+                    for idx in indexes:
+                        resize_iter(idx)
+                else:
+                    with ThreadPoolExecutor(max_workers=min(num_threads, len(indexes))) as executor:
+                        list(executor.map(resize_iter, indexes))
 
         return GeoTensor(output_tensor, transform=transform, crs=self.crs,
                          fill_value_default=self.fill_value_default)
@@ -0,0 +1,338 @@
+"""
+Resampling between aligned grids that differ by an integer factor (e.g. Sentinel-2 20m -> 10m or 10m -> 60m).
+
+When the destination grid is a coarser (or finer) version of the source grid whose pixels are aligned, resampling does
+not need a general warp:
+
+* Downsampling by (fy, fx): each output pixel is a block of fy x fx input pixels. `nearest`, `average`, `sum`,
+  `min`, `max` and `mode` are computed with NumPy reductions over the blocks.
+* Upsampling by (fy, fx): `nearest` (and the aggregations, that reduce to it) repeat the input pixels and `bilinear`
+  is a separable interpolation.
+
+The results are the ones of the GDAL warper: nodata pixels are not used, ties of `mode` go to the first value that
+reaches the maximum count in row-major order and, as GDAL, valid integer outputs (other than `nearest`) that are equal
+to a non zero `dst_nodata` are moved off it (`dst_nodata - 1`, or `dst_nodata + 1` for the minimum of the dtype).
+The only differences are integer outputs of `average` and `bilinear` that fall exactly on .5: they are rounded
+half to even (as `reprojection_plan`) whereas GDAL rounds them half up.
+
+Output pixels whose block is partly outside the source data are not computed here: GDAL replicates the edge of the
+source there. `read.read_reproject(..., integer_factor=True)` uses `integer_grid` to detect these cases and falls back
+to the GDAL warper otherwise.
+"""
+from typing import NamedTuple, Optional, Tuple, Union
+import numpy as np
+import rasterio
+import rasterio.warp
+from georeader.window_utils import is_nodata
+
+Resampling = rasterio.warp.Resampling
+
+RESAMPLINGS_DOWNSAMPLING = (Resampling.nearest, Resampling.average, Resampling.sum, Resampling.min,
+                            Resampling.max, Resampling.mode)
+RESAMPLINGS_UPSAMPLING = (Resampling.nearest, Resampling.bilinear, Resampling.average, Resampling.min,
+                          Resampling.max, Resampling.mode)
+
+# Tolerance (in pixels) to consider that two grids are aligned
+ALIGNMENT_TOLERANCE = 1e-6
+
+
+class IntegerGrid(NamedTuple):
+    """
+    Relation between a source grid and an aligned destination grid.
+
+    Attributes:
+        upsample: True if the destination grid is finer than the source grid.
+        factor: (fy, fx) integer ratio between the resolutions of both grids.
+        offset: (row, col) of the origin of the destination grid. In pixels of the source grid when downsampling and in
+            pixels of the destination grid (with origin at the origin of the source grid) when upsampling.
+    """
+    upsample: bool
+    factor: Tuple[int, int]
+    offset: Tuple[int, int]
+
+
+def _as_integer(x:float) -> Optional[int]:
+    x_round = round(x)
+    if abs(x - x_round) <= ALIGNMENT_TOLERANCE * max(1, abs(x)):
+        return int(x_round)
+    return None
+
+
+def integer_grid(src_transform:rasterio.Affine, dst_transform:rasterio.Affine) -> Optional[IntegerGrid]:
+    """
+    Returns the `IntegerGrid` between two grids (in the same crs) or None if they are not aligned or the ratio of
+    their resolutions is not an integer (or the same grid: the ratio is 1 in both axes).
+    """
+    if (src_transform.b != 0) or (src_transform.d != 0) or (dst_transform.b != 0) or (dst_transform.d != 0):
+        return None
+    ratio_x = dst_transform.a / src_transform.a
+    ratio_y = dst_transform.e / src_transform.e
+    if (ratio_x <= 0) or (ratio_y <= 0):
+        return None
+
+    # Origin of the destination grid in pixels of the source grid
+    col0 = (dst_transform.c - src_transform.c) / src_transform.a
+    row0 = (dst_transform.f - src_transform.f) / src_transform.e
+
+    factor_x, factor_y = _as_integer(ratio_x), _as_integer(ratio_y)
+    if (factor_x is not None) and (factor_y is not None) and (factor_x >= 1) and (factor_y >= 1):
+        if (factor_x, factor_y) == (1, 1):
+            return None
+        offset = _as_integer(row0), _as_integer(col0)
+        if any(o is None for o in offset):
+            return None
+        return IntegerGrid(upsample=False, factor=(factor_y, factor_x), offset=offset)
+
+    factor_x, factor_y = _as_integer(1 / ratio_x), _as_integer(1 / ratio_y)
+    if (factor_x is not None) and (factor_y is not None) and (factor_x >= 1) and (factor_y >= 1):
+        offset = _as_integer(row0 * factor_y), _as_integer(col0 * factor_x)
+        if any(o is None for o in offset):
+            return None
+        return IntegerGrid(upsample=True, factor=(factor_y, factor_x), offset=offset)
+
+    return None
+
+
+def _round_to_dtype(values:np.ndarray, dtype:np.dtype) -> np.ndarray:
+    """ Rounds and clips if `dtype` is an integer type """
+    if np.issubdtype(dtype, np.integer):
+        info = np.iinfo(dtype)
+        return np.clip(np.rint(values), info.min, info.max)
+    return values
+
+
+def _avoid_nodata(values:np.ndarray, dst_nodata:Union[int, float]) -> np.ndarray:
+    """
+    Moves the integer `values` equal to `dst_nodata` off it as the GDAL warper does: to `dst_nodata - 1` or to
+    `dst_nodata + 1` if `dst_nodata` is the minimum of the dtype. `dst_nodata` 0 and float values are not modified.
+    """
+    if (not np.issubdtype(values.dtype, np.integer)) or (dst_nodata == 0):
+        return values
+    info = np.iinfo(values.dtype)
+    if not (info.min <= dst_nodata <= info.max):
+        return values
+    value_avoid = dst_nodata + 1 if dst_nodata == info.min else dst_nodata - 1
+    return np.where(values == dst_nodata, np.array(value_avoid, dtype=values.dtype), values)
+
+
+def _fill_nodata(values:np.ndarray, valid:Optional[np.ndarray], dtype:np.dtype,
+                 dst_nodata:Union[int, float]) -> np.ndarray:
+    """ Casts `values` to `dtype`, moves the valid values off `dst_nodata` and sets the invalid ones to it """
+    if valid is not None:
+        values = np.where(valid, values, 0)
+    values = _avoid_nodata(values.astype(dtype, copy=False), dst_nodata)
+    if valid is not None:
+        values = np.where(valid, values, dst_nodata)
+    return values.astype(dtype, copy=False)
+
+
+def _block_mode(blocks:np.ndarray, valid:Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Mode of each row of `blocks` (N, K). Ties go to the value that first reaches the maximum count. Returns the mode
+    and whether the row had any valid value.
+    """
+    n, k = blocks.shape
+    order = np.argsort(blocks, axis=1, kind="stable")
+    blocks_sorted = np.take_along_axis(blocks, order, axis=1)
+    positions = np.arange(k)
+    new_run = np.ones((n, k), dtype=bool)
+    new_run[:, 1:] = blocks_sorted[:, 1:] != blocks_sorted[:, :-1]
+    run_start = np.maximum.accumulate(np.where(new_run, positions, 0), axis=1)
+    count = positions - run_start + 1  # Number of occurrences of the value up to (and including) this position
+    if valid is not None:
+        count[~np.take_along_axis(valid, order, axis=1)] = 0
+    count_max = count.max(axis=1)
+    position_first = np.where(count == count_max[:, np.newaxis], order, k).min(axis=1)
+    return blocks[np.arange(n), position_first], count_max > 0
+
+
+def downsample(values:np.ndarray, factor:Tuple[int, int], resampling:Resampling,
+               src_nodata:Optional[Union[int, float]]=None,
+               dst_nodata:Optional[Union[int, float]]=None) -> np.ndarray:
+    """
+    Downsamples `values` (..., H * fy, W * fx) by blocks of `factor` (fy, fx).
+
+    Args:
+        values: array to downsample. Its spatial shape must be a multiple of `factor`.
+        factor: (fy, fx) block size.
+        resampling: one of `RESAMPLINGS_DOWNSAMPLING`.
+        src_nodata: pixels with this value are not used.
+        dst_nodata: value of the blocks without valid pixels. Defaults to 0. Valid integer outputs equal to it are
+            moved off it (except with `nearest`).
+
+    Returns:
+        (..., H, W) array with the dtype of `values`
+    """
+    assert resampling in RESAMPLINGS_DOWNSAMPLING, f"Resampling {resampling} not supported when downsampling"
+    fy, fx = factor
+    shape_other = values.shape[:-2]
+    height, width = values.shape[-2] // fy, values.shape[-1] // fx
+    assert values.shape[-2:] == (height * fy, width * fx), \
+        f"Spatial shape {values.shape[-2:]} is not a multiple of the factor {factor}"
+    if dst_nodata is None:
+        dst_nodata = 0
+
+    if resampling == Resampling.nearest:
+        # GDAL takes the pixel that contains the center of the block
+        out = np.ascontiguousarray(values[..., fy // 2::fy, fx // 2::fx])
+        if (src_nodata is not None) and (src_nodata != dst_nodata):
+            out[is_nodata(out, src_nodata)] = dst_nodata
+        return out
+
+    valid = None if src_nodata is None else ~is_nodata(values, src_nodata)
+
+    if resampling == Resampling.mode:
+        # (..., H, W, fy * fx) in row-major order of the pixels of each block
+        def flat_blocks(array:np.ndarray) -> np.ndarray:
+            blocks = array.reshape(shape_other + (height, fy, width, fx))
+            return np.moveaxis(blocks, -3, -2).reshape((-1, fy * fx))
+        blocks_flat = flat_blocks(values)
+        valid_flat = None if valid is None else flat_blocks(valid)
+        mode, any_valid = _block_mode(blocks_flat, valid_flat)
+        mode = _avoid_nodata(mode, dst_nodata)
+        mode[~any_valid] = dst_nodata
+        return mode.reshape(shape_other + (height, width))
+
+    # Reductions over the fy * fx strided views of the blocks (much faster than reducing the small block axes)
+    offsets = [(dy, dx) for dy in range(fy) for dx in range(fx)]
+    if resampling in (Resampling.average, Resampling.sum):
+        # Exact sums of integers
+        dtype_acc = np.int64 if np.issubdtype(values.dtype, np.integer) else np.float64
+        acc = np.zeros(shape_other + (height, width), dtype=dtype_acc)
+        if valid is None:
+            for dy, dx in offsets:
+                acc += values[..., dy::fy, dx::fx]
+            count = fy * fx
+            any_valid = None
+        else:
+            count = np.zeros(shape_other + (height, width), dtype=np.int32)
+            for dy, dx in offsets:
+                valid_n = valid[..., dy::fy, dx::fx]
+                acc += np.where(valid_n, values[..., dy::fy, dx::fx], 0)
+                count += valid_n
+            any_valid = count > 0
+        if resampling == Resampling.average:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                acc = acc / count
+        result = _round_to_dtype(acc, values.dtype)
+    else:
+        reduce = np.minimum if resampling == Resampling.min else np.maximum
+        if valid is None:
+            result = values[..., ::fy, ::fx].copy()
+            for dy, dx in offsets[1:]:
+                reduce(result, values[..., dy::fy, dx::fx], out=result)
+            return _avoid_nodata(result, dst_nodata)
+        if np.issubdtype(values.dtype, np.integer):
+            info = np.iinfo(values.dtype)
+            neutral = info.max if resampling == Resampling.min else info.min
+        else:
+            neutral = np.inf if resampling == Resampling.min else -np.inf
+        result = np.full(shape_other + (height, width), neutral, dtype=values.dtype)
+        any_valid = np.zeros(shape_other + (height, width), dtype=bool)
+        for dy, dx in offsets:
+            valid_n = valid[..., dy::fy, dx::fx]
+            reduce(result, values[..., dy::fy, dx::fx], out=result, where=valid_n)
+            any_valid |= valid_n
+
+    return _fill_nodata(result, any_valid, values.dtype, dst_nodata)
+
+
+def _source_coords(offset:int, factor:int, size:int, start:int) -> np.ndarray:
+    """ Coordinates of the centers of `size` destination pixels in pixels of a source array that starts at `start` """
+    return (offset + np.arange(size, dtype=np.float64) + .5) / factor - start
+
+
+def upsample_window(grid:IntegerGrid, shape_out:Tuple[int, int]) -> Tuple[int, int, int, int]:
+    """
+    Returns the (row_off, col_off, height, width) of the source window needed to upsample to the destination grid of
+    `grid` with spatial shape `shape_out` (with one pixel of margin for the bilinear interpolation).
+    """
+    (fy, fx), (row, col) = grid.factor, grid.offset
+    row_start, col_start = row // fy - 1, col // fx - 1
+    row_end = (row + shape_out[0] - 1) // fy + 2
+    col_end = (col + shape_out[1] - 1) // fx + 2
+    return row_start, col_start, row_end - row_start, col_end - col_start
+
+
+def upsample(values:np.ndarray, grid:IntegerGrid, shape_out:Tuple[int, int], resampling:Resampling,
+             src_nodata:Optional[Union[int, float]]=None,
+             dst_nodata:Optional[Union[int, float]]=None,
+             src_shape:Optional[Tuple[int, int]]=None,
+             src_offset:Tuple[int, int]=(0, 0)) -> np.ndarray:
+    """
+    Upsamples `values` (the source window given by `upsample_window(grid, shape_out)`) to the destination grid.
+
+    Args:
+        values: (..., h, w) source array.
+        grid: `IntegerGrid` with `upsample=True`.
+        shape_out: spatial shape of the output.
+        resampling: one of `RESAMPLINGS_UPSAMPLING`.
+        src_nodata: pixels with this value are not used.
+        dst_nodata: value of the pixels without valid data. Defaults to 0. Valid integer outputs equal to it are
+            moved off it (except with `nearest`).
+        src_shape: Optional. (height, width) of the source raster. If given, the pixels whose centers fall outside of
+            it are set to `dst_nodata` (as GDAL does when it warps the whole source array).
+        src_offset: (row, col) of the first pixel of the source raster in the source grid of `grid` (e.g. the data
+            of a reader whose window focus does not start at the origin of the raster).
+
+    Returns:
+        (..., shape_out[0], shape_out[1]) array with the dtype of `values`
+    """
+    assert grid.upsample, "Expected an upsampling grid"
+    assert resampling in RESAMPLINGS_UPSAMPLING, f"Resampling {resampling} not supported when upsampling"
+    row_start, col_start, _, _ = upsample_window(grid, shape_out)
+    rows = _source_coords(grid.offset[0], grid.factor[0], shape_out[0], row_start)
+    cols = _source_coords(grid.offset[1], grid.factor[1], shape_out[1], col_start)
+    if dst_nodata is None:
+        dst_nodata = 0
+
+    if resampling != Resampling.bilinear:
+        # Each destination pixel is inside a single source pixel
+        out = np.take(np.take(values, np.floor(rows).astype(np.int64), axis=-2), np.floor(cols).astype(np.int64),
+                      axis=-1)
+        invalid = None if src_nodata is None else is_nodata(out, src_nodata)
+        if resampling != Resampling.nearest:
+            out = _avoid_nodata(out, dst_nodata)
+        if invalid is not None:
+            out[invalid] = dst_nodata
+        return out
+
+    # Separable bilinear interpolation between the centers of the source pixels. Nodata pixels get weight 0 and the
+    # weights of each output pixel are normalized
+    def interp(array:np.ndarray, coords:np.ndarray, axis:int) -> np.ndarray:
+        coords = coords - .5
+        index0 = np.floor(coords).astype(np.int64)
+        weight1 = coords - index0
+        shape_weight = [1] * array.ndim
+        shape_weight[axis] = len(coords)
+        weight1 = weight1.reshape(shape_weight)
+        out = np.take(array, index0, axis=axis)
+        out *= (1 - weight1)
+        out1 = np.take(array, index0 + 1, axis=axis)
+        out1 *= weight1
+        out += out1
+        return out
+
+    values_float = values.astype(np.float64)
+    if (src_nodata is None) or not is_nodata(values, src_nodata).any():
+        out = interp(interp(values_float, rows, -2), cols, -1)
+        any_valid = None
+    else:
+        valid = (~is_nodata(values, src_nodata)).astype(np.float64)
+        values_float[valid == 0] = 0
+        acc = interp(interp(values_float, rows, -2), cols, -1)
+        weight = interp(interp(valid, rows, -2), cols, -1)
+        # As GDAL, pixels whose center is in a nodata source pixel are nodata
+        any_valid = np.take(np.take(valid, np.floor(rows).astype(np.int64), axis=-2),
+                            np.floor(cols).astype(np.int64), axis=-1) > 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out = acc / weight
+
+    out = _round_to_dtype(out, values.dtype)
+    if src_shape is not None:
+        rows_src = rows + (row_start - src_offset[0])
+        cols_src = cols + (col_start - src_offset[1])
+        inside = ((rows_src < src_shape[0]) & (rows_src >= 0))[:, np.newaxis] & \
+                 ((cols_src < src_shape[1]) & (cols_src >= 0))
+        any_valid = inside if any_valid is None else (any_valid & inside)
+    return _fill_nodata(out, any_valid, values.dtype, dst_nodata)
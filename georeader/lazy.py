@@ -0,0 +1,486 @@
+"""
+Lazy GeoData: records windows, band selections, resamplings and arithmetic and runs them when it is loaded.
+
+Chaining `read.read_from_polygon`, `read.read_reproject` and `read.resize` on a reader loads every intermediate
+result in memory. A `LazyGeoData` only computes the geographic metadata (shape, transform, crs and dtype) of each
+step. When it is loaded it runs an optimized plan:
+
+* consecutive windows are merged into a single window read from the source,
+* band selections are pushed down to the reader (e.g. `RasterioReader` only reads the selected bands),
+* consecutive resamplings (`reproject` and `resize`) are collapsed into a single `read.read_reproject` from the
+  source to the final grid. Windows applied after a resampling only change its output grid.
+
+::
+
+    lazy = LazyGeoData(reader).isel({"band": [3, 2, 1]})
+    lazy = lazy.reproject(dst_crs="EPSG:4326", bounds=bounds, resolution_dst_crs=1e-4).resize(1e-3) / 10_000
+    geotensor = lazy.load()
+
+Merging windows and pushing down band selections give the same values as running the steps one by one. Collapsed
+resamplings resample the data once (with the method of the last step) instead of once per step, so their values can
+differ slightly from the step by step results. Arithmetic steps before a resampling split the plan into stages:
+the data is loaded and the arithmetic computed before resampling.
+
+`LazyGeoData` implements the `AbstractGeoData` interface: it can be passed to the functions of `read` as any other
+reader.
+"""
+import numbers
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+import numpy as np
+import rasterio
+import rasterio.warp
+import rasterio.windows
+from georeader.abstract_reader import AbstractGeoData, GeoData
+from georeader.geotensor import GeoTensor
+from georeader import read
+from georeader import window_utils
+
+
+class Grid(NamedTuple):
+    """ Spatial grid: crs, geotransform and (height, width) """
+    crs: Any
+    transform: rasterio.Affine
+    shape: Tuple[int, int]
+
+
+class WindowStep(NamedTuple):
+    """ Boundless integer window relative to the grid of the previous step """
+    window: rasterio.windows.Window
+
+
+class BandsStep(NamedTuple):
+    """ 0-based bands to select relative to the bands of the previous step """
+    bands: Tuple[int, ...]
+
+
+class ResampleStep(NamedTuple):
+    """ Resampling to `grid` (`reproject` and `resize`) """
+    grid: Grid
+    resampling: rasterio.warp.Resampling
+    dtype: Any = None
+    dst_nodata: Optional[Union[int, float]] = None
+    anti_aliasing: bool = False
+    anti_aliasing_sigma: Optional[Union[float, np.ndarray]] = None
+
+
+class ElementwiseStep(NamedTuple):
+    """ Function applied to the values (arithmetic and casts) """
+    name: str
+    func: Callable[[np.ndarray], np.ndarray]
+
+
+Step = Union[WindowStep, BandsStep, ResampleStep, ElementwiseStep]
+
+
+class Stage(NamedTuple):
+    """
+    Stage of an optimized plan. It reads `window` of its input, resamples it (if `resample` is not None), sets the
+    pixels outside `valid` to the fill value and applies `ops`.
+    """
+    window: Optional[rasterio.windows.Window] = None
+    resample: Optional[ResampleStep] = None
+    valid: Optional[rasterio.windows.Window] = None
+    ops: Tuple[ElementwiseStep, ...] = ()
+
+
+class Plan(NamedTuple):
+    """ Optimized plan: bands to read from the source and stages to run """
+    bands: Optional[Tuple[int, ...]]
+    stages: Tuple[Stage, ...]
+
+
+def _full_window(shape:Tuple[int, int]) -> rasterio.windows.Window:
+    return rasterio.windows.Window(row_off=0, col_off=0, height=shape[0], width=shape[1])
+
+
+def _sub_window(valid:rasterio.windows.Window, window:rasterio.windows.Window) -> rasterio.windows.Window:
+    """ Part of `valid` inside `window` relative to `window` (empty window if they do not intersect) """
+    row_start, col_start = max(valid.row_off, window.row_off), max(valid.col_off, window.col_off)
+    row_end = min(valid.row_off + valid.height, window.row_off + window.height)
+    col_end = min(valid.col_off + valid.width, window.col_off + window.width)
+    return rasterio.windows.Window(row_off=row_start - window.row_off, col_off=col_start - window.col_off,
+                                   height=max(row_end - row_start, 0), width=max(col_end - col_start, 0))
+
+
+def _optimize(steps:Tuple[Step, ...], shape_source:Tuple[int, int]) -> Plan:
+    # Band selections commute with all the other steps (they are computed band by band)
+    bands = None
+    for step in steps:
+        if isinstance(step, BandsStep):
+            bands = step.bands if bands is None else tuple(bands[b] for b in step.bands)
+
+    stages = []
+    stage = Stage()
+    shape = shape_source  # spatial shape of the output of the current stage
+    for step in steps:
+        if isinstance(step, WindowStep):
+            window = step.window
+            if stage.resample is None:
+                # Merge with the window of the stage
+                if stage.window is not None:
+                    valid = _sub_window(stage.valid or _full_window(shape), window)
+                    window = rasterio.windows.Window(row_off=stage.window.row_off + window.row_off,
+                                                     col_off=stage.window.col_off + window.col_off,
+                                                     height=window.height, width=window.width)
+                else:
+                    valid = None  # pixels outside the input are filled by the boundless read
+                stage = stage._replace(window=window, valid=valid)
+            else:
+                # Change the output grid of the resampling
+                grid = stage.resample.grid
+                grid = Grid(grid.crs, rasterio.windows.transform(window, grid.transform),
+                            (int(window.height), int(window.width)))
+                valid = _sub_window(stage.valid or _full_window(shape), window)
+                stage = stage._replace(resample=stage.resample._replace(grid=grid), valid=valid)
+            if (stage.valid is not None) and (stage.valid == _full_window((window.height, window.width))):
+                stage = stage._replace(valid=None)
+            shape = (int(window.height), int(window.width))
+        elif isinstance(step, ResampleStep):
+            if stage.ops or (stage.valid is not None) or \
+                    ((stage.resample is not None) and (step.anti_aliasing_sigma is not None)):
+                # The input of the resampling must be computed first
+                stages.append(stage)
+                stage = Stage()
+            if stage.resample is None:
+                resample = step
+            else:
+                previous = stage.resample
+                resample = step._replace(dtype=previous.dtype if step.dtype is None else step.dtype,
+                                         dst_nodata=previous.dst_nodata if step.dst_nodata is None else step.dst_nodata,
+                                         anti_aliasing=previous.anti_aliasing or step.anti_aliasing,
+                                         anti_aliasing_sigma=previous.anti_aliasing_sigma)
+            stage = stage._replace(resample=resample)
+            shape = step.grid.shape
+        elif isinstance(step, ElementwiseStep):
+            stage = stage._replace(ops=stage.ops + (step,))
+
+    stages.append(stage)
+    return Plan(bands=bands, stages=tuple(stages))
+
+
+def _select_bands(data:GeoData, bands:Tuple[int, ...]) -> GeoData:
+    axis = data.dims.index("band")
+    if not isinstance(data, GeoTensor):
+        data = data.load()
+    return GeoTensor(np.take(np.asanyarray(data.values), list(bands), axis=axis), transform=data.transform,
+                     crs=data.crs, fill_value_default=data.fill_value_default)
+
+
+def _resample(data:GeoData, step:ResampleStep) -> GeoTensor:
+    grid = step.grid
+    window_out = _full_window(grid.shape)
+    if step.anti_aliasing:
+        # As `read.resize`: gaussian filter of the input if the output is coarser
+        polygon = window_utils.window_polygon(window_out, grid.transform)
+        resolution_dst = read._resolution_in_crs(polygon, grid.crs, grid.transform, window_out, data.crs)
+        resolution_or = data.res
+        sigma = step.anti_aliasing_sigma
+        if not isinstance(data, GeoTensor):
+            data_overview = read._read_from_overview_for_resolution(data, resolution_dst)
+            if (data_overview is not data) and (sigma is not None):
+                sigma = sigma / np.mean(np.array(data_overview.res) / np.array(resolution_or))
+            data = data_overview
+            resolution_or = data.res
+
+        if any(r_or < r_dst for r_or, r_dst in zip(resolution_or, resolution_dst)):
+            if sigma is None:
+                scale = np.array(resolution_dst) / np.array(resolution_or)
+                sigma = np.mean(np.maximum(0, (scale - 1) / 2))
+            # Only the part of the input needed for the output is loaded and filtered
+            pad = int(np.ceil(4 * np.max(sigma))) + 3
+            data = read.read_from_polygon(data, polygon, crs_polygon=grid.crs, pad_add=(pad, pad),
+                                          trigger_load=True)
+            values = np.asanyarray(data.values)
+            output = np.empty_like(values)
+            read._gaussian_filter_spatial(values, sigma, output=output)
+            data = GeoTensor(output, transform=data.transform, crs=data.crs,
+                             fill_value_default=data.fill_value_default)
+
+    return read.read_reproject(data, dst_crs=grid.crs, dst_transform=grid.transform, window_out=window_out,
+                               resampling=step.resampling, dtpye_dst=step.dtype, dst_nodata=step.dst_nodata)
+
+
+def _run_stage(data:GeoData, stage:Stage, bands:Optional[Tuple[int, ...]]=None) -> GeoTensor:
+    if stage.window is not None:
+        data = read.read_from_window(data, stage.window, boundless=True)
+    if bands is not None:
+        data = _select_bands(data, bands)
+    if stage.resample is None:
+        data = data.load()
+    else:
+        data = _resample(data, stage.resample)
+
+    values = np.asanyarray(data.values)
+    if stage.valid is not None:
+        # `values` can be a view of the input
+        values = values.copy()
+        mask = np.ones(values.shape[-2:], dtype=bool)
+        slice_y, slice_x = stage.valid.toslices()
+        mask[slice_y, slice_x] = False
+        values[..., mask] = data.fill_value_default
+    for op in stage.ops:
+        values = op.func(values)
+    return GeoTensor(values, transform=data.transform, crs=data.crs, fill_value_default=data.fill_value_default)
+
+
+class LazyGeoData(AbstractGeoData):
+    """
+    Lazy version of a GeoData. Methods return new `LazyGeoData` objects with the step recorded, the data is only
+    read with `load` (see module docstring).
+
+    Args:
+        data_in: GeoData to read from (e.g. `RasterioReader` or `GeoTensor`).
+
+    """
+    def __init__(self, data_in:GeoData):
+        super().__init__()
+        if isinstance(data_in, LazyGeoData):
+            self.source = data_in.source
+            self.steps = data_in.steps
+            self._grid = data_in._grid
+            self._shape_other = data_in._shape_other
+            self.dtype = data_in.dtype
+            self.fill_value_default = data_in.fill_value_default
+        else:
+            self.source = data_in
+            self.steps: Tuple[Step, ...] = ()
+            self._grid = Grid(data_in.crs, data_in.transform, tuple(data_in.shape[-2:]))
+            self._shape_other = tuple(data_in.shape[:-2])
+            self.dtype = data_in.dtype
+            self.fill_value_default = getattr(data_in, "fill_value_default", 0)
+        self.dims = tuple(data_in.dims)
+
+    @property
+    def shape(self) -> Tuple:
+        return self._shape_other + self._grid.shape
+
+    @property
+    def transform(self) -> rasterio.Affine:
+        return self._grid.transform
+
+    @property
+    def crs(self) -> Any:
+        return self._grid.crs
+
+    @property
+    def values(self) -> np.ndarray:
+        return self.load().values
+
+    def __repr__(self) -> str:
+        return f"""
+         LazyGeoData of {type(self.source).__name__} with {len(self.steps)} steps
+         Transform: {self.transform}
+         Shape: {self.shape}
+         Resolution: {self.res}
+         Bounds: {self.bounds}
+         CRS: {self.crs}
+         fill_value_default: {self.fill_value_default}
+        """
+
+    def _append(self, step:Step) -> 'LazyGeoData':
+        lazy = LazyGeoData(self)
+        lazy.steps = self.steps + (step,)
+        if isinstance(step, WindowStep):
+            window = step.window
+            lazy._grid = Grid(self.crs, rasterio.windows.transform(window, self.transform),
+                              (int(window.height), int(window.width)))
+        elif isinstance(step, BandsStep):
+            shape_other = list(self._shape_other)
+            shape_other[self.dims.index("band")] = len(step.bands)
+            lazy._shape_other = tuple(shape_other)
+        elif isinstance(step, ResampleStep):
+            lazy._grid = step.grid
+            if step.dtype is not None:
+                lazy.dtype = np.dtype(step.dtype)
+            lazy.fill_value_default = self.fill_value_default if step.dst_nodata is None else step.dst_nodata
+        return lazy
+
+    def plan(self) -> Plan:
+        """ Returns the optimized plan that `load` runs """
+        return _optimize(self.steps, tuple(self.source.shape[-2:]))
+
+    def load(self, boundless:bool=True) -> GeoTensor:
+        """
+        Runs the optimized plan of the steps.
+
+        Args:
+            boundless: must be `True` (the shape of the output is always `self.shape`).
+
+        Returns:
+            GeoTensor with `self.shape`, `self.transform` and `self.crs`
+        """
+        assert boundless, "LazyGeoData only supports boundless loading"
+        plan = self.plan()
+        data = self.source
+        bands = plan.bands
+        if (bands is not None) and hasattr(data, "set_indexes"):
+            # Read only the selected bands (`RasterioReader`)
+            data = data.read_from_window(_full_window(data.shape[-2:]), boundless=True)
+            data.set_indexes([b + 1 for b in bands], relative=True)
+            bands = None
+
+        for stage in plan.stages:
+            data = _run_stage(data, stage, bands=bands)
+            bands = None
+
+        return data
+
+    def read_from_window(self, window:rasterio.windows.Window, boundless:bool=True) -> 'LazyGeoData':
+        """
+        Records a window of the data.
+
+        Args:
+            window: window relative to the current grid. Fractional windows are rounded to the outer window.
+            boundless: if `False` the window is clipped to the current grid.
+
+        Returns:
+            LazyGeoData
+
+        Raises:
+            rasterio.windows.WindowError if `boundless` is `False` and `window` does not intersect the data
+        """
+        window = window_utils.round_outer_window(window)
+        if not boundless:
+            window = rasterio.windows.intersection(window, _full_window(self._grid.shape))
+        window = rasterio.windows.Window(row_off=int(window.row_off), col_off=int(window.col_off),
+                                         height=int(window.height), width=int(window.width))
+        return self._append(WindowStep(window))
+
+    def isel(self, sel:Dict[str, Union[slice, List[int], int]]) -> 'LazyGeoData':
+        """
+        Records a selection of bands and spatial slices. This function mimics ``xr.DataArray.isel()`` method.
+
+        Args:
+            sel: Dict with the selection of the "band", "x" and "y" dims; i.e. `{"band": [3, 2, 1],
+                "x": slice(10, 20)}`. An integer selects a band keeping the "band" dim. Spatial slices are clipped
+                to the current grid.
+
+        Returns:
+            LazyGeoData
+        """
+        for k in sel:
+            if (k not in self.dims) or (k not in ("band", "x", "y")):
+                raise NotImplementedError(f"Axis {k} not in {self.dims} or not supported")
+
+        lazy = self
+        if "band" in sel:
+            count = self.shape[self.dims.index("band")]
+            bands = sel["band"]
+            if isinstance(bands, slice):
+                bands = range(*bands.indices(count))
+            elif isinstance(bands, numbers.Integral):
+                bands = [bands]
+            assert all(-count <= b < count for b in bands), f"Bands {sel['band']} out of range for {count} bands"
+            lazy = lazy._append(BandsStep(tuple(int(b) % count for b in bands)))
+
+        if ("x" in sel) or ("y" in sel):
+            height, width = self._grid.shape
+            window = rasterio.windows.Window.from_slices(sel.get("y", slice(0, height)),
+                                                         sel.get("x", slice(0, width)),
+                                                         height=height, width=width)
+            lazy = lazy.read_from_window(window, boundless=False)
+        return lazy
+
+    def reproject(self, dst_crs:Optional[Any]=None, bounds:Optional[Tuple[float, float, float, float]]=None,
+                  resolution_dst_crs:Optional[Union[float, Tuple[float, float]]]=None,
+                  dst_transform:Optional[rasterio.Affine]=None,
+                  window_out:Optional[rasterio.windows.Window]=None,
+                  resampling:rasterio.warp.Resampling=rasterio.warp.Resampling.cubic_spline,
+                  dtpye_dst=None, dst_nodata:Optional[Union[int, float]]=None) -> 'LazyGeoData':
+        """
+        Records a reprojection. Arguments as in `read.read_reproject`; the offsets of `window_out` are applied to
+        `dst_transform`.
+
+        Returns:
+            LazyGeoData
+        """
+        dst_transform = window_utils.figure_out_transform(transform=dst_transform, bounds=bounds,
+                                                          resolution_dst=resolution_dst_crs)
+        if window_out is None:
+            assert bounds is not None, "Both window_out and bounds are None. This is needed to figure out the size of the output array"
+            window_out = rasterio.windows.from_bounds(*bounds,
+                                                      transform=dst_transform).round_lengths(op="ceil",
+                                                                                             pixel_precision=read.PIXEL_PRECISION)
+        if dst_crs is None:
+            dst_crs = self.crs
+        grid = Grid(dst_crs, rasterio.windows.transform(window_out, dst_transform),
+                    (int(window_out.height), int(window_out.width)))
+        return self._append(ResampleStep(grid, resampling, dtype=dtpye_dst, dst_nodata=dst_nodata))
+
+    def resize(self, resolution_dst:Union[float, Tuple[float, float]],
+               window_out:Optional[rasterio.windows.Window]=None,
+               anti_aliasing:bool=True, anti_aliasing_sigma:Optional[Union[float, np.ndarray]]=None,
+               resampling:rasterio.warp.Resampling=rasterio.warp.Resampling.cubic_spline) -> 'LazyGeoData':
+        """
+        Records a change of the spatial resolution. Arguments as in `read.resize`. If the resize is collapsed with
+        previous resamplings the anti-aliasing filter is computed for the resolution of the input of the collapsed
+        resampling.
+
+        Returns:
+            LazyGeoData
+        """
+        if isinstance(resolution_dst, numbers.Number):
+            resolution_dst = (abs(resolution_dst), abs(resolution_dst))
+
+        if window_out is None:
+            resolution_or = self.res
+            height, width = self._grid.shape
+            output_shape_exact = height * resolution_or[0] / resolution_dst[0], width * resolution_or[1] / resolution_dst[1]
+            output_shape = (int(np.ceil(round(output_shape_exact[0], ndigits=3))),
+                            int(np.ceil(round(output_shape_exact[1], ndigits=3))))
+            window_out = _full_window(output_shape)
+
+        dst_transform = window_utils.figure_out_transform(transform=self.transform, resolution_dst=resolution_dst)
+        grid = Grid(self.crs, rasterio.windows.transform(window_out, dst_transform),
+                    (int(window_out.height), int(window_out.width)))
+        return self._append(ResampleStep(grid, resampling, anti_aliasing=anti_aliasing,
+                                         anti_aliasing_sigma=anti_aliasing_sigma))
+
+    def astype(self, dtype:Any) -> 'LazyGeoData':
+        """ Records a cast of the values to `dtype` """
+        lazy = self._append(ElementwiseStep(f"astype({np.dtype(dtype)})", lambda values: values.astype(dtype)))
+        lazy.dtype = np.dtype(dtype)
+        return lazy
+
+    def _arithmetic(self, ufunc:np.ufunc, other:numbers.Number, reflected:bool=False) -> 'LazyGeoData':
+        if not isinstance(other, numbers.Number):
+            return NotImplemented
+
+        fill_value_default = self.fill_value_default
+
+        def func(values:np.ndarray) -> np.ndarray:
+            result = ufunc(other, values) if reflected else ufunc(values, other)
+            if fill_value_default is not None:
+                # nodata pixels remain nodata
+                result[window_utils.is_nodata(values, fill_value_default)] = fill_value_default
+            return result
+
+        name = f"{other} {ufunc.__name__} x" if reflected else f"x {ufunc.__name__} {other}"
+        lazy = self._append(ElementwiseStep(name, func))
+        sample = np.zeros(1, dtype=self.dtype)
+        lazy.dtype = (ufunc(other, sample) if reflected else ufunc(sample, other)).dtype
+        return lazy
+
+    def __add__(self, other:numbers.Number) -> 'LazyGeoData':
+        return self._arithmetic(np.add, other)
+
+    def __radd__(self, other:numbers.Number) -> 'LazyGeoData':
+        return self._arithmetic(np.add, other, reflected=True)
+
+    def __sub__(self, other:numbers.Number) -> 'LazyGeoData':
+        return self._arithmetic(np.subtract, other)
+
+    def __rsub__(self, other:numbers.Number) -> 'LazyGeoData':
+        return self._arithmetic(np.subtract, other, reflected=True)
+
+    def __mul__(self, other:numbers.Number) -> 'LazyGeoData':
+        return self._arithmetic(np.multiply, other)
+
+    def __rmul__(self, other:numbers.Number) -> 'LazyGeoData':
+        return self._arithmetic(np.multiply, other, reflected=True)
+
+    def __truediv__(self, other:numbers.Number) -> 'LazyGeoData':
+        return self._arithmetic(np.true_divide, other)
+
+    def __rtruediv__(self, other:numbers.Number) -> 'LazyGeoData':
+        return self._arithmetic(np.true_divide, other, reflected=True)
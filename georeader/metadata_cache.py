@@ -0,0 +1,183 @@
+"""
+Cache of the header metadata of rasters.
+
+Probing the header of hundreds of remote rasters (transform, CRS, count, nodata, shape...) is slow. The
+`MetadataCache` stores that metadata in memory and optionally in a JSON sidecar file so that constructing the same
+`RasterioReader` again does not need any I/O.
+
+Entries are keyed by `(path, overview_level)` and store the `stamp` of the file when it was read: the modification
+time and size for local paths. An entry whose stamp does not match the file is stale and it is read again. Remote
+paths (e.g. `gs://` or `s3://`) are not validated: rasterio does not expose the ETag or `Last-Modified` of the
+`/vsicurl/` stat, so they are assumed to be immutable. Call `MetadataCache.invalidate(path)` if a remote raster is
+overwritten.
+"""
+import json
+import os
+import threading
+from typing import Any, Callable, ContextManager, Dict, Optional, Tuple
+import rasterio
+from rasterio.crs import CRS
+
+
+def _stamp(path:str) -> Optional[str]:
+    """ Returns the modification time and size of local files (None for remote paths: they are not validated) """
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+def read_metadata(src:rasterio.DatasetReader) -> Dict[str, Any]:
+    """
+    Reads the header metadata of an open raster. The returned dict is JSON serializable.
+
+    Args:
+        src: open rasterio dataset
+
+    Returns:
+        dict with keys: transform, crs, count, dtype, nodata, width, height, res, tags, descriptions, block_shapes,
+        overviews, scales and offsets.
+    """
+    return {
+        "transform": list(src.transform)[:6],
+        "crs": src.crs.to_wkt() if src.crs is not None else None,
+        "count": src.count,
+        "dtype": src.profile["dtype"],
+        "nodata": src.nodata,
+        "width": src.width,
+        "height": src.height,
+        "res": list(src.res),
+        "tags": src.tags(),
+        "descriptions": list(src.descriptions),
+        "block_shapes": [list(b) for b in src.block_shapes],
+        "overviews": src.overviews(1),
+        "scales": list(src.scales),
+        "offsets": list(src.offsets),
+    }
+
+
+def metadata_transform(metadata:Dict[str, Any]) -> rasterio.Affine:
+    return rasterio.Affine(*metadata["transform"])
+
+
+def metadata_crs(metadata:Dict[str, Any]) -> Optional[CRS]:
+    if metadata["crs"] is None:
+        return None
+    return CRS.from_wkt(metadata["crs"])
+
+
+class MetadataCache:
+    """
+    In memory cache of raster metadata with an optional JSON sidecar file.
+
+    Args:
+        path_sidecar: Optional path of the JSON file to persist the cache. If it exists it is loaded when the object
+            is created.
+
+    Attributes:
+        hits: number of entries served from the cache.
+        misses: number of entries that required opening the raster.
+
+    """
+    def __init__(self, path_sidecar:Optional[str]=None):
+        self.path_sidecar = path_sidecar
+        self._lock = threading.Lock()
+        # (path, overview_level) -> (stamp, metadata)
+        self._entries: Dict[Tuple[str, Optional[int]], Tuple[Optional[str], Dict[str, Any]]] = {}
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        if (path_sidecar is not None) and os.path.exists(path_sidecar):
+            with open(path_sidecar, "r") as fh:
+                entries = json.load(fh)
+            # Sidecars of previous versions (a dict) are discarded
+            if isinstance(entries, list):
+                self._entries = {(path, overview_level): (stamp, metadata)
+                                 for path, overview_level, stamp, metadata in entries}
+
+    def get(self, path:str, overview_level:Optional[int]=None) -> Optional[Dict[str, Any]]:
+        stamp = _stamp(path)
+        with self._lock:
+            entry = self._entries.get((path, overview_level))
+            metadata = entry[1] if (entry is not None) and (entry[0] == stamp) else None
+            if metadata is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return metadata
+
+    def put(self, path:str, overview_level:Optional[int], metadata:Dict[str, Any]) -> None:
+        stamp = _stamp(path)
+        with self._lock:
+            # Replaces the entry of previous versions of the file
+            self._entries[(path, overview_level)] = (stamp, metadata)
+            self._dirty = True
+
+    def get_or_read(self, path:str, overview_level:Optional[int],
+                    open_fn:Callable[[str], ContextManager[rasterio.DatasetReader]]) -> Dict[str, Any]:
+        """
+        Returns the metadata of `path` from the cache. If not cached it opens the raster with `open_fn` and stores it.
+
+        Args:
+            path: path of the raster
+            overview_level: overview level of the raster
+            open_fn: function that returns a context manager with the open dataset (e.g. `RasterioReader._open`)
+
+        """
+        metadata = self.get(path, overview_level)
+        if metadata is None:
+            with open_fn(path) as src:
+                metadata = read_metadata(src)
+            self.put(path, overview_level, metadata)
+        return metadata
+
+    def invalidate(self, path:Optional[str]=None) -> None:
+        """ Removes the entries of `path` (all the entries if path is None) """
+        with self._lock:
+            if path is None:
+                self._entries = {}
+            else:
+                self._entries = {k: v for k, v in self._entries.items() if k[0] != path}
+            self._dirty = True
+
+    def flush(self) -> None:
+        """ Writes the cache to the sidecar file if there are new entries """
+        if self.path_sidecar is None:
+            return
+
+        with self._lock:
+            if not self._dirty:
+                return
+            path_tmp = f"{self.path_sidecar}.{os.getpid()}.tmp"
+            with open(path_tmp, "w") as fh:
+                json.dump([[path, overview_level, stamp, metadata]
+                           for (path, overview_level), (stamp, metadata) in self._entries.items()], fh)
+            os.replace(path_tmp, self.path_sidecar)
+            self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_METADATA_CACHE: Optional[MetadataCache] = None
+_METADATA_CACHE_LOCK = threading.Lock()
+
+
+def get_metadata_cache() -> MetadataCache:
+    """ Returns the global `MetadataCache` used by readers created with `use_metadata_cache=True` """
+    global _METADATA_CACHE
+    if _METADATA_CACHE is None:
+        with _METADATA_CACHE_LOCK:
+            # Checked again with the lock: concurrent first calls must not create two caches
+            if _METADATA_CACHE is None:
+                _METADATA_CACHE = MetadataCache()
+    return _METADATA_CACHE
+
+
+def set_metadata_cache(cache:MetadataCache) -> None:
+    """
+    Sets the global `MetadataCache`. e.g. `set_metadata_cache(MetadataCache("metadata.json"))` to persist the
+    metadata between sessions.
+    """
+    global _METADATA_CACHE
+    _METADATA_CACHE = cache
@@ -1,12 +1,13 @@
 from georeader.abstract_reader import GeoData
 from georeader.geotensor import GeoTensor
-from typing import List, Optional, Tuple, Union, Callable
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union, Callable
 import rasterio.warp
 from georeader import read
 from georeader.read import read_reproject
 import numpy as np
 from georeader import window_utils
 from georeader import slices
+from georeader import _pool
 from shapely.geometry import Polygon, MultiPolygon, box
 import rasterio.windows
 from collections import namedtuple
@@ -20,7 +21,8 @@ def spatial_mosaic(data_list:Union[List[GeoData], List[Tuple[GeoData,GeoData]]],
                    window_size: Optional[Tuple[int, int]]= None,
                    resampling:rasterio.warp.Resampling=rasterio.warp.Resampling.cubic_spline,
                    masking_function:Optional[Callable[[GeoData], GeoData]]=None,
-                   dst_nodata:Optional[int]=None) -> GeoTensor:
+                   dst_nodata:Optional[int]=None,
+                   num_workers:int=1, executor:str="thread") -> GeoTensor:
     """
     Computes the spatial mosaic of all input products in `data_list`. It iteratively calls `read_reproject` with
     all the list of rasters while there is any `dst_nodata` value. This function m requires that the copy of the output
@@ -40,6 +42,11 @@ def spatial_mosaic(data_list:Union[List[GeoData], List[Tuple[GeoData,GeoData]]],
         masking_function: function to call to the mask if provided or to the tensor (if not provided) should return a bool tensor
             with only spatial dimensions.
         dst_nodata: no data value. if None will use `data_list[0].fill_value_default`
+        num_workers: number of windows (see `window_size`) computed in parallel. Each window reads the products of
+            the list until it is filled, as in the sequential computation, hence the output does not depend on
+            `num_workers`.
+        executor: "thread" or "process". With "process" the products (and `masking_function`) must be picklable
+            (e.g. `RasterioReader` or `GeoTensor` objects and a function defined at module level).
 
     Returns:
         GeoTensor with mosaic over the given bounds
@@ -146,85 +153,137 @@ def spatial_mosaic(data_list:Union[List[GeoData], List[Tuple[GeoData,GeoData]]],
     # Cache of the polygons geodata
     polygons_geodata = [None for _ in range(len(data_list)-1)]
 
-    for window in windows:
-        slice_spatial = window.toslices()
-        invalid_values_window = invalid_values[slice_spatial]
-        if not np.any(invalid_values_window):
-            continue
+    # Windows are independent: each one writes a disjoint region of data_return
+    windows = [window for window in windows if np.any(invalid_values[window.toslices()])]
+    kwargs_window = dict(dst_transform=dst_transform, dst_crs=dst_crs, resampling=resampling,
+                         masking_function=masking_function, dst_nodata=dst_nodata, axis_any=axis_any)
+
+    for window, data_window in _imap_windows(data_list[1:], polygons_geodata, windows, data_return.values,
+                                             invalid_values, kwargs_window, num_workers=num_workers,
+                                             executor=executor):
+        if not np.may_share_memory(data_window, data_return.values):
+            # Computed in another process
+            slice_obj = tuple(slice(None) for _ in range(len(data_return.shape) - 2)) + window.toslices()
+            data_return.values[slice_obj] = data_window
+
+    return data_return
+
+
+def _mosaic_window(data_list:Union[List[GeoData], List[Tuple[GeoData,GeoData]]], polygons_geodata:List[Optional[Polygon]],
+                   window:rasterio.windows.Window, data_window:np.ndarray, invalid_values_window:np.ndarray,
+                   dst_transform:rasterio.Affine, dst_crs:Any, resampling:rasterio.warp.Resampling,
+                   masking_function:Optional[Callable[[GeoData], GeoData]], dst_nodata:Optional[int],
+                   axis_any:Optional[Tuple[int, ...]]) -> np.ndarray:
+    """
+    Fills the invalid pixels of the `window` of the mosaic with the products of `data_list`. `data_window` (values of
+    the mosaic in `window`) and `invalid_values_window` are modified in place. Stops as soon as the window is filled.
+    """
+    dst_transform_iter = rasterio.windows.transform(window, transform=dst_transform)
+    window_reproject_iter = rasterio.windows.Window(row_off=0, col_off=0, width=window.width, height=window.height)
+    polygon_iter = window_utils.window_polygon(window, dst_transform)
+
+    for _i, data in enumerate(data_list):
+        if isinstance(data, tuple):
+            geodata = data[0]
+            geomask = data[1]
+        else:
+            geodata = data
+            geomask = None
 
-        # Add dims to slice_obj
-        slice_obj = tuple(slice(None) for _ in range(len(data_return.shape)-2)) + slice_spatial
-        dst_transform_iter = rasterio.windows.transform(window, transform=dst_transform)
-        window_reproject_iter = rasterio.windows.Window(row_off=0, col_off=0, width=window.width, height=window.height)
-        polygon_iter = window_utils.window_polygon(window, dst_transform)
+        if polygons_geodata[_i] is None:
+            polygons_geodata[_i] = geodata.footprint(crs=dst_crs)
 
-        for _i, data in enumerate(data_list[1:]):
-            if isinstance(data, tuple):
-                geodata = data[0]
-                geomask = data[1]
-            else:
-                geodata = data
-                geomask = None
+        polygon_geodata = polygons_geodata[_i]
 
-            if polygons_geodata[_i] is None:
-                polygons_geodata[_i] = geodata.footprint(crs=dst_crs)
+        if not polygon_geodata.intersects(polygon_iter):
+            continue
+
+        if geomask is not None:
+            if (masking_function is None) and len(geomask.shape) > 2:
+                assert (len(geomask.shape) == 3) and (
+                            geomask.shape[0] == 1), f"Expected two dims, found {geomask.shape}"
+
+            invalid_geotensor = read_reproject(geomask,
+                                               dst_crs=dst_crs, dst_transform=dst_transform_iter,
+                                               resampling=rasterio.warp.Resampling.nearest,
+                                               window_out=window_reproject_iter)
+            if masking_function is not None:
+                invalid_geotensor = masking_function(invalid_geotensor)
+
+            invalid_geotensor.values = invalid_geotensor.values.astype(bool)
+            invalid_geotensor.values = invalid_geotensor.values.squeeze()
+            assert len(invalid_geotensor.shape) == 2, f"Invalid mask expected 2 dims found {invalid_geotensor.shape}"
+            if np.all(invalid_geotensor.values):
+                continue
+            invalid_values_iter = invalid_geotensor.values
 
-            polygon_geodata = polygons_geodata[_i]
+        data_read = read_reproject(geodata, dst_crs=dst_crs, window_out=window_reproject_iter,
+                                   dst_transform=dst_transform_iter, resampling=resampling,
+                                   dst_nodata=dst_nodata)
 
-            if not polygon_geodata.intersects(polygon_iter):
+        if (geomask is None) and (masking_function is not None):
+            invalid_geotensor = masking_function(data_read)
+
+            invalid_geotensor.values = invalid_geotensor.values.astype(bool)
+            invalid_geotensor.values = invalid_geotensor.values.squeeze()
+            assert len(invalid_geotensor.shape) == 2, f"Invalid mask expected 2 dims found {invalid_geotensor.shape}"
+            if np.all(invalid_geotensor.values):
                 continue
+            invalid_values_iter = invalid_geotensor.values
+
+        # data_read could have more dims -> any
+        masked_values_read = data_read.values == dst_nodata
+        if axis_any is not None:
+            masked_values_read = np.any(masked_values_read, axis=axis_any)  # (H, W)
 
-            if geomask is not None:
-                if (masking_function is None) and len(geomask.shape) > 2:
-                    assert (len(geomask.shape) == 3) and (
-                                geomask.shape[0] == 1), f"Expected two dims, found {geomask.shape}"
+        if (geomask is not None) or (masking_function is not None):
+            invalid_values_iter |= masked_values_read
+        else:
+            invalid_values_iter = masked_values_read
 
-                invalid_geotensor = read_reproject(geomask,
-                                                   dst_crs=dst_crs, dst_transform=dst_transform_iter,
-                                                   resampling=rasterio.warp.Resampling.nearest,
-                                                   window_out=window_reproject_iter)
-                if masking_function is not None:
-                    invalid_geotensor = masking_function(invalid_geotensor)
+        # Copy values invalids in window and valids in iter
+        mask_values_copy_out = invalid_values_window & ~invalid_values_iter
+        data_window[..., mask_values_copy_out] = data_read.values[...,mask_values_copy_out]
 
-                invalid_geotensor.values = invalid_geotensor.values.astype(bool)
-                invalid_geotensor.values = invalid_geotensor.values.squeeze()
-                assert len(invalid_geotensor.shape) == 2, f"Invalid mask expected 2 dims found {invalid_geotensor.shape}"
-                if np.all(invalid_geotensor.values):
-                    continue
-                invalid_values_iter = invalid_geotensor.values
+        invalid_values_window &= invalid_values_iter
 
-            data_read = read_reproject(geodata, dst_crs=dst_crs, window_out=window_reproject_iter,
-                                       dst_transform=dst_transform_iter, resampling=resampling,
-                                       dst_nodata=dst_nodata)
+        if not np.any(invalid_values_window):
+            break
 
-            if (geomask is None) and (masking_function is not None):
-                invalid_geotensor = masking_function(data_read)
+    return data_window
 
-                invalid_geotensor.values = invalid_geotensor.values.astype(bool)
-                invalid_geotensor.values = invalid_geotensor.values.squeeze()
-                assert len(invalid_geotensor.shape) == 2, f"Invalid mask expected 2 dims found {invalid_geotensor.shape}"
-                if np.all(invalid_geotensor.values):
-                    continue
-                invalid_values_iter = invalid_geotensor.values
 
-            # data_read could have more dims -> any
-            masked_values_read = data_read.values == dst_nodata
-            if axis_any is not None:
-                masked_values_read = np.any(masked_values_read, axis=axis_any)  # (H, W)
+# Arguments of `_mosaic_window` of the worker processes (set once per process by the initializer of the pool)
+_MOSAIC_PROCESS: Optional[Dict[str, Any]] = None
 
-            if (geomask is not None) or (masking_function is not None):
-                invalid_values_iter |= masked_values_read
-            else:
-                invalid_values_iter = masked_values_read
 
-            # Copy values invalids in window and valids in iter
-            mask_values_copy_out = invalid_values_window & ~invalid_values_iter
-            data_return.values[slice_obj][..., mask_values_copy_out] = data_read.values[...,mask_values_copy_out]
+def _init_process_worker(data_list:Union[List[GeoData], List[Tuple[GeoData,GeoData]]],
+                         polygons_geodata:List[Optional[Polygon]], kwargs_window:Dict[str, Any]) -> None:
+    global _MOSAIC_PROCESS
+    _MOSAIC_PROCESS = dict(data_list=data_list, polygons_geodata=polygons_geodata, **kwargs_window)
 
-            invalid_values_window &= invalid_values_iter
 
-            if not np.any(invalid_values_window):
-                break
+def _mosaic_window_process(window:rasterio.windows.Window, data_window:np.ndarray,
+                           invalid_values_window:np.ndarray) -> np.ndarray:
+    return _mosaic_window(window=window, data_window=data_window, invalid_values_window=invalid_values_window,
+                          **_MOSAIC_PROCESS)
 
 
-    return data_return
\ No newline at end of file
+def _imap_windows(data_list:Union[List[GeoData], List[Tuple[GeoData,GeoData]]],
+                  polygons_geodata:List[Optional[Polygon]], windows:List[rasterio.windows.Window],
+                  values:np.ndarray, invalid_values:np.ndarray, kwargs_window:Dict[str, Any],
+                  num_workers:int=1, executor:str="thread") -> Iterator[Tuple[rasterio.windows.Window, np.ndarray]]:
+    """
+    Yields the windows of the mosaic `(window, data_window)` computed sequentially or in a pool of `num_workers`.
+    Sequentially and with threads `data_window` is a view of `values`.
+    """
+    def args_window(window:rasterio.windows.Window) -> Tuple[rasterio.windows.Window, np.ndarray, np.ndarray]:
+        slice_spatial = window.toslices()
+        slice_obj = tuple(slice(None) for _ in range(values.ndim - 2)) + slice_spatial
+        return window, values[slice_obj], invalid_values[slice_spatial]
+
+    return _pool.imap_bounded(lambda w: _mosaic_window(data_list, polygons_geodata, *args_window(w), **kwargs_window),
+                              windows, num_workers=num_workers, executor=executor, ordered=False,
+                              fn_process=_mosaic_window_process, args_process=args_window,
+                              initializer=_init_process_worker, initargs=(data_list, polygons_geodata, kwargs_window),
+                              thread_name_prefix="georeader-mosaic")
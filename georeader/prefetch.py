@@ -0,0 +1,92 @@
+"""
+Background prefetching of windows.
+
+Sliding window inference reads the windows of `slices.create_windows` in a known order. `prefetch_windows` keeps the
+next reads running in a pool of threads while the caller processes the current window, overlapping the network and
+decoding latency with the compute::
+
+    windows = slices.create_windows(reader.shape[-2:], window_size=(512, 512))
+    for window, data in zip(windows, prefetch_windows(reader, windows, num_workers=4)):
+        pred = model(data.values)
+
+The memory used by the reads that were not consumed yet is bounded by `max_bytes`.
+"""
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from math import ceil
+from typing import Deque, Iterable, Iterator, Optional, Tuple, Union
+import numpy as np
+import rasterio.windows
+from georeader.abstract_reader import GeoData
+from georeader.geotensor import GeoTensor
+from georeader import read
+
+# Default memory budget of the prefetched windows: 512MB
+DEFAULT_MAX_BYTES = 512 * 2**20
+
+_END = object()
+
+
+def window_nbytes(data_in:GeoData, window:rasterio.windows.Window) -> int:
+    """ Number of bytes of the array of `window` read from `data_in` (boundless) """
+    n_values = int(np.prod(data_in.shape[:-2])) * ceil(window.height) * ceil(window.width)
+    return n_values * np.dtype(data_in.dtype).itemsize
+
+
+def prefetch_windows(data_in:GeoData, windows:Iterable[rasterio.windows.Window], num_workers:int=4,
+                     max_bytes:int=DEFAULT_MAX_BYTES, max_prefetch:Optional[int]=None,
+                     boundless:bool=True,
+                     return_only_data:bool=False) -> Iterator[Union[GeoTensor, np.ndarray, None]]:
+    """
+    Reads the `windows` of `data_in` in background threads and yields them in the same order. It is equivalent to
+    `(read.read_from_window(data_in, w, trigger_load=True) for w in windows)` but the next windows are read while the
+    caller processes the current one.
+
+    Args:
+        data_in: GeoData to read from (e.g. `RasterioReader`). It must be safe to read it from several threads
+            (`RasterioReader` opens the files in every read).
+        windows: iterable of windows to read (it is consumed lazily).
+        num_workers: number of threads reading.
+        max_bytes: maximum number of bytes of the windows being read or read and not yet consumed. One window is
+            always read even if it exceeds this budget.
+        max_prefetch: maximum number of windows being read or read and not yet consumed. Defaults to
+            `2 * num_workers`.
+        boundless: read in boundless mode (see `read.read_from_window`)
+        return_only_data: if `True` yields np.ndarrays instead of GeoTensors.
+
+    Returns:
+        Iterator of the GeoTensors (or arrays) of the windows in order. None for windows that do not intersect the data
+        if `boundless` is `False`.
+    """
+    assert num_workers >= 1, f"num_workers must be greater or equal than 1 found {num_workers}"
+    if max_prefetch is None:
+        max_prefetch = 2 * num_workers
+    assert max_prefetch >= 1, f"max_prefetch must be greater or equal than 1 found {max_prefetch}"
+
+    windows_iter = iter(windows)
+    pending: Deque[Tuple[Future, int]] = deque()
+    bytes_pending = 0
+    executor = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="georeader-prefetch")
+    try:
+        window_next = next(windows_iter, _END)
+        while (window_next is not _END) or (len(pending) > 0):
+            # Submit reads while the budget allows it
+            while (window_next is not _END) and (len(pending) < max_prefetch):
+                nbytes = window_nbytes(data_in, window_next)
+                if (len(pending) > 0) and (bytes_pending + nbytes > max_bytes):
+                    break
+                future = executor.submit(read.read_from_window, data_in, window_next,
+                                         return_only_data=return_only_data, trigger_load=True, boundless=boundless)
+                pending.append((future, nbytes))
+                bytes_pending += nbytes
+                window_next = next(windows_iter, _END)
+
+            future, nbytes = pending.popleft()
+            data = future.result()
+            bytes_pending -= nbytes
+            yield data
+    finally:
+        # Generator closed before the end or exception in a read: do not start the pending reads
+        for future, _ in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
@@ -1,10 +1,19 @@
 import rasterio
 import rasterio.windows
 import numpy as np
-from typing import Tuple, Dict, List, Optional, Union
+from typing import Tuple, Dict, List, Optional, Union, Any, Iterator, Callable, NamedTuple
 import warnings
 import numbers
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from georeader import geotensor
+from georeader.dataset_pool import get_dataset_pool, open_options
+from georeader import metadata_cache
+from georeader.block_cache import BlockCache
+from georeader.tiff_memmap import get_tiff_memmap
+from georeader import aio
+from georeader import tracing
+from functools import partial
 from collections.abc import Iterable
 from georeader import window_utils
 from georeader.window_utils import window_bounds, get_slice_pad
@@ -18,13 +27,30 @@ RIO_ENV_OPTIONS_DEFAULT = dict(
     GDAL_HTTP_MULTIPLEX="YES"
 )
 
+# Number of threads used to probe the headers of the rasters when the reader is created
+NUM_WORKERS_CHECK = 16
+
+class _ReadPlan(NamedTuple):
+    """ Result of `RasterioReader._read_plan` """
+    shape: Tuple[int, ...]  # (len(paths), C, H, W)
+    shape_return: Tuple[int, ...]  # shape of the array returned by `read`
+    fill_value: Any
+    window: rasterio.windows.Window  # window w.r.t. `real_window` (intersected if not boundless)
+    read_src: Optional[Callable[[int, str, rasterio.DatasetReader, np.ndarray], None]]
+    window_memmap: Optional[rasterio.windows.Window] = None  # intersection with `real_window` if it can be memory mapped
+    indexes: Optional[List[int]] = None  # 1-based bands to read w.r.t. the rasters
+    dtype: Any = None  # dtype of the output
+    postprocess: Optional[Callable[[np.ndarray], None]] = None  # applied in place to the (C, H, W) output of each path
+
+
 class RasterioReader:
     f"""
     Class to read a set of rasters files (``paths``). the `read` method will return a 4D np.ndarray with
     shape (len(paths), C, H, W).
 
     It checks that all rasters have same CRS, transform and  shape. the `read` method will open the file every time it
-    is called to work in parallel processing scenario.
+    is called to work in parallel processing scenario. Set `use_dataset_pool=True` to reuse the open datasets between
+    calls instead (see `georeader.dataset_pool`).
 
     Parameters
     -------------------
@@ -38,8 +64,20 @@ class RasterioReader:
     indexes: if not None it will read from each raster only the specified bands. This argument is 1-based as in rasterio
     overview_level: if not None, it will read from the corresponding pyramid level. This argument 0 based as in rasterio
      (None-> default resolution and 0 is the first overview).
-    check: check all paths are OK
+    check: check all paths are OK. The headers of the paths are probed concurrently.
     rio_env_options: GDAL options for reading. Defaults to: {RIO_ENV_OPTIONS_DEFAULT}
+    use_dataset_pool: if `True` the datasets are taken from the per-process pool of open handles
+        (`georeader.dataset_pool.get_dataset_pool()`) instead of being opened and closed in every call. The pool is
+        fork safe, so the reader can still be used from several processes.
+    num_workers: number of threads used to read the `paths` concurrently in the `read` method. GDAL releases the GIL
+        while decoding, so this speeds up reading stacks with many paths. Defaults to 1 (read the paths serially).
+    use_metadata_cache: if `True` the header metadata of the rasters is taken from the global
+        `georeader.metadata_cache.get_metadata_cache()` (no I/O when the same rasters are opened again).
+    block_cache: Optional `georeader.block_cache.BlockCache` to store the decoded blocks of the rasters. Reads of
+        overlapping windows reuse the cached blocks.
+    use_memmap: if `True`, uncompressed local GeoTIFFs are read with `np.memmap` without going through GDAL (see
+        `georeader.tiff_memmap`). Reads of a single striped file that do not need padding return read only views of
+        the memory map. Other layouts are read with GDAL.
 
     Attributes
     -------------------
@@ -62,7 +100,10 @@ class RasterioReader:
                  fill_value_default:Optional[Union[int, float]]=None,
                  stack:bool=True, indexes:Optional[List[int]]=None,
                  overview_level:Optional[int]=None, check:bool=True,
-                 rio_env_options:Optional[Dict[str, str]]=None):
+                 rio_env_options:Optional[Dict[str, str]]=None,
+                 use_dataset_pool:bool=False, num_workers:int=1,
+                 use_metadata_cache:bool=False, block_cache:Optional[BlockCache]=None,
+                 use_memmap:bool=False):
 
         # Syntactic sugar
         if isinstance(paths, str):
@@ -75,32 +116,41 @@ class RasterioReader:
             self.rio_env_options = rio_env_options
 
         self.paths = paths
+        self.use_dataset_pool = use_dataset_pool
+        assert num_workers >= 1, f"num_workers must be greater or equal than 1 found {num_workers}"
+        self.num_workers = num_workers
+        self.use_metadata_cache = use_metadata_cache
+        self.block_cache = block_cache
+        self.use_memmap = use_memmap
 
         self.stack = stack
 
         # TODO keep just a global nodata of size (T,C,) and fill with these values?
         self.fill_value_default = fill_value_default
         self.overview_level = overview_level
-        with rasterio.Env(**self.rio_env_options):
-            with rasterio.open(self.paths[0], "r", overview_level=overview_level) as src:
-                self.real_transform = src.transform
-                self.crs = src.crs
-                self.dtype = src.profile["dtype"]
-                self.real_count = src.count
-                self.real_indexes = list(range(1, self.real_count + 1))
-                if self.stack:
-                    self.real_shape = (len(self.paths), src.count,) + src.shape
-                else:
-                    self.real_shape = (len(self.paths) * self.real_count, ) + src.shape
+        metadata_paths = self._get_metadata_paths(self.paths if check else self.paths[:1])
+        metadata_first = metadata_paths[0]
+        self.real_transform = metadata_cache.metadata_transform(metadata_first)
+        self.crs = metadata_cache.metadata_crs(metadata_first)
+        self.dtype = metadata_first["dtype"]
+        self.real_count = metadata_first["count"]
+        self.real_indexes = list(range(1, self.real_count + 1))
+        real_spatial_shape = (metadata_first["height"], metadata_first["width"])
+        if self.stack:
+            self.real_shape = (len(self.paths), self.real_count,) + real_spatial_shape
+        else:
+            self.real_shape = (len(self.paths) * self.real_count, ) + real_spatial_shape
 
-                self.real_width = src.width
-                self.real_height = src.height
+        self.real_width = metadata_first["width"]
+        self.real_height = metadata_first["height"]
 
-                self.nodata = src.nodata
-                if self.fill_value_default is None:
-                    self.fill_value_default = self.nodata if (self.nodata is not None) else 0
+        self.nodata = metadata_first["nodata"]
+        if self.fill_value_default is None:
+            self.fill_value_default = self.nodata if (self.nodata is not None) else 0
 
-                self.res = src.res
+        self.res = tuple(metadata_first["res"])
+        self.real_scales = metadata_first.get("scales", [1.] * self.real_count)
+        self.real_offsets = metadata_first.get("offsets", [0.] * self.real_count)
 
         # if (abs(self.real_transform.b) > 1e-6) or (abs(self.real_transform.d) > 1e-6):
         #     warnings.warn(f"transform of {self.paths[0]} is not rectilinear {self.real_transform}. "
@@ -127,29 +177,82 @@ class RasterioReader:
         # Assert all paths have same tranform and crs
         #  (checking width and height will not be needed since we're reading with boundless option but I don't see the point to ignore it)
         if check:
-            for p in self.paths:
-                with rasterio.Env(**self.rio_env_options):
-                    with rasterio.open(p, "r", overview_level=overview_level) as src:
-                        if not src.transform == self.real_transform:
-                            raise ValueError(f"Different transform in {self.paths[0]} and {p}: {self.real_transform} {src.transform}")
-                        if not str(src.crs).lower() == str(self.crs).lower():
-                            raise ValueError(f"Different CRS in {self.paths[0]} and {p}: {self.crs} {src.crs}")
-                        if self.real_count != src.count:
-                            raise ValueError(f"Different number of bands in {self.paths[0]} and {p} {self.real_count} {src.count}")
-                        if src.nodata != self.nodata:
-                            warnings.warn(
-                                f"Different nodata in {self.paths[0]} and {p}: {self.nodata} {src.nodata}. This might lead to unexpected behaviour")
-
-                        if (self.real_width != src.width) or (self.real_height != src.height):
-                            if allow_different_shape:
-                                warnings.warn(f"Different shape in {self.paths[0]} and {p}: ({self.real_height}, {self.real_width}) ({src.height}, {src.width}) Might lead to unexpected behaviour")
-                            else:
-                                raise ValueError(f"Different shape in {self.paths[0]} and {p}: ({self.real_height}, {self.real_width}) ({src.height}, {src.width})")
+            for p, metadata in zip(self.paths, metadata_paths):
+                transform = metadata_cache.metadata_transform(metadata)
+                crs = metadata_cache.metadata_crs(metadata)
+                if not transform == self.real_transform:
+                    raise ValueError(f"Different transform in {self.paths[0]} and {p}: {self.real_transform} {transform}")
+                if not str(crs).lower() == str(self.crs).lower():
+                    raise ValueError(f"Different CRS in {self.paths[0]} and {p}: {self.crs} {crs}")
+                if self.real_count != metadata["count"]:
+                    raise ValueError(f"Different number of bands in {self.paths[0]} and {p} {self.real_count} {metadata['count']}")
+                if metadata["nodata"] != self.nodata:
+                    warnings.warn(
+                        f"Different nodata in {self.paths[0]} and {p}: {self.nodata} {metadata['nodata']}. This might lead to unexpected behaviour")
+
+                if (self.real_width != metadata["width"]) or (self.real_height != metadata["height"]):
+                    if allow_different_shape:
+                        warnings.warn(f"Different shape in {self.paths[0]} and {p}: ({self.real_height}, {self.real_width}) ({metadata['height']}, {metadata['width']}) Might lead to unexpected behaviour")
+                    else:
+                        raise ValueError(f"Different shape in {self.paths[0]} and {p}: ({self.real_height}, {self.real_width}) ({metadata['height']}, {metadata['width']})")
 
         self.check = check
         if indexes is not None:
             self.set_indexes(indexes)
 
+    @contextmanager
+    def _open(self, path:str, full_resolution:bool=False) -> Iterator[rasterio.DatasetReader]:
+        """
+        Opens the raster `path` with the GDAL options and overview level of the reader. If `self.use_dataset_pool` the
+        dataset is borrowed from the per-process pool otherwise it is opened and closed (process safe).
+
+        If `full_resolution` it opens the raster at its full resolution regardless of `self.overview_level`.
+        """
+        overview_level = None if full_resolution else self.overview_level
+        with tracing.gdal_env():
+            if self.use_dataset_pool:
+                with get_dataset_pool().open(path, overview_level=overview_level,
+                                             rio_env_options=self.rio_env_options) as src:
+                    yield src
+            else:
+                with rasterio.Env(**self.rio_env_options):
+                    with tracing.timed("open_time"):
+                        src = rasterio.open(path, "r", **open_options(overview_level))
+                    tracing.add(files_opened=1)
+                    with src:
+                        yield src
+
+    def _get_metadata(self, path:str, full_resolution:bool=False) -> Dict[str, Any]:
+        """ Returns the header metadata of `path` (see `georeader.metadata_cache.read_metadata`) """
+        if self.use_metadata_cache:
+            overview_level = None if full_resolution else self.overview_level
+            return metadata_cache.get_metadata_cache().get_or_read(path, overview_level,
+                                                                   partial(self._open, full_resolution=full_resolution))
+
+        with self._open(path, full_resolution=full_resolution) as src:
+            return metadata_cache.read_metadata(src)
+
+    def _get_metadata_paths(self, paths:List[str], full_resolution:bool=False) -> List[Dict[str, Any]]:
+        """ Returns the header metadata of all the `paths` probing them concurrently """
+        get_metadata = partial(self._get_metadata, full_resolution=full_resolution)
+        num_workers = min(NUM_WORKERS_CHECK, len(paths))
+        if num_workers <= 1:
+            metadata_paths = [get_metadata(p) for p in paths]
+        else:
+            with ThreadPoolExecutor(max_workers=num_workers) as executor:
+                metadata_paths = list(executor.map(tracing.bind(get_metadata), paths))
+
+        if self.use_metadata_cache:
+            metadata_cache.get_metadata_cache().flush()
+
+        return metadata_paths
+
+    def _reader_options(self) -> Dict[str, Any]:
+        """ Options that are propagated to the readers created from this object (`isel`, `read_from_window`, `copy`)"""
+        return dict(rio_env_options=self.rio_env_options, use_dataset_pool=self.use_dataset_pool,
+                    num_workers=self.num_workers, use_metadata_cache=self.use_metadata_cache,
+                    block_cache=self.block_cache, use_memmap=self.use_memmap)
+
     def set_indexes(self, indexes:List[int], relative:bool=True)-> None:
         """
         Set the channels to read. This is useful for processing only some channels of the raster. The indexes
@@ -233,10 +336,12 @@ class RasterioReader:
         If stack and len(self.paths) == 1 it returns just the dictionary of the tags
 
         """
-        tags = []
-        for i, p in enumerate(self.paths):
-            with rasterio.Env(**self.rio_env_options):
-                with rasterio.open(p, "r", overview_level=self.overview_level) as src:
+        if self.use_metadata_cache:
+            tags = [metadata["tags"] for metadata in self._get_metadata_paths(self.paths)]
+        else:
+            tags = []
+            for p in self.paths:
+                with self._open(p) as src:
                     tags.append(src.tags())
 
         if (not self.stack) and (len(tags) == 1):
@@ -251,12 +356,17 @@ class RasterioReader:
 
         If stack it returns just the List with the descriptions
         """
-        descriptions_all = []
-        for i, p in enumerate(self.paths):
-            with rasterio.Env(**self.rio_env_options):
-                with rasterio.open(p, "r") as src:
-                    desc = src.descriptions
+        if self.use_metadata_cache:
+            descriptions_paths = [metadata["descriptions"]
+                                  for metadata in self._get_metadata_paths(self.paths, full_resolution=True)]
+        else:
+            descriptions_paths = []
+            for p in self.paths:
+                with self._open(p, full_resolution=True) as src:
+                    descriptions_paths.append(src.descriptions)
 
+        descriptions_all = []
+        for desc in descriptions_paths:
             if self.stack:
                 descriptions_all.append([desc[i-1] for i in self.indexes])
             else:
@@ -282,12 +392,85 @@ class RasterioReader:
                                     allow_different_shape=self.allow_different_shape,
                                     window_focus=self.window_focus, fill_value_default=self.fill_value_default,
                                     stack=self.stack, overview_level=self.overview_level,
-                                    check=False)
+                                    check=False, **self._reader_options())
 
         rst_reader.set_window(window, relative=True, boundless=boundless)
         rst_reader.set_indexes(self.indexes, relative=False)
         return rst_reader
 
+    @property
+    def block_shape(self) -> Tuple[int, int]:
+        """ (height, width) of the internal blocks (tiles or strips) of the first raster at the current overview level """
+        return tuple(self._get_metadata(self.paths[0])["block_shapes"][0])
+
+    def overviews(self) -> List[int]:
+        """
+        Returns the decimation factors of the overviews of the rasters w.r.t. their full resolution (e.g. `[2, 4, 8]`).
+        The overview `overviews()[i]` is read with `overview_level=i`. Empty list if the rasters have no overviews.
+        """
+        return list(self._get_metadata(self.paths[0], full_resolution=True)["overviews"])
+
+    def overview_level_for_resolution(self, resolution_dst:Union[float, Tuple[float, float]]) -> Optional[int]:
+        """
+        Returns the coarsest overview level whose resolution is still at least as fine as `resolution_dst`. Only
+        levels coarser than the current `self.overview_level` are considered: if none of them is fine enough it
+        returns `self.overview_level`.
+
+        Args:
+            resolution_dst: target resolution in the crs of the reader.
+
+        Returns:
+            overview level (None is the full resolution)
+        """
+        if isinstance(resolution_dst, numbers.Number):
+            resolution_dst = (abs(resolution_dst), abs(resolution_dst))
+
+        # windows of other pyramid levels are computed from the bounds (only valid for rectilinear transforms)
+        if (abs(self.real_transform.b) > 1e-6) or (abs(self.real_transform.d) > 1e-6):
+            return self.overview_level
+
+        if self.overview_level is None:
+            if all(r_dst <= r for r, r_dst in zip(self.res, resolution_dst)):
+                # upsampling or same resolution: avoid probing the overviews
+                return self.overview_level
+            first_level = 0
+        else:
+            first_level = self.overview_level + 1
+
+        factors = self.overviews()
+        if first_level >= len(factors):
+            return self.overview_level
+
+        res_full = self._get_metadata(self.paths[0], full_resolution=True)["res"]
+        overview_level = self.overview_level
+        for level in range(first_level, len(factors)):
+            if all(r * factors[level] <= r_dst * (1 + 1e-6) for r, r_dst in zip(res_full, resolution_dst)):
+                overview_level = level
+            else:
+                break
+
+        return overview_level
+
+    def read_from_overview_level(self, overview_level:Optional[int]) -> '__class__':
+        """
+        Returns a new reader that reads from the pyramid level `overview_level`. The window focus of the new reader is
+        the smallest window of that level that covers `self.bounds`.
+
+        Args:
+            overview_level: overview level to read from (None is the full resolution)
+
+        Returns:
+            New reader object
+        """
+        rst_reader = RasterioReader(list(self.paths), allow_different_shape=self.allow_different_shape,
+                                    fill_value_default=self.fill_value_default,
+                                    stack=self.stack, overview_level=overview_level,
+                                    check=False, **self._reader_options())
+        window_focus = rasterio.windows.from_bounds(*self.bounds, transform=rst_reader.real_transform)
+        rst_reader.set_window(window_utils.round_outer_window(window_focus), relative=False)
+        rst_reader.set_indexes(self.indexes, relative=False)
+        return rst_reader
+
     def isel(self, sel: Dict[str, Union[slice, List[int], int]], boundless:bool=True) -> '__class__':
         """
         Creates a copy of the current RasterioReader slicing the data with a given selection dict. This function
@@ -362,7 +545,7 @@ class RasterioReader:
         rst_reader = RasterioReader(paths, allow_different_shape=self.allow_different_shape,
                                     window_focus=self.window_focus, fill_value_default=self.fill_value_default,
                                     stack=stack, overview_level=self.overview_level,
-                                    check=False)
+                                    check=False, **self._reader_options())
         window_current = rasterio.windows.Window.from_slices(*slice_, boundless=boundless,
                                                              width=self.width, height=self.height)
 
@@ -378,7 +561,7 @@ class RasterioReader:
         return RasterioReader(self.paths, allow_different_shape=self.allow_different_shape,
                               window_focus=self.window_focus, fill_value_default=self.fill_value_default,
                               stack=self.stack, overview_level=self.overview_level,
-                              check=False)
+                              check=False, **self._reader_options())
     
     def block_windows(self, bidx:int=1, time_idx:int=0) -> List[Tuple[int, rasterio.windows.Window]]:
         """
@@ -393,24 +576,48 @@ class RasterioReader:
             list of (block_idx, window)
 
         """
-        with rasterio.Env(**self.rio_env_options):
-            with rasterio.open(self.paths[time_idx]) as src:
-                windows_return = [(block_idx, rasterio.windows.intersection(window, self.window_focus)) for block_idx, window in src.block_windows(bidx) if rasterio.windows.intersect(self.window_focus, window)]
+        with self._open(self.paths[time_idx]) as src:
+            windows_return = [(block_idx, rasterio.windows.intersection(window, self.window_focus)) for block_idx, window in src.block_windows(bidx) if rasterio.windows.intersect(self.window_focus, window)]
 
         return windows_return
 
+    def to_dask(self, chunks:Optional[Tuple[int, int]]=None) -> 'dask.array.Array':
+        """
+        Returns a dask array that reads the data of the reader by chunks (see `dask_utils.to_dask`).
+
+        Args:
+            chunks: Optional. (height, width) of the chunks. Defaults to multiples of the internal blocks of the file
+                aligned with them.
+
+        Returns:
+            dask array with the shape and dtype of the reader
+        """
+        from georeader import dask_utils
+        return dask_utils.to_dask(self, chunks=chunks)
+
     def copy(self) -> '__class__':
         return self.__copy__()
 
-    def load(self, boundless:bool=True) -> geotensor.GeoTensor:
+    def load(self, boundless:bool=True, out:Optional[np.ndarray]=None, dtype:Optional[Any]=None,
+             scale:Optional[Union[float, np.ndarray]]=None, offset:Optional[Union[float, np.ndarray]]=None,
+             use_file_scale_offset:bool=False) -> geotensor.GeoTensor:
         """
         Load all raster in memory in an GeoTensor object
 
+        Args:
+            boundless: read in boundless mode (see `read`)
+            out: Optional array to write the data into (see `read`)
+            dtype: dtype of the output (see `read`)
+            scale: scale to apply to the values (see `read`)
+            offset: offset to apply to the values (see `read`)
+            use_file_scale_offset: apply the scales and offsets stored in the rasters (see `read`)
+
         Returns:
             GeoTensor with geographic info
 
         """
-        np_data = self.read(boundless=boundless)
+        np_data = self.read(boundless=boundless, out=out, dtype=dtype, scale=scale, offset=offset,
+                            use_file_scale_offset=use_file_scale_offset)
         if boundless:
             transform = self.transform
         else:
@@ -459,21 +666,221 @@ class RasterioReader:
          fill_value_default: {self.fill_value_default}
         """
 
+    @tracing.traced("RasterioReader.read")
     def read(self, **kwargs) -> np.ndarray:
         """
         Read data from the list of rasters. It reads with boundless=True by default and
         fill_value=self.fill_value_default by default.
 
-        This function is process safe (opens and closes the rasterio object every time is called).
+        This function is process safe (opens and closes the rasterio object every time is called). If
+        `self.use_dataset_pool` the open datasets are reused from the per-process pool. If `self.num_workers > 1` the
+        paths are read concurrently in a pool of threads.
 
         For arguments see: https://rasterio.readthedocs.io/en/latest/api/rasterio.io.html#rasterio.io.DatasetReader.read
 
+        The `out` argument is handled by this function: it should be an array with the shape of the output (e.g. a
+        preallocated slot of a batch or an array in shared memory). The data will be written there without extra
+        copies.
+
+        The `dtype`, `scale`, `offset` and `use_file_scale_offset` arguments are also handled by this function. They
+        are applied to the data of each path as it is read, into the output array, to avoid the full size temporaries
+        of `reader.read().astype(np.float32) * scale + offset`:
+
+        * dtype: dtype of the output. Defaults to `np.float32` if `scale` or `offset` are given, otherwise to
+          `self.dtype`.
+        * scale, offset: the output is `value * scale + offset`. They can be numbers or arrays with one value per band
+          read.
+        * use_file_scale_offset: apply the scales and offsets stored in the rasters (GDAL band metadata). Only the
+          values of the first path are used.
+
+        If any of them is given, pixels equal to `self.nodata` are set to `self.fill_value_default` in the output
+        (nodata is compared after casting to `dtype`).
+
         Returns:
             if self.stack:
                 4D np.ndarray with shape (len(paths), C, H, W)
             if self.stack is False:
                 3D np.ndarray with shape (len(paths)*C, H, W)
         """
+        out = kwargs.pop("out", None)
+        read_plan = self._read_plan(kwargs)
+        if read_plan is None:
+            return None
+
+        if (out is None) and (len(self.paths) == 1) and (read_plan.window_memmap == read_plan.window) and \
+                (read_plan.postprocess is None):
+            # No padding needed: return a view of the memory map if the file is striped
+            tiff_mm = get_tiff_memmap(self.paths[0])
+            if (tiff_mm is not None) and tiff_mm.is_view:
+                return tiff_mm.read(read_plan.window_memmap, read_plan.indexes).reshape(read_plan.shape_return)
+
+        out, obj_out = self._allocate_out(read_plan, out)
+        self._read_plans([(read_plan, obj_out)])
+
+        return out
+
+    @tracing.traced("RasterioReader.read_windows")
+    def read_windows(self, windows:List[rasterio.windows.Window], boundless:bool=True,
+                     indexes:Optional[Union[List[int], int]]=None) -> Union[np.ndarray, List[Optional[np.ndarray]]]:
+        """
+        Reads a list of windows opening each path only once. Windows are read in row-major order in each file to
+        improve locality. Windows are relative to `self.window_focus` and the padding is the same as in `read`.
+
+        Args:
+            windows: list of windows to read.
+            boundless: read in boundless mode (see `read`)
+            indexes: 1-based bands to read relative to `self.indexes` (see `read`)
+
+        Returns:
+            np.ndarray with shape `(len(windows),) + shape` where `shape` is the shape of the array returned by `read`.
+            If the windows have different shapes (or boundless is False and some window does not intersect the raster)
+            it returns a list with the arrays of each window (None for windows that do not intersect the raster).
+        """
+        read_plans = [self._read_plan(dict(window=w, boundless=boundless, indexes=indexes)) for w in windows]
+        shapes = set(rp.shape_return for rp in read_plans if rp is not None)
+        if (len(shapes) == 1) and all(rp is not None for rp in read_plans):
+            result = np.empty((len(windows),) + shapes.pop(), dtype=self.dtype)
+            outs = [self._allocate_out(rp, result[k]) for k, rp in enumerate(read_plans)]
+        else:
+            outs = [self._allocate_out(rp) if rp is not None else (None, None) for rp in read_plans]
+            result = [o[0] for o in outs]
+
+        order = [k for k in sorted(range(len(read_plans)),
+                                   key=lambda k: (read_plans[k].window.row_off, read_plans[k].window.col_off)
+                                   if read_plans[k] is not None else (0, 0))
+                 if (read_plans[k] is not None) and (read_plans[k].read_src is not None)]
+
+        self._read_plans([(read_plans[k], outs[k][1]) for k in order])
+
+        return result
+
+    def load_windows(self, windows:List[rasterio.windows.Window],
+                     boundless:bool=True) -> List[Optional[geotensor.GeoTensor]]:
+        """
+        Loads a list of windows opening each path only once (see `read_windows`).
+
+        Args:
+            windows: list of windows to read relative to `self.window_focus`.
+            boundless: read in boundless mode
+
+        Returns:
+            List of GeoTensors (None for windows that do not intersect the raster if boundless is False)
+        """
+        data_windows = self.read_windows(windows, boundless=boundless)
+        geotensors = []
+        for window, data in zip(windows, data_windows):
+            if data is None:
+                geotensors.append(None)
+                continue
+            if boundless:
+                transform = rasterio.windows.transform(window, self.transform)
+            else:
+                window_real = rasterio.windows.Window(col_off=window.col_off + self.window_focus.col_off,
+                                                      row_off=window.row_off + self.window_focus.row_off,
+                                                      height=window.height, width=window.width)
+                window_real = rasterio.windows.intersection(window_real, self.real_window)
+                transform = rasterio.windows.transform(window_real, self.real_transform)
+            geotensors.append(geotensor.GeoTensor(data, transform=transform, crs=self.crs,
+                                                  fill_value_default=self.fill_value_default))
+        return geotensors
+
+    async def aread(self, window:Optional[rasterio.windows.Window]=None, boundless:bool=True,
+                    indexes:Optional[Union[List[int], int]]=None, timeout:Optional[float]=None) -> np.ndarray:
+        """
+        asyncio version of `read`. The read runs in the bounded pool of threads of `georeader.aio` and concurrent
+        identical requests share one underlying read (do not modify the returned array in place).
+
+        Args:
+            window: window to read relative to `self.window_focus` (see `read`)
+            boundless: read in boundless mode (see `read`)
+            indexes: 1-based bands to read relative to `self.indexes` (see `read`)
+            timeout: Optional timeout in seconds. Raises `asyncio.TimeoutError` if exceeded.
+
+        Returns:
+            same as `read`
+        """
+        return await aio.run_coalesced(aio.read_key(self, "read", window=window, boundless=boundless, indexes=indexes),
+                                       partial(self.read, window=window, boundless=boundless, indexes=indexes),
+                                       timeout=timeout)
+
+    async def aload(self, boundless:bool=True, timeout:Optional[float]=None) -> geotensor.GeoTensor:
+        """ asyncio version of `load` (see `aread`) """
+        return await aio.run_coalesced(aio.read_key(self, "load", boundless=boundless),
+                                       partial(self.load, boundless=boundless), timeout=timeout)
+
+    async def aread_windows(self, windows:List[rasterio.windows.Window], boundless:bool=True,
+                            indexes:Optional[Union[List[int], int]]=None,
+                            timeout:Optional[float]=None) -> Union[np.ndarray, List[Optional[np.ndarray]]]:
+        """ asyncio version of `read_windows` (see `aread`) """
+        key = ("read_windows", aio.reader_key(self), tuple(aio.window_key(w) for w in windows), boundless,
+               tuple(indexes) if isinstance(indexes, list) else indexes)
+        return await aio.run_coalesced(key, partial(self.read_windows, windows, boundless=boundless, indexes=indexes),
+                                       timeout=timeout)
+
+    def _map_paths(self, read_path:Callable[[int, str], None]) -> None:
+        """ Calls `read_path(i, p)` for all the paths. Concurrently in a pool of threads if `self.num_workers > 1` """
+        num_workers = min(self.num_workers, len(self.paths))
+        if num_workers <= 1:
+            for i, p in enumerate(self.paths):
+                read_path(i, p)
+        else:
+            # Each path writes in its own slice of obj_out
+            read_path = tracing.bind(read_path)
+            with ThreadPoolExecutor(max_workers=num_workers) as executor:
+                futures = [executor.submit(read_path, i, p) for i, p in enumerate(self.paths)]
+                for future in futures:
+                    future.result()
+
+    def _read_plans(self, read_plans_out:List[Tuple[_ReadPlan, np.ndarray]]) -> None:
+        """
+        Reads the plans (in order) writing each one in its 4D output array. Each path is opened at most once. The
+        plans are read from the memory map of the file if possible (`use_memmap`) otherwise with GDAL.
+        """
+        read_plans_out = [(rp, obj_out) for rp, obj_out in read_plans_out if rp.read_src is not None]
+        if len(read_plans_out) == 0:
+            return
+
+        def read_path(i:int, p:str) -> None:
+            read_plans_gdal = read_plans_out
+            if any(rp.window_memmap is not None for rp, _ in read_plans_out):
+                tiff_mm = get_tiff_memmap(p)
+                if tiff_mm is not None:
+                    read_plans_gdal = []
+                    for read_plan, obj_out in read_plans_out:
+                        if read_plan.window_memmap is None:
+                            read_plans_gdal.append((read_plan, obj_out))
+                            continue
+                        # Position of the intersection with the raster in the output (the rest is padding)
+                        window_mm = read_plan.window_memmap
+                        row_start = int(window_mm.row_off - read_plan.window.row_off)
+                        col_start = int(window_mm.col_off - read_plan.window.col_off)
+                        slice_out = (i, slice(None), slice(row_start, row_start + int(window_mm.height)),
+                                     slice(col_start, col_start + int(window_mm.width)))
+                        with tracing.timed("read_time"):
+                            obj_out[slice_out] = tiff_mm.read(window_mm, read_plan.indexes)
+
+            if len(read_plans_gdal) > 0:
+                with self._open(p) as src:
+                    for read_plan, obj_out in read_plans_gdal:
+                        read_plan.read_src(i, p, src, obj_out)
+
+            for read_plan, obj_out in read_plans_out:
+                if read_plan.postprocess is not None:
+                    read_plan.postprocess(obj_out[i])
+
+        self._map_paths(read_path)
+
+    def _read_plan(self, kwargs:Dict[str, Any]) -> Optional[_ReadPlan]:
+        """
+        Computes the window, bands and shape to read from the kwargs of the `read` method.
+
+        Returns:
+            `_ReadPlan` or None if the window does not intersect the raster and the read is not boundless.
+        """
+        dtype = kwargs.pop("dtype", None)
+        scale = kwargs.pop("scale", None)
+        offset = kwargs.pop("offset", None)
+        use_file_scale_offset = kwargs.pop("use_file_scale_offset", False)
 
         if ("window" in kwargs) and kwargs["window"] is not None:
             window_read = kwargs["window"]
@@ -531,57 +938,248 @@ class RasterioReader:
 
         shape = (len(self.paths), n_bands_read) + spatial_shape
 
-        obj_out = np.full(shape, kwargs["fill_value"], dtype=self.dtype)
+        # Shape of the returned array
+        if self.stack:
+            shape_return = shape[:1] + shape[2:] if flat_channels else shape
+        elif len(self.paths) == 1:
+            shape_return = shape[2:] if flat_channels else shape[1:]
+        else:
+            shape_return = (len(self.paths) * n_bands_read,) + spatial_shape
+
+        if use_file_scale_offset:
+            assert (scale is None) and (offset is None), "scale and offset can't be given with use_file_scale_offset"
+            scale = np.array([self.real_scales[i - 1] for i in kwargs["indexes"]])
+            offset = np.array([self.real_offsets[i - 1] for i in kwargs["indexes"]])
+
+        if dtype is None:
+            dtype = np.float32 if (scale is not None) or (offset is not None) else self.dtype
+
+        fill_value = kwargs["fill_value"]
+        window_memmap = None
+        postprocess = None
+        read_src = None
         if rasterio.windows.intersect([self.real_window, window]):
-            pad = None
-            if kwargs["boundless"]:
-                slice_, pad = get_slice_pad(self.real_window, window)
-                need_pad = any(x != 0 for x in pad["x"] + pad["y"])
-
-                #  read and pad instead of using boundless attribute when transform is not rectilinear (otherwise rasterio fails!)
-                if (abs(self.real_transform.b) > 1e-6) or (abs(self.real_transform.d) > 1e-6):
-                    if need_pad:
-                        assert kwargs.get("out_shape", None) is None, "out_shape not compatible with boundless and non rectilinear transform!"
-                        kwargs["window"] = rasterio.windows.Window.from_slices(slice_["y"], slice_["x"])
-                        kwargs["boundless"] = False
-                    else:
-                        kwargs["boundless"] = False
+            native_read = self._is_native_read(window, kwargs)
+            if self.use_memmap and (self.overview_level is None) and native_read:
+                window_memmap = rasterio.windows.intersection(self.real_window, window)
+
+            if (np.dtype(dtype) != np.dtype(self.dtype)) or (scale is not None) or (offset is not None):
+                if native_read:
+                    # Only the data read from the raster is modified (padding is already fill_value)
+                    window_in = rasterio.windows.intersection(self.real_window, window)
+                    row_start = int(window_in.row_off - window.row_off)
+                    col_start = int(window_in.col_off - window.col_off)
+                    region = (slice(None), slice(row_start, row_start + int(window_in.height)),
+                              slice(col_start, col_start + int(window_in.width)))
                 else:
-                    #  if transform is rectilinear read boundless if needed
-                    kwargs["boundless"] = need_pad
-                    pad = None
+                    region = (slice(None), slice(0, None), slice(0, None))
+                # GDAL fills with a value of the dtype of the raster, the output is filled by `postprocess`
+                kwargs["fill_value"] = self.nodata if self.nodata is not None else 0
+                postprocess = partial(_scale_offset, region=region, scale=scale, offset=offset, nodata=self.nodata,
+                                      fill_value=fill_value)
+                if (not native_read) and (rasterio.windows.intersection(self.real_window, window) != window):
+                    # The padding can't be found by value (valid pixels may be equal to the GDAL fill value)
+                    read_src = self._read_src_masked_fn(kwargs, window, postprocess)
+                    postprocess = None
+
+            if read_src is None:
+                read_src = self._read_src_fn(kwargs, window)
+        else:
+            read_src = None
 
-            for i, p in enumerate(self.paths):
-                with rasterio.Env(**self.rio_env_options):
-                    with rasterio.open(p, "r", overview_level=self.overview_level) as src:
-                        # rasterio.read API: https://rasterio.readthedocs.io/en/latest/api/rasterio.io.html#rasterio.io.DatasetReader.read
-                        read_data = src.read(**kwargs)
-
-                        # Add pad when reading
-                        if pad is not None and need_pad:
-                            slice_y = slice(pad["y"][0], -pad["y"][1] if pad["y"][1] !=0 else None)
-                            slice_x = slice(pad["x"][0], -pad["x"][1] if pad["x"][1] !=0 else None)
-                            obj_out[i, :, slice_y, slice_x] = read_data
-                        else:
-                            obj_out[i] = read_data
-                            # pad_list_np = _get_pad_list(pad)
-                        #
-                        # read_data = np.pad(read_data, tuple(pad_list_np), mode="constant",
-                        #                    constant_values=self.fill_value_default)
-
-
-
-        if flat_channels:
-            obj_out = obj_out[:, 0]
-
-        if not self.stack:
-            if obj_out.shape[0] == 1:
-                obj_out = obj_out[0]
+        return _ReadPlan(shape=shape, shape_return=shape_return, fill_value=fill_value,
+                         window=window, read_src=read_src, window_memmap=window_memmap,
+                         indexes=list(kwargs["indexes"]), dtype=dtype, postprocess=postprocess)
+
+    def _allocate_out(self, read_plan:_ReadPlan, out:Optional[np.ndarray]=None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Allocates (or checks) the output array filled with `fill_value`.
+
+        Returns:
+            out array and its 4D view (obj_out[i] is the (C, H, W) slot of self.paths[i])
+        """
+        if out is None:
+            out = np.full(read_plan.shape_return, read_plan.fill_value, dtype=read_plan.dtype)
+        else:
+            if tuple(out.shape) != read_plan.shape_return:
+                raise ValueError(f"Expected out array with shape {read_plan.shape_return} found {out.shape}")
+            out[...] = read_plan.fill_value
+
+        obj_out = out.reshape(read_plan.shape)
+        if (out.size > 0) and not np.may_share_memory(obj_out, out):
+            raise ValueError(f"out array can't be viewed with shape {read_plan.shape} without copying. Provide a contiguous array")
+
+        return out, obj_out
+
+    def _read_src_masked_fn(self, kwargs:Dict[str, Any], window:rasterio.windows.Window,
+                            postprocess:Callable[..., None]) -> Callable[[int, str, rasterio.DatasetReader, np.ndarray], None]:
+        """
+        Returns the function `read_src(i, p, src, obj_out)` that reads `window` and its boundless mask from the open
+        raster `src` and applies `postprocess(obj_out[i], invalid=...)` with the pixels outside the raster (or masked)
+        as invalid.
+        """
+        kwargs_mask = {k: v for k, v in kwargs.items() if k != "fill_value"}
+        read_data = self._read_src_fn(kwargs, window)
+        read_mask = self._read_src_fn(kwargs_mask, window, masks=True)
+
+        def read_src(i:int, p:str, src:rasterio.DatasetReader, obj_out:np.ndarray) -> None:
+            read_data(i, p, src, obj_out)
+            mask = np.zeros((1,) + obj_out.shape[1:], dtype=np.uint8)
+            read_mask(0, p, src, mask)
+            postprocess(obj_out[i], invalid=mask[0] == 0)
+
+        return read_src
+
+    def _read_src_fn(self, kwargs:Dict[str, Any], window:rasterio.windows.Window,
+                     masks:bool=False) -> Callable[[int, str, rasterio.DatasetReader, np.ndarray], None]:
+        """
+        Returns the function `read_src(i, p, src, obj_out)` that reads `window` from the open raster `src`
+        of the path `p` and writes it in `obj_out[i]`. If `masks` it reads the masks of the bands instead
+        (`src.read_masks`, 0 outside the raster).
+        """
+        if self._can_read_from_block_cache(window, kwargs):
+            # Read the intersection with the raster from the cached blocks and place it in the output
+            slice_, pad = get_slice_pad(self.real_window, window)
+            window_in = rasterio.windows.Window.from_slices(slice_["y"], slice_["x"])
+            slice_y = slice(pad["y"][0], pad["y"][0] + window_in.height)
+            slice_x = slice(pad["x"][0], pad["x"][0] + window_in.width)
+            indexes = kwargs["indexes"]
+
+            def read_src(i:int, p:str, src:rasterio.DatasetReader, obj_out:np.ndarray) -> None:
+                with tracing.timed("read_time"):
+                    obj_out[i, :, slice_y, slice_x] = self._read_from_block_cache(src, p, window_in, indexes)
+
+            return read_src
+
+        pad = None
+        need_pad = False
+        if kwargs["boundless"]:
+            slice_, pad = get_slice_pad(self.real_window, window)
+            need_pad = any(x != 0 for x in pad["x"] + pad["y"])
+
+            #  read and pad instead of using boundless attribute when transform is not rectilinear (otherwise rasterio fails!)
+            if (abs(self.real_transform.b) > 1e-6) or (abs(self.real_transform.d) > 1e-6):
+                if need_pad:
+                    assert kwargs.get("out_shape", None) is None, "out_shape not compatible with boundless and non rectilinear transform!"
+                    kwargs["window"] = rasterio.windows.Window.from_slices(slice_["y"], slice_["x"])
+                    kwargs["boundless"] = False
+                else:
+                    kwargs["boundless"] = False
+            else:
+                #  if transform is rectilinear read boundless if needed
+                kwargs["boundless"] = need_pad
+                pad = None
+
+        def read_src(i:int, p:str, src:rasterio.DatasetReader, obj_out:np.ndarray) -> None:
+            # rasterio.read API: https://rasterio.readthedocs.io/en/latest/api/rasterio.io.html#rasterio.io.DatasetReader.read
+            with tracing.timed("read_time"):
+                read_data = src.read_masks(**kwargs) if masks else src.read(**kwargs)
+
+            # Add pad when reading
+            if pad is not None and need_pad:
+                slice_y = slice(pad["y"][0], -pad["y"][1] if pad["y"][1] !=0 else None)
+                slice_x = slice(pad["x"][0], -pad["x"][1] if pad["x"][1] !=0 else None)
+                obj_out[i, :, slice_y, slice_x] = read_data
             else:
-                obj_out = np.concatenate([obj_out[i] for i in range(obj_out.shape[0])],
-                                         axis=0)
+                obj_out[i] = read_data
+
+        return read_src
+
+
+    def _can_read_from_block_cache(self, window:rasterio.windows.Window, kwargs:Dict[str, Any]) -> bool:
+        """ The block cache is used for reads of integer windows at the native resolution of the raster """
+        if self.block_cache is None:
+            return False
+        return self._is_native_read(window, kwargs)
+
+    @staticmethod
+    def _is_native_read(window:rasterio.windows.Window, kwargs:Dict[str, Any]) -> bool:
+        """ Whether the read is an integer window at the native resolution without other GDAL options """
+        if kwargs.get("out_shape", None) is not None:
+            return False
+        if any(k not in {"window", "boundless", "fill_value", "indexes", "out_shape"} for k in kwargs):
+            return False
+        return all(float(v).is_integer() for v in (window.col_off, window.row_off, window.width, window.height))
+
+    def _read_from_block_cache(self, src:rasterio.DatasetReader, path:str, window:rasterio.windows.Window,
+                               indexes:List[int]) -> np.ndarray:
+        """
+        Reads `window` (contained in `self.real_window`) of the open raster `src` from the decoded blocks of the
+        `block_cache`. The blocks that are not in the cache are read and added to it.
+
+        Returns:
+            np.ndarray with shape (len(indexes), window.height, window.width)
+        """
+        block_height, block_width = src.block_shapes[0]
+        row_off, col_off = int(window.row_off), int(window.col_off)
+        height, width = int(window.height), int(window.width)
+        data = np.empty((len(indexes), height, width), dtype=self.dtype)
+        bands = list(dict.fromkeys(indexes))
+
+        for block_row in range(row_off // block_height, (row_off + height - 1) // block_height + 1):
+            for block_col in range(col_off // block_width, (col_off + width - 1) // block_width + 1):
+                block_window = rasterio.windows.Window(col_off=block_col * block_width,
+                                                       row_off=block_row * block_height,
+                                                       width=min(block_width, self.real_width - block_col * block_width),
+                                                       height=min(block_height, self.real_height - block_row * block_height))
+                keys = {b: (path, self.overview_level, b, block_row, block_col) for b in bands}
+                blocks = {b: self.block_cache.get(keys[b]) for b in bands}
+                missing = [b for b in bands if blocks[b] is None]
+                if len(missing) > 0:
+                    data_missing = src.read(indexes=missing, window=block_window)
+                    for b, block in zip(missing, data_missing):
+                        blocks[b] = block
+                        self.block_cache.put(keys[b], block)
+
+                # Intersection of the block with the window in block coordinates and in window coordinates
+                row_start = max(row_off, block_window.row_off)
+                row_end = min(row_off + height, block_window.row_off + block_window.height)
+                col_start = max(col_off, block_window.col_off)
+                col_end = min(col_off + width, block_window.col_off + block_window.width)
+                slice_block = (slice(row_start - block_window.row_off, row_end - block_window.row_off),
+                               slice(col_start - block_window.col_off, col_end - block_window.col_off))
+                slice_data = (slice(row_start - row_off, row_end - row_off),
+                              slice(col_start - col_off, col_end - col_off))
+                for i_band, b in enumerate(indexes):
+                    data[(i_band,) + slice_data] = blocks[b][slice_block]
+
+        return data
+
+def _scale_offset(data:np.ndarray, region:Tuple[slice, ...], scale:Optional[Union[float, np.ndarray]],
+                  offset:Optional[Union[float, np.ndarray]], nodata:Optional[Union[int, float]],
+                  fill_value:Union[int, float], invalid:Optional[np.ndarray]=None) -> None:
+    """
+    Applies `data[region] * scale + offset` in place to the (C, H, W) array `data`. Pixels equal to `nodata`, pixels
+    where the (C, H, W) boolean mask `invalid` is True and pixels outside `region` are set to `fill_value`.
+    """
+    _, slice_rows, slice_cols = region
+    data[:, :slice_rows.start] = fill_value
+    data[:, :, :slice_cols.start] = fill_value
+    if slice_rows.stop is not None:
+        data[:, slice_rows.stop:] = fill_value
+    if slice_cols.stop is not None:
+        data[:, :, slice_cols.stop:] = fill_value
+
+    data_region = data[region]
+    invalid_region = None if invalid is None else invalid[region]
+    if nodata is not None:
+        invalid_nodata = np.isnan(data_region) if np.isnan(nodata) else (data_region == nodata)
+        invalid_region = invalid_nodata if invalid_region is None else (invalid_region | invalid_nodata)
+
+    if scale is not None:
+        scale = np.asarray(scale)
+        if scale.ndim == 1:
+            scale = scale[:, None, None]
+        np.multiply(data_region, scale, out=data_region, casting="unsafe")
+    if offset is not None:
+        offset = np.asarray(offset)
+        if offset.ndim == 1:
+            offset = offset[:, None, None]
+        np.add(data_region, offset, out=data_region, casting="unsafe")
+
+    if invalid_region is not None:
+        data_region[invalid_region] = fill_value
 
-        return obj_out
 
 def _get_pad_list(pad_width:Dict[str,Tuple[int,int]]):
     pad_list_np = [(0, 0)]
@@ -598,11 +1196,14 @@ def read_out_shape(reader:Union[RasterioReader, rasterio.DatasetReader],
                    indexes:Optional[Union[List[int], int]]=None,
                    window:Optional[rasterio.windows.Window]=None,
                    out_shape:Optional[Tuple[int, int]]=None,
-                   fill_value_default:int=0) -> geotensor.GeoTensor:
+                   fill_value_default:int=0, use_overviews:bool=True) -> geotensor.GeoTensor:
     """
     Reads data using the `out_shape` param of rasterio. This allows to read from the pyramids if the file is a COG.
     This function returns an xarray with the data with its geographic metadata.
 
+    If `reader` is a `RasterioReader` and `use_overviews` the data is read from the coarsest overview level whose
+    resolution is at least the resolution of the output (see `RasterioReader.overview_level_for_resolution`).
+
     Args:
         reader: RasterioReader, rasterio.DatasetReader
         size_read: if out_shape is None it uses this to compute the size to read that maintains the aspect ratio
@@ -611,6 +1212,8 @@ def read_out_shape(reader:Union[RasterioReader, rasterio.DatasetReader],
         out_shape: shape of the output to be readed. Conceptually, the function resizes the output to this shape
         fill_value_default: if the object is rasterio.DatasetReader and nodata is None it will use this value for the
         corresponding GeoTensor
+        use_overviews: choose the overview level to read from if `reader` is a `RasterioReader`. Otherwise the choice
+            of the pyramid level is left to GDAL.
 
     Returns:
         GeoTensor with geo metadata
@@ -642,6 +1245,15 @@ def read_out_shape(reader:Union[RasterioReader, rasterio.DatasetReader],
         # transform = rasterio.Affine(transform.a * input_output_factor[1], transform.b, transform.c,
         #                             transform.d, transform.e * input_output_factor[0], transform.f)
 
+        if use_overviews and hasattr(reader, "overview_level_for_resolution"):
+            overview_level = reader.overview_level_for_resolution((abs(transform.a), abs(transform.e)))
+            if overview_level != reader.overview_level:
+                # Same geographic window in the pixels of the overview
+                if window is None:
+                    window = rasterio.windows.Window(row_off=0, col_off=0, width=shape[1], height=shape[0])
+                bounds_read = window_bounds(window, reader.transform)
+                reader = reader.read_from_overview_level(overview_level)
+                window = rasterio.windows.from_bounds(*bounds_read, transform=reader.transform)
 
     output = reader.read(indexes=indexes, out_shape=out_shape, window=window)
 
@@ -5,14 +5,18 @@ import rasterio.features
 import numbers
 import numpy as np
 from math import ceil
-from typing import Tuple, Union, Optional, Dict, Any
+from typing import Tuple, Union, Optional, Dict, Any, List
 from collections import OrderedDict
-import itertools
+import inspect
+import os
+from concurrent.futures import ThreadPoolExecutor
 from georeader.geotensor import GeoTensor
 from georeader import window_utils
+from georeader import tracing
+from georeader import reprojection_plan
+from georeader import integer_resampling
 from georeader.window_utils import PIXEL_PRECISION, pad_window, round_outer_window, _is_exact_round
 from georeader.abstract_reader import GeoData
-from itertools import product
 from shapely.geometry import Polygon, MultiPolygon
 
 
@@ -144,10 +148,187 @@ def window_from_center_coords(data_in: GeoData, center_coords:Tuple[float, float
     return window
 
 
+# dtype of the arrays of windows returned by the batch functions (`windows_from_center_coords`,
+# `windows_from_bounds` and `windows_from_polygons`). Use `windows_to_list` to get `rasterio.windows.Window` objects.
+WINDOW_DTYPE = np.dtype([("col_off", np.float64), ("row_off", np.float64),
+                         ("width", np.float64), ("height", np.float64)])
+
+
+def windows_to_list(windows:np.ndarray) -> List[rasterio.windows.Window]:
+    """ Converts an array of `WINDOW_DTYPE` to a list of `rasterio.windows.Window` """
+    return [rasterio.windows.Window(col_off=col_off, row_off=row_off, width=width, height=height)
+            for col_off, row_off, width, height in windows.tolist()]
+
+
+def _windows_array(col_off:np.ndarray, row_off:np.ndarray, width:np.ndarray, height:np.ndarray) -> np.ndarray:
+    windows = np.empty(len(col_off), dtype=WINDOW_DTYPE)
+    windows["col_off"] = col_off
+    windows["row_off"] = row_off
+    windows["width"] = width
+    windows["height"] = height
+    return windows
+
+
+def _transform_coords(xs:np.ndarray, ys:np.ndarray, crs_input:Any, crs_output:Any) -> Tuple[np.ndarray, np.ndarray]:
+    """ Transforms the coordinates `xs`, `ys` from `crs_input` to `crs_output` in a single PROJ call """
+    if (crs_input is None) or window_utils.compare_crs(crs_input, crs_output) or (len(xs) == 0):
+        return xs, ys
+    xs_out, ys_out = rasterio.warp.transform(crs_input, crs_output, xs, ys)
+    return np.asarray(xs_out, dtype=np.float64), np.asarray(ys_out, dtype=np.float64)
+
+
+def _to_pixel(transform:rasterio.Affine, xs:np.ndarray, ys:np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """ Vectorized `~transform * (x, y)`: returns fractional (cols, rows) """
+    transform_inv = ~transform
+    return transform_inv.a * xs + transform_inv.b * ys + transform_inv.c, \
+           transform_inv.d * xs + transform_inv.e * ys + transform_inv.f
+
+
+def windows_from_center_coords(data_in: GeoData, center_coords:Any, shape:Tuple[int, int],
+                               crs_center_coords:Optional[Any]=None) -> np.ndarray:
+    """
+    Batch version of `window_from_center_coords`: all the coordinates are transformed in a single PROJ call.
+
+    Args:
+        data_in: Reader with crs and transform attributes
+        center_coords: (N, 2) array with the (x, y) center coords or `geopandas.GeoSeries` of points.
+        shape: Tuple with shape to read (H, W) format
+        crs_center_coords: Optional coordinate reference system of the coords. If not provided it uses the crs of the
+            GeoSeries or assumes the same crs as `data_in`.
+
+    Returns:
+        (N,) array of `WINDOW_DTYPE` with the windows centered on `center_coords`
+    """
+    if hasattr(center_coords, "geometry"):
+        if crs_center_coords is None:
+            crs_center_coords = center_coords.crs
+        center_coords = np.stack([center_coords.x.values, center_coords.y.values], axis=1)
+
+    center_coords = np.asarray(center_coords, dtype=np.float64).reshape((-1, 2))
+    xs, ys = _transform_coords(center_coords[:, 0], center_coords[:, 1], crs_center_coords, data_in.crs)
+    cols, rows = _to_pixel(data_in.transform, xs, ys)
+
+    n = len(cols)
+    return _windows_array(np.round(cols - shape[1] / 2), np.round(rows - shape[0] / 2),
+                          np.full(n, shape[1], dtype=np.float64), np.full(n, shape[0], dtype=np.float64))
+
+
+def windows_from_bounds(data_in: GeoData, bounds:Any, crs_bounds:Optional[Any]=None,
+                        densify_pts:int=21) -> np.ndarray:
+    """
+    Batch version of `window_from_bounds`: the boundaries of all the bounds are transformed in a single PROJ call.
+
+    Args:
+        data_in: Reader with crs and transform attributes
+        bounds: (N, 4) array of bounds (minx, miny, maxx, maxy) or `geopandas.GeoSeries` (its `bounds` are used).
+        crs_bounds: Optional coordinate reference system of the bounds. If not provided it uses the crs of the
+            GeoSeries or assumes the same crs as `data_in`.
+        densify_pts: number of points added to each edge of the bounds before transforming them (as in
+            `rasterio.warp.transform_bounds`).
+
+    Returns:
+        (N,) array of `WINDOW_DTYPE` with the windows of the bounds
+    """
+    if hasattr(bounds, "geometry"):
+        if crs_bounds is None:
+            crs_bounds = bounds.crs
+        bounds = bounds.bounds
+
+    bounds = np.asarray(bounds, dtype=np.float64).reshape((-1, 4))
+    minx, miny, maxx, maxy = bounds[:, 0:1], bounds[:, 1:2], bounds[:, 2:3], bounds[:, 3:4]
+    if (crs_bounds is not None) and not window_utils.compare_crs(crs_bounds, data_in.crs):
+        # Points on the edges of the bounds: (N, 4 * (densify_pts + 1))
+        t = np.linspace(0, 1, densify_pts + 2)[np.newaxis, :-1]
+        ones = np.ones_like(t)
+        xs = np.concatenate([minx + (maxx - minx) * t, maxx * ones, maxx - (maxx - minx) * t, minx * ones], axis=1)
+        ys = np.concatenate([miny * ones, miny + (maxy - miny) * t, maxy * ones, maxy - (maxy - miny) * t], axis=1)
+        xs_out, ys_out = _transform_coords(xs.ravel(), ys.ravel(), crs_bounds, data_in.crs)
+        xs_out, ys_out = xs_out.reshape(xs.shape), ys_out.reshape(ys.shape)
+        minx, maxx = xs_out.min(axis=1, keepdims=True), xs_out.max(axis=1, keepdims=True)
+        miny, maxy = ys_out.min(axis=1, keepdims=True), ys_out.max(axis=1, keepdims=True)
+
+    # Corners of the bounds in pixel coordinates (as `rasterio.windows.from_bounds`)
+    cols, rows = _to_pixel(data_in.transform, np.concatenate([minx, maxx, maxx, minx], axis=1),
+                           np.concatenate([maxy, maxy, miny, miny], axis=1))
+    col_off, row_off = cols.min(axis=1), rows.min(axis=1)
+    return _windows_array(col_off, row_off, cols.max(axis=1) - col_off, rows.max(axis=1) - row_off)
+
+
+def windows_from_polygons(data_in: GeoData, polygons:Any, crs_polygons:Optional[Any]=None,
+                          window_surrounding:bool=False) -> np.ndarray:
+    """
+    Batch version of `window_from_polygon`: the vertices of all the polygons are transformed in a single PROJ call.
+
+    Args:
+        data_in: Reader with crs and transform attributes
+        polygons: list of Polygons or MultiPolygons or `geopandas.GeoSeries`.
+        crs_polygons: Optional coordinate reference system of the polygons. If not provided it uses the crs of the
+            GeoSeries or assumes the same crs as `data_in`.
+        window_surrounding: The windows surround the polygons (see `window_from_polygon`).
+
+    Returns:
+        (N,) array of `WINDOW_DTYPE` with the windows of the polygons
+    """
+    if hasattr(polygons, "geometry") and (crs_polygons is None):
+        crs_polygons = polygons.crs
+
+    coords = []
+    index = []
+    for i, polygon in enumerate(polygons):
+        if isinstance(polygon, MultiPolygon):
+            pols = polygon.geoms
+        elif isinstance(polygon, Polygon):
+            pols = [polygon]
+        else:
+            raise NotImplementedError(f"Received shape of type {type(polygon)} different from {Polygon} or {MultiPolygon}")
+        for pol in pols:
+            coords_pol = np.asarray(pol.exterior.coords, dtype=np.float64)[:, :2]
+            coords.append(coords_pol)
+            index.append(np.full(len(coords_pol), i, dtype=np.int64))
+
+    n = len(polygons)
+    if len(coords) == 0:
+        return np.empty(0, dtype=WINDOW_DTYPE)
+    coords = np.concatenate(coords, axis=0)
+    index = np.concatenate(index, axis=0)
+
+    xs, ys = _transform_coords(coords[:, 0], coords[:, 1], crs_polygons, data_in.crs)
+    cols, rows = _to_pixel(data_in.transform, xs, ys)
+
+    col_off = np.full(n, np.inf)
+    row_off = np.full(n, np.inf)
+    col_max = np.full(n, -np.inf)
+    row_max = np.full(n, -np.inf)
+    np.minimum.at(col_off, index, cols)
+    np.minimum.at(row_off, index, rows)
+    np.maximum.at(col_max, index, cols)
+    np.maximum.at(row_max, index, rows)
+    if window_surrounding:
+        row_max += 1
+        col_max += 1
+
+    return _windows_array(col_off, row_off, col_max - col_off, row_max - row_off)
+
+
+def _load_into(data:GeoData, out:np.ndarray, boundless:bool=True) -> GeoTensor:
+    """ Loads `data` writing the values in the `out` array """
+    if isinstance(data, GeoTensor):
+        out[...] = np.asanyarray(data.values)
+        return GeoTensor(out, transform=data.transform, crs=data.crs, fill_value_default=data.fill_value_default)
+
+    if "out" in inspect.signature(data.load).parameters:
+        return data.load(boundless=boundless, out=out)
+
+    geotensor_data = data.load(boundless=boundless)
+    out[...] = np.asanyarray(geotensor_data.values)
+    geotensor_data.values = out
+    return geotensor_data
+
+
 def read_from_window(data_in: GeoData,
                      window: rasterio.windows.Window, return_only_data: bool = False,
                      trigger_load: bool = False,
-                     boundless: bool = True) -> Union[GeoData, np.ndarray, None]:
+                     boundless: bool = True, out:Optional[np.ndarray]=None) -> Union[GeoData, np.ndarray, None]:
     """
     Reads a window from data_in padding with 0 if needed (output GeoData will have `window.height`, `window.width` shape
     if boundless is `True`).
@@ -160,6 +341,8 @@ def read_from_window(data_in: GeoData,
         trigger_load: defaults to `False`. Trigger loading the data to memory.
         boundless: if `True` data read will always have the shape of the provided window
             (padding with `fill_value_default`)
+        out: Optional array to write the data into. If provided the data is loaded (as with `trigger_load=True`) in
+            this array.
 
     Returns:
         GeoData object
@@ -180,10 +363,15 @@ def read_from_window(data_in: GeoData,
 
         expected_shapes = {"x": window.width, "y": window.height}
         shape = tuple([named_shape[s] if s not in ["x", "y"] else expected_shapes[s] for s in data_in.dims])
-        data = np.zeros(shape, dtype=data_in.dtype)
         fill_value_default = getattr(data_in, "fill_value_default", 0)
-        if fill_value_default != 0:
-            data += fill_value_default
+        if out is not None:
+            assert tuple(out.shape) == shape, f"Expected out array with shape {shape} found {out.shape}"
+            data = out
+            data[...] = fill_value_default
+        else:
+            data = np.zeros(shape, dtype=data_in.dtype)
+            if fill_value_default != 0:
+                data += fill_value_default
         if return_only_data:
             return data
 
@@ -194,6 +382,9 @@ def read_from_window(data_in: GeoData,
     # Read data directly with rasterio (handles automatically the padding)
     data_sel = data_in.read_from_window(window=window, boundless=boundless)
 
+    if out is not None:
+        data_sel = _load_into(data_sel, out, boundless=boundless)
+
     if return_only_data:
         return data_sel.values
 
@@ -203,6 +394,57 @@ def read_from_window(data_in: GeoData,
     return data_sel
 
 
+def read_from_windows(data_in: GeoData, windows: List[rasterio.windows.Window],
+                      return_only_data: bool = False,
+                      boundless: bool = True) -> Union[List[Optional[GeoTensor]], np.ndarray, List[Optional[np.ndarray]]]:
+    """
+    Reads a list of windows from `data_in`. If `data_in` implements `read_windows` (e.g. `RasterioReader`) each file
+    is opened only once.
+
+    Args:
+        data_in: GeoData with "x" and "y" coordinates
+        windows: list of windows to read.
+        return_only_data: defaults to `False`. If `True` it returns a np.ndarray with shape `(len(windows), ...)`
+            (a list of arrays if the windows have different shapes) otherwise it returns a list of GeoTensors.
+        boundless: if `True` data read will always have the shape of the provided windows
+            (padding with `fill_value_default`)
+
+    Returns:
+        List of GeoTensors or np.ndarray with the data of all the windows
+    """
+    if hasattr(data_in, "read_windows"):
+        # Windows that do not intersect the data are not read (same as in `read_from_window`)
+        window_data = rasterio.windows.Window(col_off=0, row_off=0, width=data_in.shape[-1],
+                                              height=data_in.shape[-2])
+        intersects = [rasterio.windows.intersect([window_data, window]) for window in windows]
+        windows_read = [window for window, inter in zip(windows, intersects) if inter]
+        if return_only_data:
+            data_read = data_in.read_windows(windows_read, boundless=boundless)
+        else:
+            data_read = data_in.load_windows(windows_read, boundless=boundless)
+
+        if all(intersects):
+            return data_read
+
+        data_read = iter(data_read)
+        data_windows = [next(data_read) if inter else read_from_window(data_in, window,
+                                                                       return_only_data=return_only_data,
+                                                                       boundless=boundless)
+                        for window, inter in zip(windows, intersects)]
+    else:
+        data_windows = [read_from_window(data_in, window, return_only_data=return_only_data, trigger_load=True,
+                                         boundless=boundless) for window in windows]
+
+    if not return_only_data:
+        return data_windows
+
+    if (len(data_windows) > 0) and all(d is not None for d in data_windows) and \
+            (len(set(d.shape for d in data_windows)) == 1):
+        return np.stack(data_windows, axis=0)
+
+    return data_windows
+
+
 def read_from_center_coords(data_in: GeoData, center_coords:Tuple[float, float], shape:Tuple[int,int],
                             crs_center_coords:Optional[Any]=None,
                             return_only_data:bool=False, trigger_load:bool=False,
@@ -233,6 +475,93 @@ def read_from_center_coords(data_in: GeoData, center_coords:Tuple[float, float],
                             trigger_load=trigger_load, boundless=boundless)
 
 
+# Default size of the clusters of chips of `read_from_center_coords_batch` for data without internal blocks
+CLUSTER_SIZE_DEFAULT = (512, 512)
+
+
+def read_from_center_coords_batch(data_in: GeoData, center_coords:Any, shape:Tuple[int, int],
+                                  crs_center_coords:Optional[Any]=None,
+                                  cluster_size:Optional[Tuple[int, int]]=None,
+                                  max_bytes:int=256 * 2**20) -> np.ndarray:
+    """
+    Reads the chips of shape `shape` centered on each of `center_coords` (boundless). It is equivalent to
+    `np.stack([read_from_center_coords(data_in, c, shape, return_only_data=True, trigger_load=True) for c in coords])`
+    but chips are grouped in clusters of `cluster_size` pixels: the region that covers all the chips of a cluster is
+    read once and the chips are sliced from it in memory. Chips that do not intersect the data are not read (they are
+    filled with `data_in.fill_value_default`).
+
+    Args:
+        data_in: GeoData object
+        center_coords: (N, 2) array with the (x, y) center coords or `geopandas.GeoSeries` of points.
+        shape: (H, W) shape of the chips.
+        crs_center_coords: CRS of the coords. If not provided it uses the crs of the GeoSeries or assumes the same crs
+            as `data_in`.
+        cluster_size: (H, W) size of the grid used to cluster the chips. Defaults to the smallest multiple of the
+            block shape of `data_in` (e.g. tiles of a COG) of at least `CLUSTER_SIZE_DEFAULT`.
+        max_bytes: maximum number of bytes of the regions read at once.
+
+    Returns:
+        np.ndarray with shape `(N,) + data_in.shape[:-2] + shape`
+    """
+    windows = windows_from_center_coords(data_in, center_coords, shape, crs_center_coords=crs_center_coords)
+    n_chips = len(windows)
+    height, width = int(shape[0]), int(shape[1])
+    shape_other = tuple(data_in.shape[:-2])
+    fill_value_default = getattr(data_in, "fill_value_default", 0)
+    out = np.empty((n_chips,) + shape_other + (height, width), dtype=data_in.dtype)
+
+    col_off = windows["col_off"].astype(np.int64)
+    row_off = windows["row_off"].astype(np.int64)
+    intersects = (col_off < data_in.shape[-1]) & (col_off + width > 0) & \
+                 (row_off < data_in.shape[-2]) & (row_off + height > 0)
+    out[~intersects] = 0 if fill_value_default is None else fill_value_default
+    idx_read = np.flatnonzero(intersects)
+    if len(idx_read) == 0:
+        return out
+
+    if cluster_size is None:
+        block_shape = getattr(data_in, "block_shape", (1, 1))
+        cluster_size = tuple(int(b * ceil(c / b)) for b, c in zip(block_shape, CLUSTER_SIZE_DEFAULT))
+
+    # Cluster in the grid of the blocks of the file (offset of the window of the reader)
+    window_focus = getattr(data_in, "window_focus", None)
+    focus_row, focus_col = (0, 0) if window_focus is None else (int(window_focus.row_off), int(window_focus.col_off))
+    cell_row = (row_off[idx_read] + focus_row) // cluster_size[0]
+    cell_col = (col_off[idx_read] + focus_col) // cluster_size[1]
+    cells, cluster_index = np.unique(np.stack([cell_row, cell_col], axis=1), axis=0, return_inverse=True)
+    cluster_index = cluster_index.ravel()
+
+    regions = []
+    members = []
+    for k in range(len(cells)):
+        idx_cluster = idx_read[cluster_index == k]
+        row_start, col_start = row_off[idx_cluster].min(), col_off[idx_cluster].min()
+        regions.append(rasterio.windows.Window(row_off=int(row_start), col_off=int(col_start),
+                                               width=int(col_off[idx_cluster].max() + width - col_start),
+                                               height=int(row_off[idx_cluster].max() + height - row_start)))
+        members.append(idx_cluster)
+
+    # Read the regions in batches of at most max_bytes
+    bytes_pixel = int(np.prod(shape_other)) * np.dtype(data_in.dtype).itemsize
+    start = 0
+    while start < len(regions):
+        end, nbytes = start, 0
+        while (end < len(regions)) and ((end == start) or
+                                       (nbytes + regions[end].width * regions[end].height * bytes_pixel <= max_bytes)):
+            nbytes += regions[end].width * regions[end].height * bytes_pixel
+            end += 1
+
+        data_regions = read_from_windows(data_in, regions[start:end], return_only_data=True, boundless=True)
+        for region, idx_cluster, data_region in zip(regions[start:end], members[start:end], data_regions):
+            for i in idx_cluster:
+                r = int(row_off[i] - region.row_off)
+                c = int(col_off[i] - region.col_off)
+                out[i] = data_region[..., r:r + height, c:c + width]
+        start = end
+
+    return out
+
+
 def read_from_bounds(data_in: GeoData, bounds: Tuple[float, float, float, float],
                      crs_bounds: Optional[str] = None, pad_add=(0, 0),
                      return_only_data: bool = False, trigger_load: bool = False,
@@ -298,7 +627,10 @@ def read_from_polygon(data_in: GeoData, polygon: Union[Polygon, MultiPolygon],
 def read_reproject_like(data_in: GeoData, data_like: GeoData,
                         resampling: rasterio.warp.Resampling = rasterio.warp.Resampling.cubic_spline,
                         dtpye_dst=None, return_only_data: bool = False,
-                        dst_nodata: Optional[int] = None) -> Union[GeoTensor, np.ndarray]:
+                        dst_nodata: Optional[int] = None, use_overviews:bool=True, num_threads:int=1,
+                        warp_mem_limit:int=0, cache_plan:bool=False,
+                        destination:Optional[Union[str, np.ndarray, GeoTensor, Any]]=None,
+                        tile_size:Optional[Tuple[int, int]]=None) -> Union[GeoData, np.ndarray]:
     """
     Reads from `data_in` and reprojects to have the same extent and resolution than `data_like`.
 
@@ -310,23 +642,35 @@ def read_reproject_like(data_in: GeoData, data_like: GeoData,
         return_only_data: defaults to `False`. If `True` it returns a np.ndarray otherwise
             returns an GeoTensor object (georreferenced array).
         dst_nodata: dst_nodata value
+        use_overviews: if `data_in` is a reader with overviews, read from the coarsest overview level that is still
+            at least as fine as `data_like` (see `read_reproject`).
+        num_threads: number of threads used by the GDAL warper.
+        warp_mem_limit: working memory of the GDAL warper in MB. Defaults to 0 (GDAL default: 64MB).
+        cache_plan: resample with a cached `reprojection_plan.ReprojectionPlan` (see `read_reproject`). Useful when
+            many rasters on the same grid are reprojected to the grid of `data_like`.
+        destination: Optional. Where the output is written window by window (see `read_reproject`).
+        tile_size: (height, width) of the windows written to `destination` (see `read_reproject`).
 
     Returns:
-        GeoTensor read from `data_in` with same transform, crs, shape and bounds than `data_like`.
+        GeoTensor read from `data_in` with same transform, crs, shape and bounds than `data_like`. If `destination` is
+        given, the GeoData of the destination.
     """
 
     shape_out = data_like.shape
     return read_reproject(data_in, dst_crs=data_like.crs, dst_transform=data_like.transform,
                           window_out=rasterio.windows.Window(0,0, width=shape_out[-1], height=shape_out[-2]),
                           resampling=resampling,dtpye_dst=dtpye_dst, return_only_data=return_only_data,
-                          dst_nodata=dst_nodata)
+                          dst_nodata=dst_nodata, use_overviews=use_overviews, num_threads=num_threads,
+                          warp_mem_limit=warp_mem_limit, cache_plan=cache_plan, destination=destination,
+                          tile_size=tile_size)
 
 
 def resize(data_in:GeoData, resolution_dst:Union[float, Tuple[float, float]],
            window_out:Optional[rasterio.windows.Window]=None,
            anti_aliasing:bool=True, anti_aliasing_sigma:Optional[Union[float,np.ndarray]]=None,
            resampling: rasterio.warp.Resampling = rasterio.warp.Resampling.cubic_spline,
-           return_only_data: bool = False)-> Union[
+           return_only_data: bool = False, use_overviews:bool=True,
+           num_threads:Optional[int]=None, integer_factor:bool=False)-> Union[
     GeoTensor, np.ndarray]:
     """
     Change the spatial resolution of data_in to `resolution_dst`. This function is a wrapper of the `read_reproject` function
@@ -340,10 +684,16 @@ def resize(data_in:GeoData, resolution_dst:Union[float, Tuple[float, float]],
         anti_aliasing_sigma:  anti_aliasing_sigma : {float}, optional
                 Standard deviation for Gaussian filtering used when anti-aliasing.
                 By default, this value is chosen as (s - 1) / 2 where s is the
-                downsampling factor, where s > 1
+                downsampling factor, where s > 1. It is given in pixels of `data_in`.
         resampling: specifies how data is reprojected from `rasterio.warp.Resampling`.
         return_only_data: defaults to `False`. If `True` it returns a np.ndarray otherwise
             returns an GeoTensor object (georreferenced array).
+        use_overviews: if `data_in` is a reader with overviews (e.g. a COG read with `RasterioReader`), read from the
+            coarsest overview level whose resolution is still at least `resolution_dst` instead of reading the full
+            resolution data. The anti-aliasing is then applied to the overview data.
+        num_threads: number of threads used to filter the bands in the anti-aliasing. Defaults to the number of cpus.
+        integer_factor: if `True` and `resolution_dst` is an integer factor of the resolution of `data_in` (or
+            vice versa), resample with the block reductions of `integer_resampling` (see `read_reproject`).
 
     Returns:
         GeoTensor with spatial resolution `resolution_dst`
@@ -354,6 +704,7 @@ def resize(data_in:GeoData, resolution_dst:Union[float, Tuple[float, float]],
         resolution_dst = (abs(resolution_dst), abs(resolution_dst))
 
     scale = np.array([resolution_dst[0] / resolution_or[0], resolution_dst[1] / resolution_or[1]])
+    transform_dst = data_in.transform
 
     if window_out is None:
         spatial_shape = data_in.shape[-2:]
@@ -365,60 +716,269 @@ def resize(data_in:GeoData, resolution_dst:Union[float, Tuple[float, float]],
         output_shape = ceil(output_shape_rounded[0]), ceil(output_shape_rounded[1])
         window_out = rasterio.windows.Window(col_off=0, row_off=0, width=output_shape[1], height=output_shape[0])
 
+    if use_overviews:
+        data_in_overview = _read_from_overview_for_resolution(data_in, resolution_dst)
+        if data_in_overview is not data_in:
+            resolution_overview = data_in_overview.res
+            factor_overview = np.array([resolution_overview[0] / resolution_or[0],
+                                        resolution_overview[1] / resolution_or[1]])
+            scale = scale / factor_overview
+            if anti_aliasing_sigma is not None:
+                anti_aliasing_sigma = anti_aliasing_sigma / np.mean(factor_overview)
+            data_in = data_in_overview
+            resolution_or = resolution_overview
+
     if anti_aliasing and any(s1<s2 for s1,s2 in zip(resolution_or, resolution_dst)):
         # If we are downscaling the image and requested anti_aliasing
+        if anti_aliasing_sigma is None:
+            anti_aliasing_sigma = np.mean(np.maximum(0, (scale - 1) / 2))
 
-        from scipy import ndimage as ndi
-
-        # Copy or load the tensor in memory
+        # TODO if data_in.values is a torch.Tensor use kornia gaussian filter instead of ndi
         if isinstance(data_in, GeoTensor):
-            data_in = data_in.copy()
+            # Filter into a new array (data_in is not modified)
+            values = np.asanyarray(data_in.values)
+            output = np.empty_like(values)
         else:
             data_in = data_in.load()
+            values = np.asanyarray(data_in.values)
+            if values.flags.writeable and values.flags.owndata and not isinstance(values, np.memmap):
+                # Freshly loaded array: filter in place
+                output = values
+            else:
+                # e.g. read only views of a memory map (`use_memmap`)
+                output = np.empty_like(values)
+
+        _gaussian_filter_spatial(values, anti_aliasing_sigma, output=output, num_threads=num_threads)
+        data_in = GeoTensor(output, transform=data_in.transform, crs=data_in.crs,
+                            fill_value_default=data_in.fill_value_default)
 
-        if anti_aliasing_sigma is None:
-            anti_aliasing_sigma = np.mean(np.maximum(0, (scale - 1) / 2))
+    return read_reproject(data_in, dst_crs=data_in.crs, resolution_dst_crs=resolution_dst,
+                          dst_transform=transform_dst, window_out=window_out,
+                          resampling=resampling, return_only_data=return_only_data, use_overviews=False,
+                          integer_factor=integer_factor)
 
 
-        # TODO if data_in.values is a torch.Tensor use kornia gaussian filter instead of ndi
+def _gaussian_filter_spatial(values:np.ndarray, sigma:Union[float, np.ndarray], output:np.ndarray,
+                             num_threads:Optional[int]=None) -> np.ndarray:
+    """
+    Gaussian filter over the spatial (last two) axes of `values` written in `output` (it can be `values` itself).
 
-        input_shape = data_in.shape
-        if len(input_shape) == 4:
-            for i, j in product(range(0, input_shape[0]), range(0, input_shape[1])):
-                if isinstance(anti_aliasing_sigma, numbers.Number):
-                    anti_aliasing_sigma_iter = anti_aliasing_sigma
-                else:
-                    anti_aliasing_sigma_iter = anti_aliasing_sigma[i, j]
-                data_in.values[i, j] = ndi.gaussian_filter(data_in.values[i, j],
-                                                           anti_aliasing_sigma_iter, cval=0, mode="reflect")
-        elif len(input_shape) == 3:
-            for i in range(0, input_shape[0]):
-                if isinstance(anti_aliasing_sigma, numbers.Number):
-                    anti_aliasing_sigma_iter = anti_aliasing_sigma
-                else:
-                    anti_aliasing_sigma_iter = anti_aliasing_sigma[i]
-
-                data_in.values[i] = ndi.gaussian_filter(data_in.values[i],
-                                                        anti_aliasing_sigma_iter, cval=0, mode="reflect")
-        else:
-            data_in.values[...] = ndi.gaussian_filter(data_in.values,
-                                                      anti_aliasing_sigma, cval=0, mode="reflect")
+    Args:
+        values: array to filter.
+        sigma: standard deviation of the filter in pixels. A number for all the bands or an array with the shape of
+            the non-spatial dims of `values` with the sigma of each band (for 2D arrays it is passed to
+            `ndi.gaussian_filter` as is).
+        output: array where the result is written.
+        num_threads: number of threads filtering bands concurrently. Defaults to the number of cpus.
 
+    Returns:
+        `output`
+    """
+    from scipy import ndimage as ndi
 
-    return read_reproject(data_in, dst_crs=data_in.crs, resolution_dst_crs=resolution_dst,
-                          dst_transform=data_in.transform, window_out=window_out,
-                          resampling=resampling, return_only_data=return_only_data)
+    shape_other = values.shape[:-2]
+    if len(shape_other) == 0:
+        return ndi.gaussian_filter(values, sigma, output=output, cval=0, mode="reflect")
+
+    sigma_uniform = isinstance(sigma, numbers.Number) or (np.ndim(sigma) == 0)
+    if num_threads is None:
+        num_threads = os.cpu_count() or 1
+
+    if sigma_uniform and ((num_threads <= 1) or (shape_other[0] == 1)):
+        # Single call with sigma 0 on the non-spatial axes
+        return ndi.gaussian_filter(values, (0,) * len(shape_other) + (float(sigma), float(sigma)), output=output,
+                                   cval=0, mode="reflect")
+
+    if sigma_uniform:
+        # Split in the first axis (a single call for each chunk)
+        indexes = [(i,) for i in range(shape_other[0])]
+        sigma_iter = lambda idx: (0,) * (len(shape_other) - 1) + (float(sigma), float(sigma))
+    else:
+        indexes = list(np.ndindex(*shape_other))
+        sigma_iter = lambda idx: float(sigma[idx])
+
+    def filter_iter(idx):
+        ndi.gaussian_filter(values[idx], sigma_iter(idx), output=output[idx], cval=0, mode="reflect")
 
+    if num_threads <= 1:
+        for idx in indexes:
+            filter_iter(idx)
+    else:
+        with ThreadPoolExecutor(max_workers=min(num_threads, len(indexes))) as executor:
+            list(executor.map(filter_iter, indexes))
+    return output
+
+
+def _same_nodata_bands(np_array:np.ndarray, nodata:Optional[Union[int, float]]) -> bool:
+    """ Whether all the bands of the (N, H, W) `np_array` have nodata in the same pixels """
+    if (nodata is None) or (np_array.ndim < 3) or (np_array.shape[0] <= 1):
+        return True
+    # Band by band: a single mask in memory and it stops at the first band that differs
+    invalid_first = window_utils.is_nodata(np_array[0], nodata)
+    return all(np.array_equal(window_utils.is_nodata(band, nodata), invalid_first) for band in np_array[1:])
+
+
+def _source_extent(data_in: GeoData) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+    """
+    Returns the (row, col) offset and the (height, width) of the data of `data_in` in its own grid. Readers with a
+    `window_focus` (e.g. `RasterioReader`) have data in their `real_window`: outside of it the reads are padded.
+    """
+    window_focus = getattr(data_in, "window_focus", None)
+    real_window = getattr(data_in, "real_window", None)
+    if isinstance(data_in, GeoTensor) or (window_focus is None) or (real_window is None):
+        return (0, 0), tuple(data_in.shape[-2:])
+
+    return (real_window.row_off - window_focus.row_off, real_window.col_off - window_focus.col_off), \
+           (real_window.height, real_window.width)
+
+
+def _read_reproject_integer_factor(data_in: GeoData, dst_transform:rasterio.Affine,
+                                  window_out:rasterio.windows.Window, resampling:rasterio.warp.Resampling,
+                                  dtpye_dst=None, dst_nodata:Optional[Union[int, float]]=None) -> Optional[np.ndarray]:
+    """
+    Resamples `data_in` (in the crs of the output) to the grid `dst_transform` with the functions of
+    `integer_resampling` if both grids are aligned and differ by an integer factor. Returns None otherwise (or if some
+    output pixels need source data that is not available: there GDAL replicates the edge of the source).
+    """
+    grid = integer_resampling.integer_grid(data_in.transform, dst_transform)
+    if grid is None:
+        return None
+
+    resamplings = integer_resampling.RESAMPLINGS_UPSAMPLING if grid.upsample else \
+        integer_resampling.RESAMPLINGS_DOWNSAMPLING
+    if resampling not in resamplings:
+        return None
+
+    if grid.upsample and isinstance(data_in, GeoTensor) and (min(grid.offset) < 0) and \
+            (resampling not in (rasterio.warp.Resampling.nearest, rasterio.warp.Resampling.bilinear)):
+        # GDAL also fills the output pixel just before the first row/column of the array with these resamplings
+        return None
+
+    shape_out = (int(window_out.height), int(window_out.width))
+    src_offset, src_shape = _source_extent(data_in)
+    if grid.upsample:
+        row_off, col_off, height, width = integer_resampling.upsample_window(grid, shape_out)
+    else:
+        (row_off, col_off), (height, width) = grid.offset, (shape_out[0] * grid.factor[0],
+                                                            shape_out[1] * grid.factor[1])
+        if (row_off < src_offset[0]) or (col_off < src_offset[1]) or \
+                (row_off + height > src_offset[0] + src_shape[0]) or (col_off + width > src_offset[1] + src_shape[1]):
+            # Blocks partly outside of the source data
+            return None
+    values = read_from_window(data_in, rasterio.windows.Window(row_off=row_off, col_off=col_off,
+                                                               width=width, height=height),
+                              return_only_data=True, trigger_load=True, boundless=True)
+    values = np.asanyarray(values)
+    if dtpye_dst is not None:
+        values = values.astype(dtpye_dst, copy=False)
+
+    src_nodata = data_in.fill_value_default
+    if dst_nodata is None:
+        dst_nodata = src_nodata
+    if grid.upsample:
+        # GDAL does not interpolate outside of the source data (GeoTensors are warped without padding, readers are
+        # padded with nodata)
+        return integer_resampling.upsample(values, grid, shape_out, resampling, src_nodata=src_nodata,
+                                           dst_nodata=dst_nodata, src_shape=src_shape, src_offset=src_offset)
+    return integer_resampling.downsample(values, grid.factor, resampling, src_nodata=src_nodata,
+                                         dst_nodata=dst_nodata)
+
+
+def _read_from_overview_for_resolution(data_in: GeoData,
+                                       resolution_dst:Tuple[float, float]) -> GeoData:
+    """
+    If `data_in` is a reader with overviews (e.g. `RasterioReader`) returns a reader of the coarsest overview level
+    whose resolution is still at least `resolution_dst` (in `data_in.crs`). Otherwise returns `data_in`.
+    """
+    if not hasattr(data_in, "overview_level_for_resolution"):
+        return data_in
+
+    overview_level = data_in.overview_level_for_resolution(resolution_dst)
+    if overview_level == data_in.overview_level:
+        return data_in
 
+    return data_in.read_from_overview_level(overview_level)
 
+
+def _resolution_in_crs(polygon_dst_crs:Polygon, dst_crs:Any, dst_transform:rasterio.Affine,
+                       window_out:rasterio.windows.Window, crs_data_in:Any) -> Tuple[float, float]:
+    """ Resolution of the output grid expressed in `crs_data_in` (average pixel size if the crs are different) """
+    if window_utils.compare_crs(dst_crs, crs_data_in):
+        return window_utils.res(dst_transform)
+
+    polygon_data_crs = window_utils.polygon_to_crs(polygon_dst_crs, dst_crs, crs_data_in)
+    res_avg = np.sqrt(polygon_data_crs.area / (window_out.width * window_out.height))
+    return res_avg, res_avg
+
+
+# Radius (in source pixels) of the kernels of the resampling methods of GDAL. The other methods (average, mode...)
+# aggregate the source pixels in the footprint of the output pixel (radius of half an output pixel).
+KERNEL_RADIUS = {rasterio.warp.Resampling.nearest: 1, rasterio.warp.Resampling.bilinear: 1,
+                 rasterio.warp.Resampling.cubic: 2, rasterio.warp.Resampling.cubic_spline: 2,
+                 rasterio.warp.Resampling.lanczos: 3}
+
+
+def _source_margin(resampling:rasterio.warp.Resampling, resolution_dst_data_crs:Tuple[float, float],
+                   resolution_data:Tuple[float, float]) -> Tuple[int, int]:
+    """
+    Pad (rows, cols) of the source window that `read_reproject` reads: GDAL widens the kernel of the resampling by
+    the downsampling factor, the source pixels under the kernel of the output pixels at the border must be read
+    for the output to be the same regardless of the extent requested (e.g. the tiles of `read_reproject_tiled`).
+    """
+    radius = KERNEL_RADIUS.get(resampling, 1)
+    return tuple(max(3, ceil(radius * max(1, abs(rdst) / abs(rsrc))) + 1)
+                 for rdst, rsrc in zip(resolution_dst_data_crs, resolution_data))
+
+
+
+def _read_reproject_into(data_in: GeoData, destination:Union[str, np.ndarray, GeoTensor, Any],
+                         dst_crs:Optional[Any]=None, bounds:Optional[Tuple[float, float, float, float]]=None,
+                         resolution_dst_crs:Optional[Union[float, Tuple[float, float]]]=None,
+                         dst_transform:Optional[rasterio.Affine]=None,
+                         window_out:Optional[rasterio.windows.Window]=None, dtpye_dst=None,
+                         return_only_data:bool=False, tile_size:Optional[Tuple[int, int]]=None,
+                         **kwargs_reproject) -> Union[GeoData, np.ndarray]:
+    """ `read_reproject` writing the output window by window in `destination` """
+    from georeader import reproject_tiled
+
+    assert not (return_only_data and isinstance(destination, str)), \
+        "return_only_data is not supported when the destination is a GeoTIFF"
+
+    if isinstance(destination, GeoTensor) and (bounds is None) and (dst_transform is None):
+        # Output grid: the grid of the GeoTensor
+        dst_crs = destination.crs
+        dst_transform = destination.transform
+        if window_out is None:
+            window_out = rasterio.windows.Window(row_off=0, col_off=0, width=destination.width,
+                                                 height=destination.height)
+
+    if (dtpye_dst is None) and hasattr(destination, "dtype"):
+        dtpye_dst = destination.dtype
+
+    output = reproject_tiled.read_reproject_tiled(data_in, dst_crs=dst_crs, bounds=bounds,
+                                                  resolution_dst_crs=resolution_dst_crs,
+                                                  dst_transform=dst_transform, window_out=window_out,
+                                                  dtpye_dst=dtpye_dst, sink=destination,
+                                                  tile_size=tile_size or reproject_tiled.DEFAULT_TILE_SIZE,
+                                                  **kwargs_reproject)
+    if return_only_data:
+        return output.values
+    return output
+
+
+@tracing.traced("read_reproject")
 def read_reproject(data_in: GeoData, dst_crs: Optional[str]=None,
                    bounds: Optional[Tuple[float, float, float, float]]=None,
                    resolution_dst_crs: Optional[Union[float, Tuple[float, float]]]=None,
                    dst_transform:Optional[rasterio.Affine]=None,
                    window_out:Optional[rasterio.windows.Window]=None,
                    resampling: rasterio.warp.Resampling = rasterio.warp.Resampling.cubic_spline,
-                   dtpye_dst=None, return_only_data: bool = False, dst_nodata: Optional[int] = None) -> Union[
-    GeoTensor, np.ndarray]:
+                   dtpye_dst=None, return_only_data: bool = False, dst_nodata: Optional[int] = None,
+                   use_overviews:bool=True, num_threads:int=1,
+                   warp_mem_limit:int=0, cache_plan:bool=False,
+                   destination:Optional[Union[str, np.ndarray, GeoTensor, Any]]=None,
+                   tile_size:Optional[Tuple[int, int]]=None, integer_factor:bool=False) -> Union[
+    GeoData, np.ndarray]:
     """
     This function slices the data by the bounds and reprojects it to the dst_crs and resolution_dst_crs
 
@@ -436,12 +996,41 @@ def read_reproject(data_in: GeoData, dst_crs: Optional[str]=None,
         return_only_data: defaults to `False`. If `True` it returns a np.ndarray otherwise
             returns an GeoTensor object (georreferenced array).
         dst_nodata: dst_nodata value
+        use_overviews: if `data_in` is a reader with overviews (e.g. a COG read with `RasterioReader`) and the output
+            resolution is coarser than the resolution of `data_in`, read from the coarsest overview level whose
+            resolution is still at least the output resolution.
+        num_threads: number of threads used by the GDAL warper.
+        warp_mem_limit: working memory of the GDAL warper in MB. Defaults to 0 (GDAL default: 64MB).
+        cache_plan: if `True` and `resampling` is nearest or bilinear, resample with a cached
+            `reprojection_plan.ReprojectionPlan` instead of GDAL. The coordinate transformation is then computed only
+            once for consecutive calls with the same source and destination grids.
+        destination: Optional. Where the output is written instead of a new in-memory array: path of a tiled GeoTIFF
+            to create, `np.ndarray`/`np.memmap` with the shape of the output, an existing GeoTensor (the output is
+            written in the region that it covers; if neither `bounds` nor `dst_transform` are given, the grid of the
+            GeoTensor) or a `reproject_tiled.Sink`. The output is computed and written window by window
+            (see `reproject_tiled.read_reproject_tiled`), so it can be larger than the memory.
+        tile_size: (height, width) of the windows written to `destination`. Defaults to
+            `reproject_tiled.DEFAULT_TILE_SIZE`.
+        integer_factor: if `True`, `dst_crs` is the crs of `data_in` and both grids are aligned and their resolutions
+            differ by an integer factor (e.g. 20m -> 10m or 10m -> 60m), resample with the block reductions of
+            `integer_resampling` instead of the GDAL warper. Integer outputs of `average` and `bilinear` that
+            fall exactly on .5 may differ by one from the ones of GDAL (see `integer_resampling`).
 
     Returns:
-        GeoTensor reprojected to dst_crs with resolution_dst_crs
+        GeoTensor reprojected to dst_crs with resolution_dst_crs. If `destination` is given, the GeoData of the
+        destination (a `RasterioReader` of the file for GeoTIFFs).
 
     """
 
+    if destination is not None:
+        return _read_reproject_into(data_in, destination, dst_crs=dst_crs, bounds=bounds,
+                                    resolution_dst_crs=resolution_dst_crs, dst_transform=dst_transform,
+                                    window_out=window_out, resampling=resampling, dtpye_dst=dtpye_dst,
+                                    return_only_data=return_only_data, dst_nodata=dst_nodata, tile_size=tile_size,
+                                    use_overviews=use_overviews, num_threads=num_threads,
+                                    warp_mem_limit=warp_mem_limit, cache_plan=cache_plan,
+                                    integer_factor=integer_factor)
+
     named_shape = OrderedDict(zip(data_in.dims, data_in.shape))
 
     # Compute output transform
@@ -475,6 +1064,22 @@ def read_reproject(data_in: GeoData, dst_crs: Optional[str]=None,
                 window_in_data = window_in_data.round_offsets(op="floor", pixel_precision=PIXEL_PRECISION)
                 return read_from_window(data_in, window_in_data, return_only_data=return_only_data, trigger_load=True)
 
+    resolution_dst_data_crs = None
+    if use_overviews and not isinstance(data_in, GeoTensor):
+        resolution_dst_data_crs = _resolution_in_crs(polygon_dst_crs, dst_crs, dst_transform, window_out, crs_data_in)
+        data_in = _read_from_overview_for_resolution(data_in, resolution_dst_data_crs)
+
+    if integer_factor and window_utils.compare_crs(dst_crs, crs_data_in):
+        # Aligned grids with an integer ratio of resolutions: block reductions instead of a warp
+        destination = _read_reproject_integer_factor(data_in, dst_transform, window_out, resampling,
+                                                     dtpye_dst=dtpye_dst, dst_nodata=dst_nodata)
+        if destination is not None:
+            if dst_nodata is None:
+                dst_nodata = data_in.fill_value_default
+            if return_only_data:
+                return destination
+            return GeoTensor(destination, transform=dst_transform, crs=dst_crs, fill_value_default=dst_nodata)
+
     cast = False
     if dtpye_dst is None:
         cast = True
@@ -487,8 +1092,12 @@ def read_reproject(data_in: GeoData, dst_crs: Optional[str]=None,
 
     if not isinstance(data_in, GeoTensor):
         # Read a padded window of the input data. This data will be then used for reprojection
+        if resolution_dst_data_crs is None:
+            resolution_dst_data_crs = _resolution_in_crs(polygon_dst_crs, dst_crs, dst_transform, window_out,
+                                                         crs_data_in)
+        pad_add = _source_margin(resampling, resolution_dst_data_crs, window_utils.res(data_in.transform))
         geotensor_in = read_from_polygon(data_in, polygon_dst_crs, crs_polygon=dst_crs,
-                                         pad_add=(3, 3), return_only_data=False,
+                                         pad_add=pad_add, return_only_data=False,
                                          trigger_load=True)
     else:
         geotensor_in = data_in
@@ -497,32 +1106,35 @@ def read_reproject(data_in: GeoData, dst_crs: Optional[str]=None,
 
     np_array_in = np.asanyarray(geotensor_in.values)
     if cast:
-        np_array_in = np_array_in.astype(dtpye_dst)
-
-    dst_nodata = dst_nodata or geotensor_in.fill_value_default
-
-    index_iter = [[(ns, i) for i in range(s)] for ns, s in named_shape.items() if ns not in ["x", "y"]]
-    # e.g. if named_shape = {'time': 4, 'band': 2, 'x':10, 'y': 10} index_iter ->
-    # [[('time', 0), ('time', 1), ('time', 2), ('time', 3)],
-    #  [('band', 0), ('band', 1)]]
-
-    for current_select_tuple in itertools.product(*index_iter):
-        # current_select_tuple = (('time', 0), ('band', 0))
-        i_sel_tuple = tuple(t[1] for t in current_select_tuple)
-
-        np_array_iter = np_array_in[i_sel_tuple]
-        dst_iter_write = destination[i_sel_tuple]
-
-        rasterio.warp.reproject(
-            np_array_iter,
-            dst_iter_write,
-            src_transform=geotensor_in.transform,
-            src_crs=crs_data_in,
-            dst_transform=dst_transform,
-            dst_crs=dst_crs,
-            src_nodata=geotensor_in.fill_value_default,
-            dst_nodata=dst_nodata,
-            resampling=resampling)
+        np_array_in = np_array_in.astype(dtpye_dst, copy=False)
+
+    if dst_nodata is None:
+        dst_nodata = geotensor_in.fill_value_default
+
+    # All the non-spatial dims are reprojected in a single call: (time, band, y, x) -> (time*band, y, x). This way GDAL
+    # computes the coordinate transformation once for all the bands.
+    if np_array_in.ndim > 2:
+        np_array_in = np_array_in.reshape((-1,) + np_array_in.shape[-2:])
+    destination_warp = destination.reshape((-1,) + destination.shape[-2:]) if destination.ndim > 2 else destination
+
+    if cache_plan and (resampling in reprojection_plan.RESAMPLINGS):
+        plan = reprojection_plan.get_plan(geotensor_in.transform, crs_data_in, np_array_in.shape[-2:],
+                                          dst_transform, dst_crs, destination.shape[-2:])
+        plan.apply(np_array_in, destination_warp, resampling=resampling, src_nodata=geotensor_in.fill_value_default,
+                   dst_nodata=dst_nodata)
+    else:
+        kwargs_warp = dict(src_transform=geotensor_in.transform, src_crs=crs_data_in, dst_transform=dst_transform,
+                           dst_crs=dst_crs, src_nodata=geotensor_in.fill_value_default, dst_nodata=dst_nodata,
+                           resampling=resampling, num_threads=num_threads, warp_mem_limit=warp_mem_limit)
+        if dst_nodata == 0:
+            # rasterio replaces a dst_nodata of 0 by src_nodata to initialize the output: keep the zeros instead
+            kwargs_warp["init_dest_nodata"] = False
+        if _same_nodata_bands(np_array_in, geotensor_in.fill_value_default):
+            rasterio.warp.reproject(np_array_in, destination_warp, **kwargs_warp)
+        else:
+            # GDAL merges the nodata masks of the bands of a multi-band warp: warp band by band
+            for np_array_band, destination_band in zip(np_array_in, destination_warp):
+                rasterio.warp.reproject(np_array_band, destination_band, **kwargs_warp)
 
     if return_only_data:
         return destination
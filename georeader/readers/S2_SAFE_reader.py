@@ -25,6 +25,7 @@ from typing import List, Tuple, Union, Optional, Dict, Any
 from georeader.rasterio_reader import  RasterioReader
 from georeader import read
 from georeader import window_utils
+from georeader import tracing
 from georeader.geotensor import GeoTensor
 import rasterio.warp
 from shapely.geometry import shape
@@ -414,6 +415,27 @@ class S2Image:
         reader_band_check = self._get_reader()
         return reader_band_check.res
 
+    @property
+    def block_shape(self) -> Tuple[int, int]:
+        """ (height, width) of the internal blocks of the reference band """
+        reader_band_check = self._get_reader()
+        return reader_band_check.block_shape
+
+    def to_dask(self, chunks:Optional[Tuple[int, int]]=None) -> 'dask.array.Array':
+        """
+        Returns a dask array that reads the image by chunks (see `dask_utils.to_dask`). Each chunk is read with
+        `read_from_window` and `load` (i.e. with the radiometric offsets).
+
+        Args:
+            chunks: Optional. (height, width) of the chunks. Defaults to multiples of the internal blocks of the
+                reference band aligned with them.
+
+        Returns:
+            dask array with the shape and dtype of the image
+        """
+        from georeader import dask_utils
+        return dask_utils.to_dask(self, chunks=chunks)
+
     def __str__(self):
         return self.folder
 
@@ -442,6 +464,7 @@ class S2Image:
 
         return s2obj
 
+    @tracing.traced("S2Image.load")
     def load(self, boundless:bool=True)-> GeoTensor:
         reader_ref = self._get_reader()
         geotensor_ref = reader_ref.load(boundless=boundless)
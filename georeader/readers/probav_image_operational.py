@@ -9,7 +9,7 @@ from rasterio import Affine
 import rasterio
 import rasterio.windows
 from typing import Tuple, List, Optional, Union
-from georeader import window_utils, geotensor
+from georeader import window_utils, geotensor, tracing
 from numbers import Number
 from shapely.geometry import Polygon
 
@@ -131,6 +131,7 @@ class ProbaV:
 
         return window_utils.polygon_to_crs(pol, self.crs, crs)
 
+    @tracing.traced("ProbaV._load_bands")
     def _load_bands(self, bands_names:Union[List[str],str], boundless:bool=True,
                     fill_value_default:Number=0) -> geotensor.GeoTensor:
         window_read, pad_list_np = self._get_window_pad(boundless=boundless)
@@ -141,10 +142,14 @@ class ProbaV:
         else:
             flatten = False
 
-        with h5py.File(self.hdf5_file, "r") as input_f:
+        with tracing.timed("open_time"):
+            input_f = h5py.File(self.hdf5_file, "r")
+        tracing.add(files_opened=1)
+        with input_f:
             bands_arrs = []
             for band in bands_names:
-                data = read_band_toa(input_f, band, slice_)
+                with tracing.timed("read_time"):
+                    data = read_band_toa(input_f, band, slice_)
                 if pad_list_np:
                     data = np.pad(data, tuple(pad_list_np), mode="constant",
                                   constant_values=fill_value_default)
@@ -0,0 +1,302 @@
+"""
+Tiled reprojection with bounded memory.
+
+`read.read_reproject` allocates the whole output and, for readers, loads the whole source footprint at once.
+`read_reproject_tiled` splits the output grid in tiles of `tile_size`; each tile reads only its own source footprint
+(plus the margin added by `read_reproject`), warps it and writes it to a sink::
+
+    reproject_tiled.read_reproject_tiled(reader, dst_crs="EPSG:4326", bounds=bounds, resolution_dst_crs=1e-4,
+                                         tile_size=(1024, 1024), sink="reprojected.tif")
+
+Sinks:
+
+* None: in-memory array (the output must fit in memory but the source does not need to).
+* np.ndarray or np.memmap with the shape of the output: the tiles are written in that array.
+* str: path of a tiled GeoTIFF that is created (`GeoTIFFSink`).
+* GeoTensor: the tiles are written in the region of the GeoTensor covered by the output grid (`GeoTensorSink`).
+* any object with the interface of `Sink`.
+
+Peak memory (besides the in-memory sink) is bounded by the size of the tile and its source footprint.
+
+With `num_workers > 1` the tiles are reprojected in a pool of threads (`executor="thread"`, GDAL releases the GIL
+while reading and warping) or processes (`executor="process"`, `data_in` is sent once to each worker). At most
+`2 * num_workers` tiles are in flight. Each tile is computed independently, so the output does not depend on the
+number of workers or on the order in which the tiles are written (`ordered`).
+"""
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+import numpy as np
+import rasterio
+import rasterio.warp
+import rasterio.windows
+from georeader.abstract_reader import GeoData
+from georeader.geotensor import GeoTensor
+from georeader import _pool
+from georeader import read
+from georeader import slices
+from georeader import window_utils
+from georeader.window_utils import PIXEL_PRECISION
+
+DEFAULT_TILE_SIZE = (1024, 1024)
+
+# Profile of the GeoTIFFs created by `GeoTIFFSink` (updated with the profile given by the user)
+GEOTIFF_PROFILE = {"driver": "GTiff", "tiled": True, "blockxsize": 256, "blockysize": 256, "compress": "lzw"}
+
+
+class Sink:
+    """
+    Destination of the tiles of `read_reproject_tiled`.
+
+    Args:
+        shape: shape of the output.
+        dtype: dtype of the output.
+        transform: geotransform of the output.
+        crs: crs of the output.
+        fill_value_default: nodata value of the output.
+
+    """
+    def __init__(self, shape:Tuple[int, ...], dtype:Any, transform:rasterio.Affine, crs:Any,
+                 fill_value_default:Optional[Union[int, float]]=0):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.transform = transform
+        self.crs = crs
+        self.fill_value_default = fill_value_default
+
+    def write(self, window:rasterio.windows.Window, values:np.ndarray) -> None:
+        """ Writes `values` (shape `self.shape[:-2] + (window.height, window.width)`) in `window` of the output """
+        raise NotImplementedError("Not implemented")
+
+    def close(self) -> None:
+        """ Called once all the tiles have been written """
+        pass
+
+    def result(self) -> GeoData:
+        """ Returns the output (called after `close`) """
+        raise NotImplementedError("Not implemented")
+
+
+class ArraySink(Sink):
+    """
+    Writes the tiles in an array with the shape of the output: an in-memory array or a `np.memmap`.
+
+    Args:
+        array: array with the shape of the output. If None a new array filled with `fill_value_default` is allocated.
+
+    """
+    def __init__(self, shape:Tuple[int, ...], dtype:Any, transform:rasterio.Affine, crs:Any,
+                 fill_value_default:Optional[Union[int, float]]=0, array:Optional[np.ndarray]=None):
+        super().__init__(shape, dtype, transform, crs, fill_value_default)
+        if array is None:
+            array = np.full(self.shape, fill_value=0 if fill_value_default is None else fill_value_default,
+                            dtype=self.dtype)
+        assert array.shape == self.shape, f"Unexpected shape of the array {array.shape} expected {self.shape}"
+        self.array = array
+
+    def write(self, window:rasterio.windows.Window, values:np.ndarray) -> None:
+        self.array[(...,) + window.toslices()] = values
+
+    def close(self) -> None:
+        if isinstance(self.array, np.memmap):
+            self.array.flush()
+
+    def result(self) -> GeoTensor:
+        return GeoTensor(self.array, transform=self.transform, crs=self.crs,
+                         fill_value_default=self.fill_value_default)
+
+
+class GeoTensorSink(ArraySink):
+    """
+    Writes the tiles in the region of an existing GeoTensor covered by the output grid. The output grid must be aligned
+    with the grid of the GeoTensor (same crs and resolution, integer offset) and inside it.
+
+    Args:
+        geotensor: GeoTensor where the output is written. `result` returns the slice of this GeoTensor (a view).
+
+    """
+    def __init__(self, shape:Tuple[int, ...], dtype:Any, transform:rasterio.Affine, crs:Any,
+                 fill_value_default:Optional[Union[int, float]]=0, geotensor:Optional[GeoTensor]=None):
+        assert geotensor is not None, "geotensor must be provided"
+        assert window_utils.compare_crs(geotensor.crs, crs), f"Different crs {geotensor.crs} and {crs}"
+        assert tuple(geotensor.shape[:-2]) == tuple(shape[:-2]), \
+            f"Unexpected shape of the GeoTensor {geotensor.shape} expected {tuple(shape[:-2])} in the non-spatial dims"
+        assert np.allclose([transform.a, transform.b, transform.d, transform.e],
+                           [geotensor.transform.a, geotensor.transform.b, geotensor.transform.d, geotensor.transform.e],
+                           rtol=1e-6, atol=0), \
+            f"The output grid {transform} has a different resolution than the GeoTensor {geotensor.transform}"
+        col_off, row_off = ~geotensor.transform * (transform.c, transform.f)
+        assert window_utils._is_exact_round(col_off) and window_utils._is_exact_round(row_off), \
+            f"The output grid {transform} is not aligned with the grid of the GeoTensor {geotensor.transform}"
+        self.window = rasterio.windows.Window(row_off=int(round(row_off)), col_off=int(round(col_off)),
+                                              height=shape[-2], width=shape[-1])
+        window_data = rasterio.windows.Window(row_off=0, col_off=0, height=geotensor.height, width=geotensor.width)
+        assert rasterio.windows.intersection(self.window, window_data) == self.window, \
+            f"The output window {self.window} is not inside the GeoTensor {window_data}"
+
+        super().__init__(shape, geotensor.dtype, transform, crs, fill_value_default,
+                         array=geotensor.values[(...,) + self.window.toslices()])
+        self.geotensor = geotensor
+
+
+class GeoTIFFSink(Sink):
+    """
+    Writes the tiles in a new tiled GeoTIFF. The output must have 2 or 3 dims.
+
+    Args:
+        path: path of the GeoTIFF to create.
+        profile: options of the GeoTIFF (updates `GEOTIFF_PROFILE`).
+
+    """
+    def __init__(self, shape:Tuple[int, ...], dtype:Any, transform:rasterio.Affine, crs:Any,
+                 fill_value_default:Optional[Union[int, float]]=0, path:str="reprojected.tif",
+                 profile:Optional[Dict[str, Any]]=None):
+        super().__init__(shape, dtype, transform, crs, fill_value_default)
+        assert len(self.shape) in [2, 3], f"GeoTIFFSink expects outputs with 2 or 3 dims found {self.shape}"
+        self.path = path
+        self.profile = dict(GEOTIFF_PROFILE)
+        if profile is not None:
+            self.profile.update(profile)
+        self.profile.update({"height": self.shape[-2], "width": self.shape[-1],
+                             "count": 1 if len(self.shape) == 2 else self.shape[0],
+                             "dtype": self.dtype.name, "crs": crs, "transform": transform,
+                             "nodata": fill_value_default})
+        self._dst = rasterio.open(self.path, "w", **self.profile)
+
+    def write(self, window:rasterio.windows.Window, values:np.ndarray) -> None:
+        if values.ndim == 2:
+            values = values[np.newaxis]
+        self._dst.write(values.astype(self.dtype, copy=False), window=window)
+
+    def close(self) -> None:
+        if not self._dst.closed:
+            self._dst.close()
+
+    def result(self) -> GeoData:
+        from georeader.rasterio_reader import RasterioReader
+        return RasterioReader(self.path)
+
+
+def _make_sink(sink:Union[None, str, np.ndarray, GeoTensor, Sink], shape:Tuple[int, ...], dtype:Any,
+               transform:rasterio.Affine, crs:Any, fill_value_default:Optional[Union[int, float]]) -> Sink:
+    if isinstance(sink, Sink):
+        assert sink.shape == tuple(shape), f"Unexpected shape of the sink {sink.shape} expected {tuple(shape)}"
+        return sink
+    if sink is None or isinstance(sink, np.ndarray):
+        return ArraySink(shape, dtype, transform, crs, fill_value_default, array=sink)
+    if isinstance(sink, GeoTensor):
+        return GeoTensorSink(shape, dtype, transform, crs, fill_value_default, geotensor=sink)
+    if isinstance(sink, str):
+        return GeoTIFFSink(shape, dtype, transform, crs, fill_value_default, path=sink)
+    raise NotImplementedError(f"Sink of type {type(sink)} not supported")
+
+
+def read_reproject_tiled(data_in:GeoData, dst_crs:Optional[str]=None,
+                         bounds:Optional[Tuple[float, float, float, float]]=None,
+                         resolution_dst_crs:Optional[Union[float, Tuple[float, float]]]=None,
+                         dst_transform:Optional[rasterio.Affine]=None,
+                         window_out:Optional[rasterio.windows.Window]=None,
+                         resampling:rasterio.warp.Resampling=rasterio.warp.Resampling.cubic_spline,
+                         dtpye_dst=None, dst_nodata:Optional[int]=None,
+                         tile_size:Tuple[int, int]=DEFAULT_TILE_SIZE,
+                         sink:Union[None, str, np.ndarray, GeoTensor, Sink]=None,
+                         num_workers:int=1, executor:str="thread", ordered:bool=True,
+                         **kwargs_reproject) -> GeoData:
+    """
+    Same as `read.read_reproject` but the output is computed by tiles of `tile_size` that are written to `sink` (see
+    module docstring).
+
+    Args:
+        data_in: GeoData to read and reproject. Expected coords "x" and "y".
+        dst_crs: CRS to reproject.
+        bounds: Optional. bounds in CRS specified by `dst_crs`. If not provided `window_out` must be given.
+        resolution_dst_crs: resolution in the CRS specified by `dst_crs`.
+        dst_transform: Optional dest transform.
+        window_out: Window out to read w.r.t `dst_transform`. If not provided it is computed from the bounds.
+        resampling: specifies how data is reprojected from `rasterio.warp.Resampling`.
+        dtpye_dst: if None it will be data_in.dtype
+        dst_nodata: dst_nodata value. If None it will be `data_in.fill_value_default`.
+        tile_size: (height, width) of the output tiles.
+        sink: where the output is written: None (in-memory array), np.ndarray/np.memmap, path of a GeoTIFF,
+            GeoTensor (region covered by the output grid) or `Sink`.
+        num_workers: number of tiles reprojected in parallel.
+        executor: "thread" or "process". With "process" `data_in` must be picklable (e.g. `RasterioReader` or
+            `GeoTensor`).
+        ordered: if `True` the tiles are written to the sink in order (row by row). Otherwise they are written as soon
+            as they are ready (the output is the same, this only matters for sinks that depend on the order).
+        **kwargs_reproject: other arguments of `read.read_reproject` (e.g. `num_threads`, `cache_plan`).
+
+    Returns:
+        GeoData with the output: GeoTensor for array sinks (the slice of the GeoTensor for GeoTensor sinks),
+        `RasterioReader` of the file for GeoTIFF sinks.
+    """
+    dst_transform = window_utils.figure_out_transform(transform=dst_transform, bounds=bounds,
+                                                      resolution_dst=resolution_dst_crs)
+    if window_out is None:
+        assert bounds is not None, "Both window_out and bounds are None. This is needed to figure out the size of the output array"
+        window_out = rasterio.windows.from_bounds(*bounds,
+                                                  transform=dst_transform).round_lengths(op="ceil",
+                                                                                         pixel_precision=PIXEL_PRECISION)
+    dst_transform = rasterio.windows.transform(window_out, dst_transform)
+    shape_out_spatial = (int(window_out.height), int(window_out.width))
+
+    if dst_crs is None:
+        dst_crs = data_in.crs
+    if dtpye_dst is None:
+        dtpye_dst = data_in.dtype
+    if dst_nodata is None:
+        dst_nodata = data_in.fill_value_default
+
+    shape_out = tuple(data_in.shape[:-2]) + shape_out_spatial
+    sink = _make_sink(sink, shape_out, dtpye_dst, dst_transform, dst_crs, dst_nodata)
+    footprint_data = data_in.footprint(crs=dst_crs)
+
+    windows = slices.create_windows(shape_out_spatial, window_size=tile_size)
+    kwargs_tile = dict(dst_crs=dst_crs, dst_transform=dst_transform, footprint_data=footprint_data,
+                       shape_out=shape_out, resampling=resampling, dtpye_dst=dtpye_dst, dst_nodata=dst_nodata,
+                       **kwargs_reproject)
+    try:
+        for window, values in _imap_tiles(data_in, windows, kwargs_tile, num_workers=num_workers,
+                                          executor=executor, ordered=ordered):
+            sink.write(window, values)
+    finally:
+        sink.close()
+
+    return sink.result()
+
+
+def _reproject_tile(data_in:GeoData, window:rasterio.windows.Window, dst_crs:Any, dst_transform:rasterio.Affine,
+                    footprint_data:Any, shape_out:Tuple[int, ...], resampling:rasterio.warp.Resampling,
+                    dtpye_dst:Any, dst_nodata:Optional[Union[int, float]], **kwargs_reproject) -> np.ndarray:
+    """ Reprojects the output tile `window` of the grid `dst_transform` """
+    shape_tile = tuple(shape_out[:-2]) + (int(window.height), int(window.width))
+    if not footprint_data.intersects(window_utils.window_polygon(window, dst_transform)):
+        return np.full(shape_tile, fill_value=0 if dst_nodata is None else dst_nodata, dtype=dtpye_dst)
+
+    return read.read_reproject(data_in, dst_crs=dst_crs, dst_transform=rasterio.windows.transform(window, dst_transform),
+                               window_out=rasterio.windows.Window(row_off=0, col_off=0, width=window.width,
+                                                                  height=window.height),
+                               resampling=resampling, dtpye_dst=dtpye_dst, return_only_data=True,
+                               dst_nodata=dst_nodata, **kwargs_reproject)
+
+
+# data_in of the worker processes (set once per process by the initializer of the pool)
+_DATA_IN_PROCESS: Optional[GeoData] = None
+
+
+def _init_process_worker(data_in:GeoData) -> None:
+    global _DATA_IN_PROCESS
+    _DATA_IN_PROCESS = data_in
+
+
+def _reproject_tile_process(window:rasterio.windows.Window, kwargs_tile:Dict[str, Any]) -> np.ndarray:
+    return _reproject_tile(_DATA_IN_PROCESS, window, **kwargs_tile)
+
+
+def _imap_tiles(data_in:GeoData, windows:List[rasterio.windows.Window], kwargs_tile:Dict[str, Any],
+                num_workers:int=1, executor:str="thread",
+                ordered:bool=True) -> Iterator[Tuple[rasterio.windows.Window, np.ndarray]]:
+    """ Yields the tiles `(window, values)` reprojected sequentially or in a pool of `num_workers` """
+    return _pool.imap_bounded(lambda w: _reproject_tile(data_in, w, **kwargs_tile), windows,
+                              num_workers=num_workers, executor=executor, ordered=ordered,
+                              fn_process=_reproject_tile_process, args_process=lambda w: (w, kwargs_tile),
+                              initializer=_init_process_worker, initargs=(data_in,),
+                              thread_name_prefix="georeader-reproject")
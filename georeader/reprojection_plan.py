@@ -0,0 +1,216 @@
+"""
+Reusable reprojection plans.
+
+Reprojecting many rasters that share the same source grid onto the same destination grid (e.g. a time series of
+images read over a fixed AOI grid) repeats the same coordinate transformation in every GDAL warp. A
+`ReprojectionPlan` computes the source pixel coordinates of the destination grid once and then resamples any number
+of arrays (of any number of bands) with vectorized NumPy gathers::
+
+    plan = reprojection_plan.get_plan(src_transform, src_crs, src_shape, dst_transform, dst_crs, dst_shape)
+    for values in arrays:
+        out = plan.apply(values, resampling=rasterio.warp.Resampling.bilinear, src_nodata=0)
+
+`get_plan` keeps the last `MAX_CACHED_PLANS` plans in a LRU cache. `read.read_reproject` and
+`read.read_reproject_like` use it with `cache_plan=True`.
+
+Only `nearest` and `bilinear` resampling are supported. Unlike GDAL, bilinear resampling always uses the 2x2
+neighbourhood of the source pixels (GDAL widens the kernel when downsampling), so use it for grids of similar
+resolution or for upsampling.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple, Union
+import numpy as np
+import rasterio
+import rasterio.warp
+from georeader import window_utils
+
+# Maximum number of plans kept in the cache of `get_plan`
+MAX_CACHED_PLANS = 16
+
+RESAMPLINGS = (rasterio.warp.Resampling.nearest, rasterio.warp.Resampling.bilinear)
+
+
+class ReprojectionPlan:
+    """
+    Source pixel coordinates of the pixels of a destination grid. Resamples arrays on the source grid to the
+    destination grid (see module docstring).
+
+    Args:
+        src_transform: geotransform of the source grid.
+        src_crs: crs of the source grid.
+        src_shape: (height, width) of the source grid.
+        dst_transform: geotransform of the destination grid.
+        dst_crs: crs of the destination grid.
+        dst_shape: (height, width) of the destination grid.
+
+    """
+    def __init__(self, src_transform:rasterio.Affine, src_crs:Any, src_shape:Tuple[int, int],
+                 dst_transform:rasterio.Affine, dst_crs:Any, dst_shape:Tuple[int, int]):
+        self.src_transform = src_transform
+        self.src_crs = src_crs
+        self.src_shape = tuple(int(s) for s in src_shape)
+        self.dst_transform = dst_transform
+        self.dst_crs = dst_crs
+        self.dst_shape = tuple(int(s) for s in dst_shape)
+
+        # Centers of the destination pixels
+        rows, cols = np.meshgrid(np.arange(self.dst_shape[0], dtype=np.float64) + .5,
+                                 np.arange(self.dst_shape[1], dtype=np.float64) + .5, indexing="ij")
+        xs = dst_transform.a * cols + dst_transform.b * rows + dst_transform.c
+        ys = dst_transform.d * cols + dst_transform.e * rows + dst_transform.f
+        if not window_utils.compare_crs(src_crs, dst_crs):
+            xs, ys = rasterio.warp.transform(dst_crs, src_crs, xs.ravel(), ys.ravel())
+            xs, ys = np.asarray(xs).reshape(self.dst_shape), np.asarray(ys).reshape(self.dst_shape)
+
+        # Fractional pixel coordinates in the source grid (pixel (i, j) covers [i, i+1) x [j, j+1))
+        src_inv = ~src_transform
+        self.cols = src_inv.a * xs + src_inv.b * ys + src_inv.c
+        self.rows = src_inv.d * xs + src_inv.e * ys + src_inv.f
+
+        self._indices = {}
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        """ Memory used by the plan """
+        return self.cols.nbytes + self.rows.nbytes + sum(a.nbytes for indices in self._indices.values()
+                                                         for a in indices if isinstance(a, np.ndarray))
+
+    def _dst_index(self) -> Tuple[Union[slice, np.ndarray], np.ndarray, np.ndarray]:
+        """ Flat index of the destination pixels that fall inside the source grid and their source coordinates """
+        with np.errstate(invalid="ignore"):
+            inside = (self.cols >= 0) & (self.cols < self.src_shape[1]) & \
+                     (self.rows >= 0) & (self.rows < self.src_shape[0])
+        inside = inside.ravel()
+        if inside.all():
+            return slice(None), self.cols.ravel(), self.rows.ravel()
+        dst_index = np.flatnonzero(inside)
+        return dst_index, self.cols.ravel()[dst_index], self.rows.ravel()[dst_index]
+
+    def _get_indices(self, resampling:rasterio.warp.Resampling) -> Tuple:
+        with self._lock:
+            if resampling in self._indices:
+                return self._indices[resampling]
+
+        dst_index, cols, rows = self._dst_index()
+        width = self.src_shape[1]
+        if resampling == rasterio.warp.Resampling.nearest:
+            src_index = np.floor(rows).astype(np.int64) * width + np.floor(cols).astype(np.int64)
+            indices = (dst_index, src_index)
+        else:
+            # 2x2 neighbourhood of pixel centers. Neighbours outside the source grid get weight 0
+            x, y = cols - .5, rows - .5
+            x0, y0 = np.floor(x), np.floor(y)
+            wx, wy = x - x0, y - y0
+            x0, y0 = x0.astype(np.int64), y0.astype(np.int64)
+            src_index = []
+            weights = []
+            for dy, wy_n in [(0, 1 - wy), (1, wy)]:
+                for dx, wx_n in [(0, 1 - wx), (1, wx)]:
+                    yn, xn = y0 + dy, x0 + dx
+                    inside = (yn >= 0) & (yn < self.src_shape[0]) & (xn >= 0) & (xn < width)
+                    src_index.append(np.where(inside, yn * width + xn, 0))
+                    weights.append(np.where(inside, wy_n * wx_n, 0))
+            indices = (dst_index, np.stack(src_index), np.stack(weights).astype(np.float32))
+
+        with self._lock:
+            self._indices[resampling] = indices
+        return indices
+
+    def apply(self, source:np.ndarray, destination:Optional[np.ndarray]=None,
+              resampling:rasterio.warp.Resampling=rasterio.warp.Resampling.nearest,
+              src_nodata:Optional[Union[int, float]]=None,
+              dst_nodata:Optional[Union[int, float]]=None) -> np.ndarray:
+        """
+        Resamples `source` to the destination grid.
+
+        Args:
+            source: (..., H, W) array on the source grid.
+            destination: Optional. C-contiguous (..., H_dst, W_dst) array where the result is written. If not
+                provided a new array with the dtype of `source` is allocated.
+            resampling: `rasterio.warp.Resampling.nearest` or `rasterio.warp.Resampling.bilinear`.
+            src_nodata: nodata value of `source`. Pixels with this value are not used in the interpolation.
+            dst_nodata: value of the destination pixels without valid data. Defaults to `src_nodata` or 0.
+
+        Returns:
+            `destination` array.
+        """
+        assert resampling in RESAMPLINGS, f"Resampling {resampling} not supported. Expected one of {RESAMPLINGS}"
+        assert source.shape[-2:] == self.src_shape, \
+            f"Unexpected shape of source {source.shape}. Expected spatial shape {self.src_shape}"
+
+        if destination is None:
+            destination = np.empty(source.shape[:-2] + self.dst_shape, dtype=source.dtype)
+        assert destination.shape == source.shape[:-2] + self.dst_shape, \
+            f"Unexpected shape of destination {destination.shape} expected {source.shape[:-2] + self.dst_shape}"
+        assert destination.flags.c_contiguous, "destination must be C-contiguous"
+
+        if dst_nodata is None:
+            dst_nodata = 0 if src_nodata is None else src_nodata
+
+        src = source.reshape((-1, self.src_shape[0] * self.src_shape[1]))
+        dst = destination.reshape((-1, self.dst_shape[0] * self.dst_shape[1]))
+        dst[...] = dst_nodata
+
+        if resampling == rasterio.warp.Resampling.nearest:
+            dst_index, src_index = self._get_indices(resampling)
+            values = src[:, src_index]
+            if (src_nodata is not None) and (src_nodata != dst_nodata):
+                values[window_utils.is_nodata(values, src_nodata)] = dst_nodata
+            dst[:, dst_index] = values
+            return destination
+
+        dst_index, src_index, weights = self._get_indices(resampling)
+        dtype_acc = np.result_type(src.dtype, np.float32)
+        acc = np.zeros((src.shape[0], weights.shape[1]), dtype=dtype_acc)
+        weight_sum = np.zeros_like(acc)
+        for src_index_n, weights_n in zip(src_index, weights):
+            values = src[:, src_index_n]
+            if src_nodata is not None:
+                invalid = window_utils.is_nodata(values, src_nodata)
+                weights_n = np.where(invalid, 0, weights_n)
+                values[invalid] = 0
+            acc += values * weights_n
+            weight_sum += weights_n
+
+        valid = weight_sum > 0
+        np.divide(acc, weight_sum, out=acc, where=valid)
+        if np.issubdtype(dst.dtype, np.integer):
+            info = np.iinfo(dst.dtype)
+            np.clip(np.rint(acc, out=acc), info.min, info.max, out=acc)
+        acc[~valid] = dst_nodata
+        dst[:, dst_index] = acc
+        return destination
+
+
+_LOCK = threading.Lock()
+_PLANS: "OrderedDict[Hashable, ReprojectionPlan]" = OrderedDict()
+
+
+def get_plan(src_transform:rasterio.Affine, src_crs:Any, src_shape:Tuple[int, int],
+             dst_transform:rasterio.Affine, dst_crs:Any, dst_shape:Tuple[int, int]) -> ReprojectionPlan:
+    """
+    Returns the `ReprojectionPlan` between the source and destination grids. Plans are cached (LRU cache of
+    `MAX_CACHED_PLANS` plans) so grids repeated in consecutive calls are computed only once.
+    """
+    key = (tuple(src_transform), window_utils._normalize_crs(src_crs), tuple(int(s) for s in src_shape),
+           tuple(dst_transform), window_utils._normalize_crs(dst_crs), tuple(int(s) for s in dst_shape))
+    with _LOCK:
+        if key in _PLANS:
+            _PLANS.move_to_end(key)
+            return _PLANS[key]
+
+    plan = ReprojectionPlan(src_transform, src_crs, src_shape, dst_transform, dst_crs, dst_shape)
+
+    with _LOCK:
+        _PLANS[key] = plan
+        while len(_PLANS) > MAX_CACHED_PLANS:
+            _PLANS.popitem(last=False)
+    return plan
+
+
+def clear_cache() -> None:
+    """ Removes all the plans of the cache """
+    with _LOCK:
+        _PLANS.clear()
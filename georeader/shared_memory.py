@@ -0,0 +1,114 @@
+"""
+Transport of GeoTensors between processes through `multiprocessing.shared_memory`.
+
+Results of `multiprocessing` (or `torch.utils.data.DataLoader`) workers are pickled and copied to the parent process.
+With `load_shared` the worker reads the data directly into a shared memory segment and returns a small picklable
+`SharedGeoTensor` handle; the parent maps the same memory without copying it::
+
+    def worker(reader):
+        return shared_memory.load_shared(reader)
+
+    with multiprocessing.Pool(4) as pool:
+        for handle in pool.imap(worker, readers):
+            geotensor = handle.geotensor()
+            ...
+            handle.unlink()  # free the segment once it is not needed
+
+The process that receives the handle is responsible for calling `unlink` (the segment is not freed when the worker
+ends).
+"""
+from multiprocessing import shared_memory
+from typing import Any, Dict, Optional, Tuple, Union
+import numpy as np
+import rasterio
+from georeader.abstract_reader import GeoData
+from georeader.geotensor import GeoTensor
+from georeader import read
+
+
+class SharedGeoTensor:
+    """
+    Picklable handle of a GeoTensor whose values are stored in a shared memory segment. Pickling the handle only sends
+    the name of the segment and the geographic metadata.
+
+    Args:
+        name: name of the shared memory segment.
+        shape: shape of the array.
+        dtype: dtype of the array.
+        transform: geotransform of the GeoTensor.
+        crs: crs of the GeoTensor.
+        fill_value_default: fill value of the GeoTensor.
+
+    """
+    def __init__(self, name:str, shape:Tuple[int, ...], dtype:Any, transform:rasterio.Affine, crs:Any,
+                 fill_value_default:Optional[Union[int, float]]=0):
+        self.name = name
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.transform = transform
+        self.crs = crs
+        self.fill_value_default = fill_value_default
+        self._shm: Optional[shared_memory.SharedMemory] = None
+
+    @staticmethod
+    def create(shape:Tuple[int, ...], dtype:Any, transform:rasterio.Affine, crs:Any,
+               fill_value_default:Optional[Union[int, float]]=0) -> 'SharedGeoTensor':
+        """ Allocates a new shared memory segment for an array of `shape` and `dtype` """
+        nbytes = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+        shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        shared = SharedGeoTensor(shm.name, shape, dtype, transform, crs, fill_value_default)
+        shared._shm = shm
+        return shared
+
+    def _attach(self) -> shared_memory.SharedMemory:
+        if self._shm is None:
+            self._shm = shared_memory.SharedMemory(name=self.name)
+        return self._shm
+
+    @property
+    def values(self) -> np.ndarray:
+        """ np.ndarray backed by the shared memory segment """
+        return np.ndarray(self.shape, dtype=self.dtype, buffer=self._attach().buf)
+
+    def geotensor(self) -> GeoTensor:
+        """ Returns the GeoTensor. Its values are a view of the shared memory (no copies) """
+        return GeoTensor(self.values, transform=self.transform, crs=self.crs,
+                         fill_value_default=self.fill_value_default)
+
+    def close(self) -> None:
+        """ Closes the access to the segment from this process (the arrays returned by `values` become invalid) """
+        if self._shm is not None:
+            self._shm.close()
+            self._shm = None
+
+    def unlink(self) -> None:
+        """ Frees the shared memory segment. The arrays already mapped remain valid until they are deleted """
+        self._attach().unlink()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state["_shm"] = None
+        return state
+
+    def __setstate__(self, state:Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+
+    def __repr__(self) -> str:
+        return f"SharedGeoTensor(name={self.name}, shape={self.shape}, dtype={self.dtype})"
+
+
+def load_shared(data_in:GeoData) -> SharedGeoTensor:
+    """
+    Loads `data_in` (boundless) into a new shared memory segment. Readers that support the `out` argument in `load`
+    (e.g. `RasterioReader`) read directly into the shared memory.
+
+    Args:
+        data_in: GeoData to load.
+
+    Returns:
+        `SharedGeoTensor` handle. Pickle it to send it to other processes.
+    """
+    shared = SharedGeoTensor.create(data_in.shape, data_in.dtype, transform=data_in.transform, crs=data_in.crs,
+                                    fill_value_default=getattr(data_in, "fill_value_default", 0))
+    read._load_into(data_in, shared.values, boundless=True)
+    return shared
@@ -0,0 +1,195 @@
+"""
+Zero-decode reads of uncompressed local GeoTIFFs with `np.memmap`.
+
+Uncompressed GeoTIFFs whose blocks are stored contiguously in the file can be mapped in memory and sliced without
+going through GDAL:
+
+* striped files (pixel or band interleaved): windows are returned as views of the memory map (no copy at all).
+* tiled files: windows are gathered from the tiles of the memory map (one copy, no decoding).
+
+`get_tiff_memmap` inspects the layout of the file (only once per file: the result is cached) and returns None for any
+other layout (compressed, sparse, bit-packed, remote files...) so that the caller falls back to GDAL.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Tuple
+import numpy as np
+import rasterio
+import rasterio.windows
+
+# Maximum number of files whose layout is cached
+MAX_CACHED_FILES = 128
+
+
+def _block_offsets(src:rasterio.DatasetReader, bidx:int, n_blocks_y:int,
+                   n_blocks_x:int) -> Tuple[np.ndarray, np.ndarray]:
+    """ Offsets and sizes (in bytes) of the blocks of band `bidx` with shape (n_blocks_y, n_blocks_x) """
+    offsets = np.zeros((n_blocks_y, n_blocks_x), dtype=np.int64)
+    sizes = np.zeros((n_blocks_y, n_blocks_x), dtype=np.int64)
+    for y in range(n_blocks_y):
+        for x in range(n_blocks_x):
+            offset = src.get_tag_item(f"BLOCK_OFFSET_{x}_{y}", "TIFF", bidx=bidx)
+            size = src.get_tag_item(f"BLOCK_SIZE_{x}_{y}", "TIFF", bidx=bidx)
+            if (offset is None) or (size is None):
+                raise ValueError(f"Block {x} {y} of band {bidx} not found")
+            offsets[y, x] = int(offset)
+            sizes[y, x] = int(size)
+    return offsets, sizes
+
+
+class TiffMemmap:
+    """
+    Memory map of an uncompressed GeoTIFF.
+
+    Args:
+        image: (C, H, W) view of the memory map for striped files. None for tiled files.
+        tiles: (C, n_tiles_y, tile_height, n_tiles_x, tile_width) view of the memory map for tiled files.
+        height: height of the raster.
+        width: width of the raster.
+
+    """
+    def __init__(self, height:int, width:int, image:Optional[np.ndarray]=None, tiles:Optional[np.ndarray]=None):
+        assert (image is None) != (tiles is None), "Expected either image or tiles"
+        self.height = height
+        self.width = width
+        self.image = image
+        self.tiles = tiles
+
+    @property
+    def is_view(self) -> bool:
+        """ Whether `read` returns views of the memory map (striped files in the byte order of the machine) """
+        return (self.image is not None) and self.image.dtype.isnative
+
+    @staticmethod
+    def from_dataset(src:rasterio.DatasetReader) -> Optional['TiffMemmap']:
+        """ Returns the memory map of the open raster `src` or None if its layout can't be mapped """
+        if (src.driver != "GTiff") or (src.compression is not None) or (len(set(src.dtypes)) != 1):
+            return None
+        if "NBITS" in src.tags(ns="IMAGE_STRUCTURE"):
+            return None
+        try:
+            dtype = np.dtype(src.dtypes[0])
+        except TypeError:
+            return None
+
+        with open(src.name, "rb") as fh:
+            byte_order = fh.read(2)
+        if byte_order not in (b"II", b"MM"):
+            return None
+        dtype = dtype.newbyteorder("<" if byte_order == b"II" else ">")
+
+        count, height, width = src.count, src.height, src.width
+        block_height, block_width = src.block_shapes[0]
+        pixel_interleave = src.tags(ns="IMAGE_STRUCTURE").get("INTERLEAVE", "PIXEL") == "PIXEL"
+        # Strips span the full width. Tiles may be wider than the image (e.g. 256x256 tiles in a 200 pixels wide image)
+        tiled = block_width != width
+        n_blocks_y = -(-height // block_height)
+        n_blocks_x = -(-width // block_width)
+
+        bands = [1] if pixel_interleave else list(range(1, count + 1))
+        try:
+            offsets = np.stack([_block_offsets(src, b, n_blocks_y, n_blocks_x)[0] for b in bands])
+        except ValueError:
+            return None
+
+        itemsize = dtype.itemsize * (count if pixel_interleave else 1)
+        if tiled:
+            # Blocks must be stored in order: (band,) tile row, tile col
+            block_nbytes = block_height * block_width * itemsize
+            expected = offsets.flat[0] + np.arange(offsets.size, dtype=np.int64).reshape(offsets.shape) * block_nbytes
+            if not np.array_equal(offsets, expected):
+                return None
+            shape = (n_blocks_y, n_blocks_x, block_height, block_width)
+            if pixel_interleave:
+                mm = np.memmap(src.name, dtype=dtype, mode="r", offset=int(offsets.flat[0]), shape=shape + (count,))
+                tiles = mm.transpose(4, 0, 2, 1, 3)
+            else:
+                mm = np.memmap(src.name, dtype=dtype, mode="r", offset=int(offsets.flat[0]), shape=(count,) + shape)
+                tiles = mm.transpose(0, 1, 3, 2, 4)
+            return TiffMemmap(height, width, tiles=tiles)
+
+        # Striped: strips must be stored in order and the bands one after the other
+        strip_nbytes = block_height * width * itemsize
+        n_strips = offsets.size
+        expected = offsets.flat[0] + np.arange(n_strips, dtype=np.int64) * strip_nbytes
+        if not pixel_interleave:
+            # The last strip of each band may be shorter
+            band_nbytes = height * width * itemsize
+            expected = offsets.flat[0] + np.concatenate([b * band_nbytes + np.arange(n_blocks_y, dtype=np.int64) * strip_nbytes
+                                                         for b in range(count)])
+        if not np.array_equal(offsets.ravel(), expected):
+            return None
+
+        if pixel_interleave:
+            mm = np.memmap(src.name, dtype=dtype, mode="r", offset=int(offsets.flat[0]), shape=(height, width, count))
+            image = mm.transpose(2, 0, 1)
+        else:
+            image = np.memmap(src.name, dtype=dtype, mode="r", offset=int(offsets.flat[0]), shape=(count, height, width))
+        return TiffMemmap(height, width, image=image)
+
+    def read(self, window:rasterio.windows.Window, indexes:List[int]) -> np.ndarray:
+        """
+        Reads an integer `window` contained in the raster.
+
+        Args:
+            window: window to read. It must be contained in the raster.
+            indexes: 1-based bands to read
+
+        Returns:
+            (len(indexes), window.height, window.width) array. If `self.is_view` and `indexes` are consecutive it is a
+            read only view of the memory map.
+        """
+        row_off, col_off = int(window.row_off), int(window.col_off)
+        slice_rows = slice(row_off, row_off + int(window.height))
+        slice_cols = slice(col_off, col_off + int(window.width))
+
+        bands = [b - 1 for b in indexes]
+        if (len(bands) > 0) and (bands == list(range(bands[0], bands[0] + len(bands)))):
+            slice_bands = slice(bands[0], bands[0] + len(bands))
+        else:
+            slice_bands = bands
+
+        if self.image is not None:
+            return self.image[slice_bands, slice_rows, slice_cols]
+
+        tile_height, tile_width = self.tiles.shape[2], self.tiles.shape[4]
+        tile_row_start, tile_row_end = slice_rows.start // tile_height, (slice_rows.stop - 1) // tile_height + 1
+        tile_col_start, tile_col_end = slice_cols.start // tile_width, (slice_cols.stop - 1) // tile_width + 1
+        tiles = self.tiles[slice_bands, tile_row_start:tile_row_end, :, tile_col_start:tile_col_end]
+        shape = tiles.shape
+        mosaic = tiles.reshape(shape[0], shape[1] * shape[2], shape[3] * shape[4])
+        return mosaic[:, (slice_rows.start - tile_row_start * tile_height):(slice_rows.stop - tile_row_start * tile_height),
+                      (slice_cols.start - tile_col_start * tile_width):(slice_cols.stop - tile_col_start * tile_width)]
+
+
+_LOCK = threading.Lock()
+_MEMMAPS: "OrderedDict[Hashable, Optional[TiffMemmap]]" = OrderedDict()
+
+
+def get_tiff_memmap(path:str) -> Optional[TiffMemmap]:
+    """
+    Returns the `TiffMemmap` of the local GeoTIFF `path` or None if the file can't be mapped in memory. The layout of
+    the file is inspected once (the result is cached while the file is not modified).
+    """
+    if not os.path.isfile(path):
+        return None
+
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    with _LOCK:
+        if key in _MEMMAPS:
+            _MEMMAPS.move_to_end(key)
+            return _MEMMAPS[key]
+
+    try:
+        with rasterio.open(path) as src:
+            tiff_memmap = TiffMemmap.from_dataset(src)
+    except rasterio.errors.RasterioIOError:
+        tiff_memmap = None
+
+    with _LOCK:
+        _MEMMAPS[key] = tiff_memmap
+        while len(_MEMMAPS) > MAX_CACHED_FILES:
+            _MEMMAPS.popitem(last=False)
+    return tiff_memmap
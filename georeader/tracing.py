@@ -0,0 +1,265 @@
+"""
+Tracing of the I/O done by the readers.
+
+Use `georeader.trace()` to record what each read costs::
+
+    import georeader
+
+    with georeader.trace() as t:
+        data = read.read_reproject_like(reader, data_like)
+
+    print(t)  # table with one row per traced function
+    t.summary()["RasterioReader.read"]["http_requests"]
+
+Per traced function (e.g. `RasterioReader.read`, `S2Image.load`, `ProbaV._load_bands`, `read_reproject`) it
+aggregates:
+
+* calls: number of calls.
+* files_opened: number of files opened (datasets reused from the `georeader.dataset_pool` are not counted).
+* open_time: time spent opening files (in remote files this is mostly fetching the header).
+* read_time: time spent inside the read calls of GDAL/h5py (fetching the data that was not fetched at open time
+  and decoding it).
+* http_requests, http_bytes: HTTP range requests issued by GDAL (`/vsicurl/`, `/vsigs/`, `/vsis3/`...) and bytes
+  requested in them. They are counted from the debug messages of GDAL, so they are only available for files read
+  with GDAL and when the trace is created with `http=True`.
+* wall_time: elapsed time of the calls.
+* output_bytes: size of the arrays returned.
+
+Times spent in several threads add up, so `open_time` and `read_time` can be larger than the `wall_time`.
+
+Counters of nested calls are also added to the outer calls (e.g. the files opened in the `RasterioReader.read` calls
+of `S2Image.load` are counted in both). Tracing is process wide: calls made from other threads while the trace is
+active are also recorded.
+"""
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional
+import rasterio
+
+COUNTERS = ["calls", "files_opened", "open_time", "read_time", "http_requests", "http_bytes", "wall_time",
+            "output_bytes"]
+
+# Logger where rasterio sends the debug messages of GDAL ("CPLE_None in VSICURL: Downloading 0-16383 (...)...")
+_GDAL_LOGGER = "rasterio._env"
+_DOWNLOAD_RE = re.compile(r"Downloading ([0-9,\-]+)")
+
+_LOCK = threading.Lock()
+_ACTIVE: List["Trace"] = []
+_LOCAL = threading.local()
+
+
+class Trace:
+    """
+    Aggregated counters of the traced functions called while the `trace` context is active.
+
+    Attributes:
+        http: if True the HTTP requests of GDAL are counted.
+        stats: dict function name -> dict counter -> value.
+
+    """
+    def __init__(self, http:bool=True):
+        self.http = http
+        self.stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _add_call(self, function:str, counters:Dict[str, float]) -> None:
+        with self._lock:
+            stats_fun = self.stats.setdefault(function, {c: 0 for c in COUNTERS})
+            stats_fun["calls"] += 1
+            for k, v in counters.items():
+                stats_fun[k] += v
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """ Returns a copy of the counters of each traced function """
+        with self._lock:
+            return {k: dict(v) for k, v in self.stats.items()}
+
+    def __repr__(self) -> str:
+        summary = self.summary()
+        if len(summary) == 0:
+            return "Trace(no traced calls)"
+
+        width = max(len(f) for f in summary)
+        lines = [" ".join([f"{'function':<{width}}"] + [f"{c:>13}" for c in COUNTERS])]
+        for function, stats_fun in summary.items():
+            values = [f"{v:>13.3f}" if c.endswith("_time") else f"{int(v):>13d}" for c, v in stats_fun.items()]
+            lines.append(" ".join([f"{function:<{width}}"] + values))
+        return "\n".join(lines)
+
+
+class _GDALDownloadCounter(logging.Filter):
+    """
+    Filter of the GDAL logger that counts the HTTP range requests. It drops the debug messages that were enabled only
+    for counting so that they do not reach the handlers of the user.
+    """
+    def __init__(self, level_user:int, level_logger:int):
+        super().__init__()
+        self.level_user = level_user
+        self.level_logger = level_logger
+
+    def filter(self, record:logging.LogRecord) -> bool:
+        message = record.getMessage()
+        match = _DOWNLOAD_RE.search(message)
+        if match is not None:
+            nbytes = 0
+            for byte_range in match.group(1).split(","):
+                start, _, end = byte_range.partition("-")
+                if start and end:
+                    nbytes += int(end) - int(start) + 1
+            add(http_requests=1, http_bytes=nbytes)
+        return record.levelno >= self.level_user
+
+
+_GDAL_FILTER: Optional[_GDALDownloadCounter] = None
+
+
+def _http_traced() -> bool:
+    return any(t.http for t in _ACTIVE)
+
+
+def _update_gdal_logger() -> None:
+    """ Installs or removes the counter of HTTP requests depending on the active traces. Called with _LOCK acquired """
+    global _GDAL_FILTER
+    logger = logging.getLogger(_GDAL_LOGGER)
+    if _http_traced() and (_GDAL_FILTER is None):
+        _GDAL_FILTER = _GDALDownloadCounter(logger.getEffectiveLevel(), logger.level)
+        logger.addFilter(_GDAL_FILTER)
+        logger.setLevel(logging.DEBUG)
+    elif not _http_traced() and (_GDAL_FILTER is not None):
+        logger.removeFilter(_GDAL_FILTER)
+        logger.setLevel(_GDAL_FILTER.level_logger)
+        _GDAL_FILTER = None
+
+
+@contextmanager
+def trace(http:bool=True) -> Iterator[Trace]:
+    """
+    Context manager that records the I/O of the readers (see module docstring).
+
+    Args:
+        http: count the HTTP range requests of GDAL. This turns on the debug messages of GDAL (`CPL_DEBUG`) in the
+            reads done inside the context, which has a small overhead.
+
+    Returns:
+        `Trace` object with the aggregated counters.
+    """
+    t = Trace(http=http)
+    with _LOCK:
+        _ACTIVE.append(t)
+        _update_gdal_logger()
+    try:
+        yield t
+    finally:
+        with _LOCK:
+            _ACTIVE.remove(t)
+            _update_gdal_logger()
+
+
+def is_active() -> bool:
+    return len(_ACTIVE) > 0
+
+
+def _stack() -> List[Dict[str, float]]:
+    stack = getattr(_LOCAL, "stack", None)
+    if stack is None:
+        stack = []
+        _LOCAL.stack = stack
+    return stack
+
+
+def add(**counters:float) -> None:
+    """ Adds `counters` to the calls being traced in the current thread (no-op if there is no active trace) """
+    if not _ACTIVE:
+        return
+    stack = getattr(_LOCAL, "stack", None)
+    if not stack:
+        return
+    with _LOCK:
+        for record in stack:
+            for k, v in counters.items():
+                record[k] += v
+
+
+@contextmanager
+def timed(counter:str) -> Iterator[None]:
+    """ Adds the elapsed time of the block to `counter` of the calls being traced """
+    if not _ACTIVE:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add(**{counter: time.perf_counter() - start})
+
+
+def gdal_env() -> ContextManager:
+    """ GDAL options needed to count the HTTP requests. Use it around the reads: `with tracing.gdal_env(): ...` """
+    if _ACTIVE and _http_traced():
+        return rasterio.Env(CPL_DEBUG="ON")
+    return nullcontext()
+
+
+def bind(fn:Callable) -> Callable:
+    """
+    Returns `fn` wrapped so that, when called from other thread, the counters are added to the calls being traced in
+    the current thread. Use it for the functions submitted to a pool of threads.
+    """
+    if not _ACTIVE:
+        return fn
+    stack_caller = list(_stack())
+
+    @wraps(fn)
+    def fn_bound(*args, **kwargs):
+        stack_before = getattr(_LOCAL, "stack", None)
+        _LOCAL.stack = stack_caller
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _LOCAL.stack = stack_before
+
+    return fn_bound
+
+
+def _output_bytes(output:Any) -> int:
+    if hasattr(output, "values") and hasattr(output.values, "nbytes"):
+        return output.values.nbytes
+    if hasattr(output, "nbytes"):
+        return output.nbytes
+    if isinstance(output, (list, tuple)):
+        return sum(_output_bytes(o) for o in output)
+    return 0
+
+
+def traced(function:str) -> Callable[[Callable], Callable]:
+    """ Decorator that records the calls of the decorated function under the name `function` """
+    def decorator(fn:Callable) -> Callable:
+        @wraps(fn)
+        def fn_traced(*args, **kwargs):
+            if not _ACTIVE:
+                return fn(*args, **kwargs)
+
+            record = {c: 0 for c in COUNTERS if c not in ["calls", "wall_time", "output_bytes"]}
+            stack = _stack()
+            stack.append(record)
+            start = time.perf_counter()
+            output = None
+            try:
+                output = fn(*args, **kwargs)
+                return output
+            finally:
+                stack.pop()
+                record["wall_time"] = time.perf_counter() - start
+                record["output_bytes"] = _output_bytes(output)
+                with _LOCK:
+                    traces = list(_ACTIVE)
+                for t in traces:
+                    t._add_call(function, record)
+
+        return fn_traced
+
+    return decorator
@@ -103,6 +103,13 @@ def _is_exact_round(x, precision=PIXEL_PRECISION):
     return abs(round(x)-x) < precision
 
 
+def is_nodata(values:np.ndarray, nodata:Union[int, float]) -> np.ndarray:
+    """ Boolean mask of the pixels of `values` equal to `nodata` (NaN aware) """
+    if isinstance(nodata, (float, np.floating)) and np.isnan(nodata):
+        return np.isnan(values)
+    return values == nodata
+
+
 def res(transform:rasterio.Affine) -> Tuple[float, float]:
     """
     Computes the resolution from a given transform
@@ -11,8 +11,8 @@ def parse_requirements_file(filename):
 # Optional Packages
 # See https://godatadriven.com/blog/a-practical-guide-to-using-setup-py/
 EXTRAS = {
-    "all": ["geopandas", "h5py", "zarr"],
-    "tests": ["pytest"],
+    "all": ["geopandas", "h5py", "zarr", "dask"],
+    "tests": ["pytest", "dask"],
     "docs": [ ],
 }
 
@@ -0,0 +1,21 @@
+import rasterio
+import numpy as np
+
+TRANSFORM = rasterio.Affine(10, 0, 500000, 0, -10, 4500000)
+
+
+def create_raster(path:str, count:int=3, height:int=300, width:int=200, **profile_add) -> np.ndarray:
+    """
+    Creates a small local GeoTIFF to test without network access: uint16 values in [1, 1000), nodata 0, EPSG:32630
+    and 10m pixels. `profile_add` updates the profile (e.g. `tiled=True, blockxsize=64, blockysize=64`).
+
+    Returns:
+        (count, height, width) array with the values written
+    """
+    values = np.random.default_rng(0).integers(1, 1000, size=(count, height, width)).astype(np.uint16)
+    profile = dict(driver="GTiff", count=count, height=height, width=width, dtype="uint16", crs="EPSG:32630",
+                   transform=TRANSFORM, nodata=0)
+    profile.update(profile_add)
+    with rasterio.open(path, "w", **profile) as dst:
+        dst.write(values)
+    return values
@@ -0,0 +1,53 @@
+import pytest
+da = pytest.importorskip("dask.array")
+
+from georeader import dask_utils, read, rasterio_reader
+from georeader.dask_utils import DaskGeoData
+import rasterio
+import rasterio.windows
+import numpy as np
+import pickle
+import os
+from conftest import create_raster
+
+
+def _reader(tmp_path) -> rasterio_reader.RasterioReader:
+    path = os.path.join(tmp_path, "raster.tif")
+    create_raster(path, count=2, tiled=True, blockxsize=64, blockysize=64)
+    return rasterio_reader.RasterioReader(path)
+
+
+def test_to_dask(tmp_path, monkeypatch):
+    monkeypatch.setattr(dask_utils, "DEFAULT_CHUNK_SHAPE", (100, 100))
+    reader = _reader(tmp_path)
+    array = reader.to_dask()
+    assert array.shape == reader.shape
+    assert array.chunks == ((2,), (64, 64, 64, 64, 44), (64, 64, 64, 8))
+    np.testing.assert_array_equal(array.compute(), reader.load().values)
+
+    # Chunks aligned with the blocks of the file
+    reader_window = reader.read_from_window(rasterio.windows.Window(col_off=-10, row_off=100, width=150,
+                                                                    height=120))
+    array = reader_window.to_dask()
+    assert array.chunks == ((2,), (28, 64, 28), (10, 64, 64, 12))
+    np.testing.assert_array_equal(array.compute(), reader_window.load().values)
+
+    # The graph only has the windows: it can be pickled and computed in other processes
+    array = reader.to_dask(chunks=(128, 128))
+    assert array.chunks[1:] == ((128, 128, 44), (128, 72))
+    np.testing.assert_array_equal(pickle.loads(pickle.dumps(array)).compute(scheduler="processes"),
+                                  reader.load().values)
+
+
+def test_dask_geodata(tmp_path):
+    reader = _reader(tmp_path)
+    data = DaskGeoData(reader.to_dask(chunks=(64, 64)), transform=reader.transform, crs=reader.crs)
+    assert data.shape == reader.shape
+    window = rasterio.windows.Window(col_off=-10, row_off=250, width=100, height=100)
+    np.testing.assert_array_equal(read.read_from_window(data, window, trigger_load=True).values,
+                                  read.read_from_window(reader, window, trigger_load=True).values)
+
+    bounds = (-2.999, 40.646, -2.991, 40.65)
+    out = read.read_reproject(data, dst_crs="EPSG:4326", bounds=bounds, resolution_dst_crs=1e-4)
+    expected = read.read_reproject(reader, dst_crs="EPSG:4326", bounds=bounds, resolution_dst_crs=1e-4)
+    np.testing.assert_array_equal(out.values, expected.values)
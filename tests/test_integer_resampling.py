@@ -0,0 +1,155 @@
+from georeader import integer_resampling, read
+from georeader.geotensor import GeoTensor
+import rasterio
+import rasterio.warp
+import numpy as np
+import pytest
+import os
+
+Resampling = rasterio.warp.Resampling
+
+TRANSFORM = rasterio.Affine(10, 0, 500000, 0, -10, 4500000)
+
+
+def _geotensor(dtype) -> GeoTensor:
+    values = np.random.default_rng(0).integers(1, 6, size=(2, 48, 60)).astype(dtype)
+    values[0, 5:15, 3:20] = 0
+    values[1, ::7, ::5] = 0
+    return GeoTensor(values, transform=TRANSFORM, crs="EPSG:32630", fill_value_default=0)
+
+
+def _warp(data:GeoTensor, dst_transform:rasterio.Affine, dst_shape, resampling, dtype=None) -> np.ndarray:
+    # Band by band (the nodata masks of the bands are different)
+    expected = np.zeros(data.shape[:-2] + dst_shape, dtype=dtype or data.dtype)
+    nodata = data.fill_value_default
+    for values_band, expected_band in zip(data.values, expected):
+        rasterio.warp.reproject(values_band.astype(expected.dtype), expected_band, src_transform=data.transform,
+                                src_crs=data.crs, dst_transform=dst_transform, dst_crs=data.crs, src_nodata=nodata,
+                                dst_nodata=nodata, resampling=resampling)
+    return expected
+
+
+def test_integer_grid():
+    grid = integer_resampling.integer_grid(TRANSFORM, rasterio.Affine(30, 0, 500020, 0, -20, 4500000 - 40))
+    assert grid == integer_resampling.IntegerGrid(upsample=False, factor=(2, 3), offset=(4, 2))
+
+    grid = integer_resampling.integer_grid(TRANSFORM, rasterio.Affine(5, 0, 500030, 0, -10 / 3, 4500000 - 20))
+    assert grid == integer_resampling.IntegerGrid(upsample=True, factor=(3, 2), offset=(6, 6))
+
+    # Same grid, non integer ratio and misaligned origin
+    assert integer_resampling.integer_grid(TRANSFORM, TRANSFORM) is None
+    assert integer_resampling.integer_grid(TRANSFORM, rasterio.Affine(15, 0, 500000, 0, -15, 4500000)) is None
+    assert integer_resampling.integer_grid(TRANSFORM, rasterio.Affine(20, 0, 500005, 0, -20, 4500000)) is None
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.int16, np.float32])
+@pytest.mark.parametrize("factor", [(2, 2), (3, 3), (2, 3)])
+def test_read_reproject_downsample(dtype, factor):
+    data = _geotensor(dtype)
+    dst_transform = rasterio.Affine(10 * factor[1], 0, 500020, 0, -10 * factor[0], 4500000 - 40)
+    window_out = rasterio.windows.Window(0, 0, 60 // factor[1] - 1, 48 // factor[0] - 2)
+    for resampling in integer_resampling.RESAMPLINGS_DOWNSAMPLING:
+        out = read.read_reproject(data, dst_transform=dst_transform, window_out=window_out, resampling=resampling,
+                                  integer_factor=True)
+        assert out.transform == dst_transform
+        expected = _warp(data, dst_transform, out.shape[-2:], resampling)
+        if (resampling == Resampling.average) and np.issubdtype(dtype, np.integer):
+            # GDAL may round down averages that are exactly .5
+            np.testing.assert_allclose(out.values, expected, atol=1, err_msg=f"{resampling}")
+        else:
+            np.testing.assert_array_equal(out.values, expected, err_msg=f"{resampling}")
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.float32])
+@pytest.mark.parametrize("factor", [(2, 2), (3, 3), (2, 3)])
+def test_read_reproject_upsample(dtype, factor):
+    data = _geotensor(dtype)
+    # Starts inside the data and ends outside of it
+    dst_transform = rasterio.Affine(10 / factor[1], 0, 500030, 0, -10 / factor[0], 4500000 - 20)
+    window_out = rasterio.windows.Window(0, 0, 60 * factor[1], 48 * factor[0])
+    for resampling in integer_resampling.RESAMPLINGS_UPSAMPLING:
+        out = read.read_reproject(data, dst_transform=dst_transform, window_out=window_out, resampling=resampling,
+                                  integer_factor=True)
+        expected = _warp(data, dst_transform, out.shape[-2:], resampling)
+        if resampling == Resampling.bilinear:
+            np.testing.assert_array_equal(out.values == 0, expected == 0)
+            np.testing.assert_allclose(out.values, expected, atol=1 if dtype == np.uint8 else 1e-4)
+        else:
+            np.testing.assert_array_equal(out.values, expected, err_msg=f"{resampling}")
+
+
+def test_read_reproject_upsample_reader(tmp_path):
+    from georeader.rasterio_reader import RasterioReader
+    data = _geotensor(np.float32)
+    path = os.path.join(tmp_path, "raster.tif")
+    with rasterio.open(path, "w", driver="GTiff", height=48, width=60, count=2, dtype="float32", nodata=0,
+                       crs=data.crs, transform=data.transform) as dst:
+        dst.write(data.values)
+
+    # Starts outside the raster: the reader is padded with nodata, there is nothing to interpolate there
+    dst_transform = rasterio.Affine(5, 0, 500000 - 20, 0, -5, 4500000 + 20)
+    window_out = rasterio.windows.Window(0, 0, 130, 110)
+    reader = RasterioReader(path)
+    reader_focus = reader.read_from_window(rasterio.windows.Window(col_off=7, row_off=-3, width=40, height=40))
+    # GDAL warps of the array of a GeoTensor also fill the pixel before its first row/column with area resamplings
+    resamplings_reader = [Resampling.nearest, Resampling.bilinear]
+    for data_in, resamplings in [(reader, resamplings_reader), (reader_focus, resamplings_reader),
+                                 (data, integer_resampling.RESAMPLINGS_UPSAMPLING)]:
+        for resampling in resamplings:
+            out = read.read_reproject(data_in, dst_transform=dst_transform, window_out=window_out,
+                                      resampling=resampling, integer_factor=True)
+            expected = _warp(data, dst_transform, out.shape[-2:], resampling)
+            np.testing.assert_array_equal(out.values == 0, expected == 0, err_msg=f"{resampling}")
+            np.testing.assert_allclose(out.values, expected, atol=1e-4, err_msg=f"{resampling}")
+
+
+def test_resize_integer_factor():
+    data = _geotensor(np.float32)
+    out = read.resize(data, 20, resampling=Resampling.average, anti_aliasing=False, integer_factor=True)
+    assert out.transform == rasterio.Affine(20, 0, 500000, 0, -20, 4500000)
+    expected = _warp(data, out.transform, (24, 30), Resampling.average)
+    np.testing.assert_array_equal(out.values, expected)
+
+
+def test_downsample_nodata_collision():
+    # The sum of the valid pixels is the nodata value: GDAL moves it to nodata - 1
+    values = np.array([[3, 2], [1, 0]], dtype=np.uint8)
+    out = integer_resampling.downsample(values, (2, 2), Resampling.sum, src_nodata=3, dst_nodata=3)
+    assert out[0, 0] == 2
+    out = integer_resampling.downsample(values, (2, 2), Resampling.nearest, src_nodata=3, dst_nodata=3)
+    assert out[0, 0] == 0
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.int16, np.float32])
+@pytest.mark.parametrize("nodata", [0, 3])
+def test_read_reproject_nodata_in_data(dtype, nodata):
+    # Source pixels and valid outputs equal to the nodata value
+    values = np.random.default_rng(1).integers(0, 6, size=(2, 48, 60)).astype(dtype)
+    data = GeoTensor(values, transform=TRANSFORM, crs="EPSG:32630", fill_value_default=nodata)
+    grids = [(rasterio.Affine(20, 0, 500000, 0, -20, 4500000), (24, 30),
+              integer_resampling.RESAMPLINGS_DOWNSAMPLING),
+             (rasterio.Affine(30, 0, 500020, 0, -30, 4500000 - 40), (14, 19),
+              integer_resampling.RESAMPLINGS_DOWNSAMPLING),
+             # Blocks partly outside of the data: computed by GDAL
+             (rasterio.Affine(20, 0, 500000 - 40, 0, -20, 4500000 + 20), (26, 33),
+              integer_resampling.RESAMPLINGS_DOWNSAMPLING),
+             (rasterio.Affine(5, 0, 500030, 0, -10 / 3, 4500000 - 20), (144, 120),
+              integer_resampling.RESAMPLINGS_UPSAMPLING)]
+    for dst_transform, shape, resamplings in grids:
+        window_out = rasterio.windows.Window(0, 0, shape[1], shape[0])
+        for resampling in resamplings:
+            out = read.read_reproject(data, dst_transform=dst_transform, window_out=window_out,
+                                      resampling=resampling, integer_factor=True)
+            expected = _warp(data, dst_transform, shape, resampling)
+            if np.issubdtype(dtype, np.integer) and resampling in (Resampling.average, Resampling.bilinear):
+                # Outputs that fall exactly on .5 are rounded half to even (GDAL rounds them half up)
+                expected_float = _warp(data, dst_transform, shape, resampling, dtype=np.float64)
+                ties = np.abs(expected_float % 1 - .5) < 1e-6
+                assert np.all(np.abs(out.values - expected_float)[ties] <= 1.5 + 1e-6)
+                out_values, expected = out.values[~ties], expected[~ties]
+            else:
+                out_values = out.values
+            if dtype == np.float32:
+                np.testing.assert_allclose(out_values, expected, rtol=1e-6, err_msg=f"{resampling} {dst_transform}")
+            else:
+                np.testing.assert_array_equal(out_values, expected, err_msg=f"{resampling} {dst_transform}")
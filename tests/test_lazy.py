@@ -0,0 +1,113 @@
+from georeader import read
+from georeader.lazy import LazyGeoData
+from georeader.geotensor import GeoTensor
+from shapely.geometry import box
+import rasterio
+import rasterio.warp
+import rasterio.windows
+import numpy as np
+import os
+from conftest import create_raster
+
+Window = rasterio.windows.Window
+
+
+def _reader(tmp_path):
+    from georeader import rasterio_reader
+    path = os.path.join(tmp_path, "raster.tif")
+    create_raster(path, count=4, height=120, width=100)
+    with rasterio.open(path, "r+") as dst:
+        dst.write(np.zeros((4, 10, 30), dtype=np.uint16), window=Window(col_off=30, row_off=10, width=30, height=10))
+    return rasterio_reader.RasterioReader(path)
+
+
+def test_lazy_windows_and_bands(tmp_path):
+    reader = _reader(tmp_path)
+    for data in [reader, reader.load()]:
+        # Nested windows (the second one partially outside of the first one) and band selections
+        lazy = LazyGeoData(data).isel({"band": [3, 1, 0]}).read_from_window(Window(col_off=-10, row_off=20,
+                                                                                    width=60, height=50))
+        lazy = lazy.isel({"band": slice(0, 2)}).read_from_window(Window(col_off=40, row_off=-5, width=30, height=30))
+
+        plan = lazy.plan()
+        assert plan.bands == (3, 1)
+        assert len(plan.stages) == 1
+        assert plan.stages[0].window == Window(col_off=30, row_off=15, width=30, height=30)
+
+        expected = read.read_from_window(data, Window(col_off=-10, row_off=20, width=60, height=50),
+                                         trigger_load=True)
+        expected = read.read_from_window(expected, Window(col_off=40, row_off=-5, width=30, height=30),
+                                         trigger_load=True)
+        out = lazy.load()
+        assert lazy.shape == out.shape == (2, 30, 30)
+        assert lazy.transform == out.transform == expected.transform
+        np.testing.assert_array_equal(out.values, expected.values[[3, 1]])
+
+        # Works as a reader in the functions of read
+        polygon = box(500100, 4499300, 500400, 4499600)
+        np.testing.assert_array_equal(read.read_from_polygon(LazyGeoData(data), polygon, trigger_load=True).values,
+                                      read.read_from_polygon(data, polygon, trigger_load=True).values)
+
+
+def test_lazy_resampling(tmp_path):
+    reader = _reader(tmp_path)
+    bounds = (-2.999, 40.646, -2.991, 40.65)
+    lazy = LazyGeoData(reader).reproject(dst_crs="EPSG:4326", bounds=bounds, resolution_dst_crs=1e-4,
+                                         resampling=rasterio.warp.Resampling.bilinear)
+    lazy = lazy.resize(2e-4, anti_aliasing=False, resampling=rasterio.warp.Resampling.bilinear)
+    lazy = lazy.read_from_window(Window(col_off=5, row_off=5, width=20, height=20), boundless=False)
+
+    plan = lazy.plan()
+    assert len(plan.stages) == 1
+    assert plan.stages[0].resample.grid == (lazy.crs, lazy.transform, lazy.shape[-2:])
+
+    # The resamplings are collapsed: single reprojection from the reader to the final grid
+    out = lazy.load()
+    expected = read.read_reproject(reader, dst_crs="EPSG:4326", dst_transform=lazy.transform,
+                                   window_out=Window(col_off=0, row_off=0, width=lazy.shape[-1],
+                                                     height=lazy.shape[-2]),
+                                   resampling=rasterio.warp.Resampling.bilinear)
+    assert out.shape == lazy.shape
+    assert out.transform == lazy.transform
+    assert (out.values != 0).any()
+    np.testing.assert_array_equal(out.values, expected.values)
+
+
+def test_lazy_arithmetic():
+    values = np.random.default_rng(0).integers(1, 1000, size=(2, 60, 80)).astype(np.uint16)
+    values[:, 10:20, 30:60] = 0
+    data = GeoTensor(values, transform=rasterio.Affine(10, 0, 500000, 0, -10, 4500000), crs="EPSG:32630",
+                     fill_value_default=0)
+
+    lazy = (LazyGeoData(data).astype(np.float32) - 1) / 10
+    out = lazy.load()
+    assert out.dtype == lazy.dtype == np.float32
+    expected = np.where(values == 0, 0, (values.astype(np.float32) - 1) / 10)
+    np.testing.assert_allclose(out.values, expected)
+
+    # Arithmetic before a resampling splits the plan
+    lazy = lazy.resize(20, resampling=rasterio.warp.Resampling.average, anti_aliasing=False) * 2
+    assert len(lazy.plan().stages) == 2
+    out = lazy.load()
+    expected = read.resize(GeoTensor(expected, transform=data.transform, crs=data.crs), 20,
+                           resampling=rasterio.warp.Resampling.average, anti_aliasing=False)
+    assert out.shape == lazy.shape == expected.shape
+    np.testing.assert_allclose(out.values, expected.values * 2)
+
+
+def test_lazy_reproject_dst_nodata_zero():
+    values = np.random.default_rng(0).integers(1, 200, size=(2, 60, 80)).astype(np.uint8)
+    values[:, 10:20, 30:60] = 255
+    data = GeoTensor(values, transform=rasterio.Affine(10, 0, 500000, 0, -10, 4500000), crs="EPSG:32630",
+                     fill_value_default=255)
+
+    # The output extends beyond the data: those pixels are dst_nodata
+    kwargs = dict(bounds=(499900, 4499300, 500900, 4500100), resolution_dst_crs=20,
+                  resampling=rasterio.warp.Resampling.nearest, dst_nodata=0)
+    lazy = LazyGeoData(data).reproject(**kwargs)
+    assert lazy.fill_value_default == 0
+    out = lazy.load()
+    expected = read.read_reproject(data, **kwargs)
+    assert out.fill_value_default == expected.fill_value_default == 0
+    np.testing.assert_array_equal(out.values, expected.values)
+    assert np.all(out.values[:, :, :5] == 0)
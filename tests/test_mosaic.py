@@ -0,0 +1,40 @@
+from georeader import mosaic
+from georeader.geotensor import GeoTensor
+import rasterio
+import rasterio.warp
+import numpy as np
+
+
+def _products():
+    rng = np.random.default_rng(0)
+    products = []
+    for i in range(4):
+        values = rng.integers(1, 1000, size=(2, 100, 120)).astype(np.uint16)
+        # Holes of nodata in different places of each product
+        values[:, rng.integers(0, 100, size=800), rng.integers(0, 120, size=800)] = 0
+        values[:, 20 * i:20 * i + 30, :] = 0
+        transform = rasterio.Affine(10, 0, 500000 + 150 * i, 0, -10, 4500000 - 100 * i)
+        products.append(GeoTensor(values, transform=transform, crs="EPSG:32630", fill_value_default=0))
+    return products
+
+
+def _mask_high_values(data:GeoTensor) -> GeoTensor:
+    return GeoTensor(data.values[0] > 900, transform=data.transform, crs=data.crs)
+
+
+def test_spatial_mosaic_parallel():
+    products = _products()
+    kwargs = dict(window_size=(32, 48), resampling=rasterio.warp.Resampling.nearest)
+    expected = mosaic.spatial_mosaic(products, **kwargs)
+    assert expected.shape == (2, 130, 165)
+    # The products fill the holes of the first one
+    assert np.mean(expected.values == 0) < np.mean(products[0].values == 0)
+
+    for executor in ["thread", "process"]:
+        out = mosaic.spatial_mosaic(products, num_workers=3, executor=executor, **kwargs)
+        assert out.transform == expected.transform
+        np.testing.assert_array_equal(out.values, expected.values)
+
+    expected = mosaic.spatial_mosaic(products, masking_function=_mask_high_values, **kwargs)
+    out = mosaic.spatial_mosaic(products, masking_function=_mask_high_values, num_workers=3, **kwargs)
+    np.testing.assert_array_equal(out.values, expected.values)
@@ -1,8 +1,12 @@
 
 from georeader import rasterio_reader, read
+from georeader import dataset_pool, window_utils, tiff_memmap
 import rasterio
 import rasterio.windows
 import numpy as np
+import os
+import itertools
+from conftest import create_raster
 
 WINDOW_PLANET = rasterio.windows.Window(col_off=1000, row_off=1000, width=128, height=64)
 # WINDOW_PLANET_OUT_1 = rasterio.windows.Window(col_off=-10, row_off=-10, width=128, height=64)
@@ -79,12 +83,423 @@ def test_isel():
     assert data.shape == (2, window.height, window.width), f"Expected {(2, window.height, window.width)} found {data.shape}"
 
 
-
-
-
-
-
-
-
-
-
+def test_dataset_pool(tmp_path):
+    paths = [os.path.join(tmp_path, f"{i}.tif") for i in range(2)]
+    for p in paths:
+        create_raster(p)
+
+    window = rasterio.windows.Window(col_off=-5, row_off=-5, width=20, height=30)
+    data_expected = rasterio_reader.RasterioReader(paths).read(window=window)
+
+    pool = dataset_pool.get_dataset_pool()
+    pool.clear()
+    misses_before = pool.stats()["misses"]
+    reader = rasterio_reader.RasterioReader(paths, use_dataset_pool=True)
+    for _ in range(3):
+        data = reader.read(window=window)
+        assert np.all(data == data_expected), "Content of the array is different"
+
+    assert (pool.stats()["misses"] - misses_before) == len(paths), f"Expected one open per path {pool.stats()}"
+    assert reader.isel({"time": [0]}).use_dataset_pool, "use_dataset_pool not propagated"
+
+    # Simulate a fork: the pool should be rebuilt
+    pool._pid = -1
+    reader.read(window=window)
+    assert pool.stats()["misses"] == len(paths), f"Pool not rebuilt after pid change {pool.stats()}"
+
+
+def test_read_num_workers(tmp_path):
+    paths = [os.path.join(tmp_path, f"{i}.tif") for i in range(5)]
+    for p in paths:
+        create_raster(p)
+
+    for window in [rasterio.windows.Window(col_off=-5, row_off=-5, width=20, height=30),
+                   rasterio.windows.Window(col_off=10, row_off=20, width=20, height=30)]:
+        data_expected = rasterio_reader.RasterioReader(paths).read(window=window)
+        reader = rasterio_reader.RasterioReader(paths, num_workers=3)
+        data = reader.read(window=window)
+        assert data.shape == data_expected.shape, f"Different shapes {data.shape} {data_expected.shape}"
+        assert np.all(data == data_expected), "Content of the array is different"
+
+
+def test_metadata_cache(tmp_path, monkeypatch):
+    from georeader import metadata_cache
+    paths = [os.path.join(tmp_path, f"{i}.tif") for i in range(4)]
+    for p in paths:
+        create_raster(p)
+
+    path_sidecar = os.path.join(tmp_path, "metadata.json")
+    monkeypatch.setattr(metadata_cache, "_METADATA_CACHE", metadata_cache.MetadataCache(path_sidecar))
+
+    reader = rasterio_reader.RasterioReader(paths, use_metadata_cache=True)
+    reader_no_cache = rasterio_reader.RasterioReader(paths)
+    assert os.path.exists(path_sidecar), "Sidecar file not written"
+    assert reader.shape == reader_no_cache.shape, f"Different shapes {reader.shape} {reader_no_cache.shape}"
+    assert reader.transform == reader_no_cache.transform, "Different transforms"
+    assert window_utils.compare_crs(reader.crs, reader_no_cache.crs), "Different crs"
+    tags_expected = reader_no_cache.tags()
+    descriptions_expected = reader_no_cache.descriptions
+
+    # Reload the cache from the sidecar: creating the reader again must not open any file
+    monkeypatch.setattr(metadata_cache, "_METADATA_CACHE", metadata_cache.MetadataCache(path_sidecar))
+
+    def fail_open(*args, **kwargs):
+        raise AssertionError("Raster opened with metadata in the cache")
+
+    monkeypatch.setattr(rasterio, "open", fail_open)
+    reader = rasterio_reader.RasterioReader(paths, use_metadata_cache=True)
+    assert reader.tags() == tags_expected, "Different tags"
+    assert reader.descriptions == descriptions_expected, "Different descriptions"
+    assert metadata_cache.get_metadata_cache().misses == 0, "Unexpected misses in the cache"
+    monkeypatch.undo()
+
+    # Rewriting a raster replaces its entry instead of adding a new one
+    cache = metadata_cache.MetadataCache(path_sidecar)
+    n_entries = len(cache)
+    assert cache.get(paths[0]) is not None
+    os.utime(paths[0], ns=(0, 0))
+    assert cache.get(paths[0]) is None, "Stale entry served from the cache"
+    cache.put(paths[0], None, {})
+    cache.flush()
+    assert len(metadata_cache.MetadataCache(path_sidecar)) == n_entries, "Stale entries kept in the sidecar"
+
+
+def test_block_cache(tmp_path):
+    from georeader.block_cache import BlockCache
+    path = os.path.join(tmp_path, "tiled.tif")
+    create_raster(path, tiled=True, blockxsize=32, blockysize=32, compress="deflate")
+
+    cache = BlockCache(max_bytes=2**20)
+    reader_cache = rasterio_reader.RasterioReader(path, block_cache=cache)
+    reader = rasterio_reader.RasterioReader(path)
+    windows = [rasterio.windows.Window(col_off=-5, row_off=-7, width=50, height=40),
+               rasterio.windows.Window(col_off=10, row_off=20, width=50, height=40),
+               rasterio.windows.Window(col_off=170, row_off=290, width=50, height=40)]
+    for window in windows:
+        for indexes in [None, [3, 1], 2]:
+            data_expected = reader.read(window=window, indexes=indexes)
+            data = reader_cache.read(window=window, indexes=indexes)
+            assert data.shape == data_expected.shape, f"Different shapes {data.shape} {data_expected.shape}"
+            assert np.all(data == data_expected), f"Content of the array is different {window} {indexes}"
+
+    assert cache.hits > 0, f"Expected hits in the cache {cache.stats()}"
+    assert read.read_from_window(reader_cache, windows[1]).block_cache is cache, "block_cache not propagated"
+
+
+def test_read_out(tmp_path):
+    paths = [os.path.join(tmp_path, f"{i}.tif") for i in range(3)]
+    for p in paths:
+        create_raster(p)
+
+    window = rasterio.windows.Window(col_off=-5, row_off=-5, width=20, height=30)
+    for stack, indexes, n_paths in itertools.product([True, False], [None, [1, 3], 2], [1, 3]):
+        reader = rasterio_reader.RasterioReader(paths[:n_paths], stack=stack)
+        data_expected = reader.read(window=window, indexes=indexes)
+        batch = np.zeros((2,) + data_expected.shape, dtype=data_expected.dtype)
+        data = reader.read(window=window, indexes=indexes, out=batch[1])
+        assert np.shares_memory(data, batch), "Data not written in the out array"
+        assert np.all(batch[1] == data_expected), f"Content of the array is different {stack} {indexes} {n_paths}"
+
+    reader = rasterio_reader.RasterioReader(paths, stack=False)
+    assert reader.read(window=window).shape == (3 * 3, window.height, window.width), "Unexpected shape"
+    out = np.zeros((3 * 3, window.height, window.width), dtype=reader.dtype)
+    gt = read.read_from_window(reader, window, out=out)
+    assert gt.values is out, "read_from_window did not use the out array"
+    assert gt.transform == read.read_from_window(reader, window).transform, "Different transforms"
+
+
+def test_read_windows(tmp_path):
+    paths = [os.path.join(tmp_path, f"{i}.tif") for i in range(2)]
+    for p in paths:
+        create_raster(p)
+
+    reader = rasterio_reader.RasterioReader(paths, window_focus=rasterio.windows.Window(col_off=5, row_off=5,
+                                                                                       width=150, height=250))
+    windows = [rasterio.windows.Window(col_off=c, row_off=r, width=32, height=16)
+               for r, c in [(200, -10), (0, 0), (-20, 140), (100, 50), (1000, 1000)]]
+    data = reader.read_windows(windows)
+    assert data.shape == (len(windows), 2, 3, 16, 32), f"Unexpected shape {data.shape}"
+    geotensors = read.read_from_windows(reader, windows)
+    for window, data_window, gt in zip(windows, data, geotensors):
+        assert np.all(data_window == reader.read(window=window)), f"Content of the array is different {window}"
+        gt_expected = read.read_from_window(reader, window, trigger_load=True)
+        assert np.all(gt.values == gt_expected.values), f"Content of the array is different {window}"
+        assert gt.transform == gt_expected.transform, f"Different transform {window}"
+
+    data = reader.read_windows(windows, boundless=False)
+    assert isinstance(data, list) and (data[-1] is None), "Expected list with None for windows out of bounds"
+    for window, data_window in zip(windows[:-1], data[:-1]):
+        data_expected = reader.read(window=window, boundless=False)
+        assert np.all(data_window == data_expected), f"Content of the array is different {window}"
+
+
+def test_aread(tmp_path):
+    import asyncio
+    path = os.path.join(tmp_path, "raster.tif")
+    create_raster(path)
+    reader = rasterio_reader.RasterioReader(path)
+    window = rasterio.windows.Window(col_off=-5, row_off=10, width=64, height=64)
+    calls = []
+    read_original = reader.read
+
+    def read_count(**kwargs):
+        calls.append(kwargs)
+        return read_original(**kwargs)
+
+    reader.read = read_count
+
+    async def main():
+        results = await asyncio.gather(*[reader.aread(window=window) for _ in range(4)],
+                                        reader.aread(window=window, indexes=[2]))
+        windows = await reader.aread_windows([window, window])
+        return results, windows
+
+    results, windows = asyncio.run(main())
+    data_expected = read_original(window=window)
+    for data in results[:4]:
+        assert np.all(data == data_expected), "Content of the array is different"
+    assert np.all(results[4] == data_expected[1:2]), "Content of the array is different"
+    assert np.all(windows[1] == data_expected), "Content of the array is different"
+    assert len(calls) == 2, f"Expected identical requests to be coalesced. Calls: {len(calls)}"
+
+    # Readers of the same path with other GDAL options do not share the reads
+    from georeader import aio
+    reader_env = rasterio_reader.RasterioReader(path, rio_env_options={"GDAL_CACHEMAX": 16})
+    reader_memmap = rasterio_reader.RasterioReader(path, use_memmap=True)
+    keys = {aio.reader_key(r) for r in [rasterio_reader.RasterioReader(path), reader_env, reader_memmap]}
+    assert len(keys) == 3, "Readers with different options have the same key"
+
+
+def test_overview_selection(tmp_path):
+    path = os.path.join(tmp_path, "ovr.tif")
+    create_raster(path, height=320, width=240, tiled=True, blockxsize=64, blockysize=64)
+    with rasterio.open(path, "r+") as dst:
+        dst.build_overviews([2, 4, 8], rasterio.enums.Resampling.average)
+
+    reader = rasterio_reader.RasterioReader(path)
+    assert reader.overviews() == [2, 4, 8]
+    assert reader.overview_level_for_resolution(10) is None
+    assert reader.overview_level_for_resolution(20) == 0
+    assert reader.overview_level_for_resolution(50) == 1
+    assert reader.overview_level_for_resolution(200) == 2
+
+    reader_window = reader.read_from_window(rasterio.windows.Window(col_off=40, row_off=80, width=120, height=160))
+    reader_ovr = reader_window.read_from_overview_level(1)
+    assert reader_ovr.overview_level == 1
+    assert reader_ovr.res == (40, 40)
+    assert reader_ovr.bounds == reader_window.bounds
+    assert reader_ovr.overview_level_for_resolution(50) == 1
+    assert reader_ovr.overview_level_for_resolution(80) == 2
+
+    # Same grid as the full resolution read
+    for fun in [lambda r, **kw: read.resize(r, resolution_dst=40, **kw),
+                lambda r, **kw: read.read_reproject(r, dst_crs="EPSG:4326", resolution_dst_crs=0.0005,
+                                                    bounds=(-4.176, 40.625, -4.165, 40.635), **kw)]:
+        data_ovr = fun(reader_window)
+        data_full = fun(reader_window, use_overviews=False)
+        assert data_ovr.shape == data_full.shape
+        assert data_ovr.transform == data_full.transform
+        assert data_ovr.crs == data_full.crs
+
+    data_ovr = rasterio_reader.read_out_shape(reader_window, out_shape=(40, 30))
+    data_full = rasterio_reader.read_out_shape(reader_window, out_shape=(40, 30), use_overviews=False)
+    assert data_ovr.shape == data_full.shape
+    assert data_ovr.transform == data_full.transform
+    np.testing.assert_array_equal(data_ovr.values, reader_ovr.read())
+
+
+def test_prefetch_windows(tmp_path):
+    from georeader import prefetch, slices
+    path = os.path.join(tmp_path, "raster.tif")
+    create_raster(path)
+    reader = rasterio_reader.RasterioReader(path)
+    windows = slices.create_windows(reader.shape[-2:], window_size=(64, 64))
+
+    # Budget smaller than one window: reads one window at a time
+    for max_bytes in [prefetch.DEFAULT_MAX_BYTES, 10]:
+        data_prefetched = list(prefetch.prefetch_windows(reader, iter(windows), num_workers=3, max_bytes=max_bytes))
+        assert len(data_prefetched) == len(windows)
+        for window, data in zip(windows, data_prefetched):
+            data_expected = read.read_from_window(reader, window, trigger_load=True)
+            assert data.transform == data_expected.transform
+            assert np.all(data.values == data_expected.values), "Content of the array is different"
+
+    # Stop before consuming all the windows
+    iterator = prefetch.prefetch_windows(reader, windows, num_workers=2, return_only_data=True)
+    assert np.all(next(iterator) == reader.read(window=windows[0]))
+    iterator.close()
+
+
+def test_read_memmap(tmp_path):
+    layouts = {"striped_pixel": dict(interleave="pixel"), "striped_band": dict(interleave="band"),
+               "tiled": dict(tiled=True, blockxsize=32, blockysize=32, interleave="band"),
+               "compressed": dict(compress="deflate")}
+    windows = [rasterio.windows.Window(col_off=10, row_off=20, width=64, height=64),
+               rasterio.windows.Window(col_off=-5, row_off=250, width=64, height=64)]
+    for name, profile_add in layouts.items():
+        path = os.path.join(tmp_path, f"{name}.tif")
+        create_raster(path, **profile_add)
+        reader = rasterio_reader.RasterioReader(path)
+        reader_memmap = rasterio_reader.RasterioReader(path, use_memmap=True)
+        for window, indexes in itertools.product(windows, [None, [3, 1], 2]):
+            data_expected = reader.read(window=window, indexes=indexes)
+            data = reader_memmap.read(window=window, indexes=indexes)
+            assert data.shape == data_expected.shape, f"Different shape {name} {data.shape} {data_expected.shape}"
+            assert np.all(data == data_expected), f"Content of the array is different {name}"
+
+        # Striped files return read only views of the memory map
+        data = reader_memmap.read(window=windows[0])
+        assert data.flags.writeable != name.startswith("striped")
+
+        reader_stack = rasterio_reader.RasterioReader([path, path], use_memmap=True)
+        data = reader_stack.read_windows(windows)
+        data_expected = rasterio_reader.RasterioReader([path, path]).read_windows(windows)
+        assert np.all(data == data_expected), f"Content of the array is different {name}"
+
+    # Tiled file with tiles larger than the image
+    path = os.path.join(tmp_path, "tiled_large_tiles.tif")
+    data_expected = create_raster(path, height=100, tiled=True, blockxsize=256, blockysize=256, interleave="pixel")
+    assert tiff_memmap.get_tiff_memmap(path) is not None, "File not mapped in memory"
+    data = rasterio_reader.RasterioReader(path, use_memmap=True).read()
+    assert np.all(data == data_expected), "Content of the array is different with tiles larger than the image"
+
+
+def _load_shared_worker(reader):
+    from georeader import shared_memory
+    return shared_memory.load_shared(reader)
+
+
+def test_pickle_and_shared_memory(tmp_path, monkeypatch):
+    import pickle
+    import multiprocessing
+    from georeader import block_cache, geotensor
+
+    path = os.path.join(tmp_path, "raster.tif")
+    create_raster(path)
+    reader = rasterio_reader.RasterioReader(path, block_cache=block_cache.BlockCache(max_bytes=2**20))
+    reader = reader.read_from_window(rasterio.windows.Window(col_off=-5, row_off=10, width=64, height=32))
+    reader.read()
+
+    # Unpickling does not open the rasters
+    state = pickle.dumps(reader)
+    def open_fail(*args, **kwargs):
+        raise AssertionError("rasterio.open should not be called")
+    with monkeypatch.context() as m:
+        m.setattr(rasterio, "open", open_fail)
+        reader_unpickled = pickle.loads(state)
+    assert reader_unpickled.window_focus == reader.window_focus
+    assert len(reader_unpickled.block_cache) == 0
+    assert reader_unpickled.block_cache.max_bytes == 2**20
+    assert np.all(reader_unpickled.read() == reader.read()), "Content of the array is different"
+
+    # GeoTensor arrays travel as out-of-band buffers with protocol 5
+    data = reader.load()
+    data_view = geotensor.GeoTensor(data.values[::2], transform=data.transform, crs=data.crs)
+    buffers = []
+    state = pickle.dumps(data_view, protocol=5, buffer_callback=buffers.append)
+    assert len(buffers) == 1 and len(state) < 2000
+    data_unpickled = pickle.loads(state, buffers=buffers)
+    assert np.all(data_unpickled.values == data_view.values), "Content of the array is different"
+    assert data_unpickled.transform == data_view.transform
+    data_view.band_names = ["B1", "B2"]
+    assert pickle.loads(pickle.dumps(data_view)).band_names == data_view.band_names, "Attributes of the instance lost"
+
+    # Worker results through shared memory
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        handle = pool.apply(_load_shared_worker, (reader,))
+    data_shared = handle.geotensor()
+    assert np.all(data_shared.values == data.values), "Content of the array is different"
+    assert data_shared.transform == data.transform
+    del data_shared
+    handle.unlink()
+
+
+def test_read_scale_offset(tmp_path):
+    path = os.path.join(tmp_path, "raster.tif")
+    create_raster(path)
+    with rasterio.open(path, "r+") as dst:
+        dst.scales = (1e-4, 2e-4, 1.)
+        dst.offsets = (-0.1, 0., 1.)
+
+    # Nodata and padding are filled with fill_value_default
+    reader = rasterio_reader.RasterioReader([path, path], fill_value_default=-1)
+    window = rasterio.windows.Window(col_off=-5, row_off=10, width=64, height=32)
+    data_raw = rasterio_reader.RasterioReader([path, path]).read(window=window)
+    invalid = data_raw == 0
+
+    data = reader.read(window=window, scale=1e-4, offset=-0.1)
+    assert data.dtype == np.float32
+    data_expected = np.where(invalid, -1, data_raw.astype(np.float32) * np.float32(1e-4) + np.float32(-0.1))
+    np.testing.assert_allclose(data, data_expected, rtol=1e-6, atol=1e-6)
+
+    data = reader.read(window=window, indexes=[3, 1], use_file_scale_offset=True, dtype=np.float64)
+    assert data.dtype == np.float64
+    scale, offset = np.array([1., 1e-4])[:, None, None], np.array([1., -0.1])[:, None, None]
+    data_expected = np.where(invalid[:, [2, 0]], -1, data_raw[:, [2, 0]] * scale + offset)
+    np.testing.assert_allclose(data, data_expected)
+
+    out = np.zeros(data_raw.shape, dtype=np.float32)
+    data = reader.read(window=window, dtype=np.float32, out=out)
+    assert data is out
+    assert np.all(data == np.where(invalid, -1, data_raw.astype(np.float32))), "Content of the array is different"
+
+    # Without nodata, pixels equal to the fill value of GDAL are valid also in resampled reads
+    path_no_nodata = os.path.join(tmp_path, "raster_no_nodata.tif")
+    data_raw = create_raster(path_no_nodata, count=1, height=64, width=64, nodata=None)
+    data_raw[:, :32] = 0
+    data_raw[:, 32:] = 10
+    with rasterio.open(path_no_nodata, "r+") as dst:
+        dst.write(data_raw)
+    reader_no_nodata = rasterio_reader.RasterioReader(path_no_nodata, fill_value_default=-1)
+    assert set(np.unique(reader_no_nodata.read(offset=100.))) == {100, 110}
+    assert set(np.unique(reader_no_nodata.read(out_shape=(32, 32), offset=100.))) == {100, 110}
+    window = rasterio.windows.Window(col_off=-16, row_off=-8, width=64, height=64)
+    data = reader_no_nodata.read(window=window, out_shape=(32, 32), offset=100.)
+    assert set(np.unique(data)) == {-1, 100, 110}
+    data_expected = reader_no_nodata.read(window=window, offset=100.)[:, ::2, ::2]
+    np.testing.assert_array_equal(data, data_expected)
+
+    geotensor_scaled = reader.load(scale=np.array([1., 2., 3.]))
+    assert geotensor_scaled.fill_value_default == -1
+    data_raw = rasterio_reader.RasterioReader([path, path]).read()
+    assert np.all(geotensor_scaled.values[:, 1] == np.where(data_raw[:, 1] == 0, -1, data_raw[:, 1] * 2.))
+
+
+def test_read_reproject_multiband():
+    from georeader.geotensor import GeoTensor
+    values = np.random.default_rng(0).integers(1, 1000, size=(2, 3, 60, 80)).astype(np.float32)
+    data = GeoTensor(values, transform=rasterio.Affine(10, 0, 500000, 0, -10, 4500000), crs="EPSG:32630",
+                     fill_value_default=0)
+    bounds = window_utils.polygon_to_crs(data.footprint(), data.crs, "EPSG:4326").bounds
+
+    data_reproj = read.read_reproject(data, dst_crs="EPSG:4326", bounds=bounds, resolution_dst_crs=1e-4,
+                                      resampling=rasterio.warp.Resampling.bilinear, num_threads=2)
+    assert data_reproj.shape[:2] == (2, 3)
+
+    # Same result as reprojecting each 2D slice
+    for i, j in itertools.product(range(2), range(3)):
+        expected = np.zeros(data_reproj.shape[-2:], dtype=np.float32)
+        rasterio.warp.reproject(values[i, j], expected, src_transform=data.transform, src_crs=data.crs,
+                                dst_transform=data_reproj.transform, dst_crs="EPSG:4326", src_nodata=0,
+                                dst_nodata=0, resampling=rasterio.warp.Resampling.bilinear)
+        np.testing.assert_array_equal(data_reproj.values[i, j], expected)
+
+
+def test_read_reproject_multiband_nodata(tmp_path):
+    # Readers are padded with nodata: the bands must be warped as if they were reprojected one by one
+    values = np.random.default_rng(0).uniform(0, 1000, size=(2, 150, 170)).astype(np.float32)
+    values[1, 60:80, 40:90] = -1
+    for name, values_file in [("same_nodata", values[:1].repeat(2, axis=0)), ("different_nodata", values)]:
+        path = os.path.join(tmp_path, f"{name}.tif")
+        with rasterio.open(path, "w", driver="COG", height=150, width=170, count=2, dtype="float32", nodata=-1,
+                           crs="EPSG:32630", transform=rasterio.Affine(10, 0, 700000, 0, -10, 4500000)) as dst:
+            dst.write(values_file)
+        reader = rasterio_reader.RasterioReader(path)
+        bounds = rasterio.warp.transform_bounds(reader.crs, "EPSG:32631", *reader.bounds)
+
+        data_reproj = read.read_reproject(reader, dst_crs="EPSG:32631", bounds=bounds, resolution_dst_crs=10,
+                                          resampling=rasterio.warp.Resampling.cubic_spline)
+        for b in range(2):
+            expected = read.read_reproject(reader.isel({"band": [b]}), dst_crs="EPSG:32631", bounds=bounds,
+                                           resolution_dst_crs=10, resampling=rasterio.warp.Resampling.cubic_spline)
+            np.testing.assert_array_equal(data_reproj.values[b], expected.values[0], err_msg=f"{name} band {b}")
@@ -0,0 +1,105 @@
+from georeader import read
+from georeader.geotensor import GeoTensor
+from shapely.geometry import box, MultiPolygon
+import rasterio
+import rasterio.windows
+import numpy as np
+import os
+from conftest import create_raster
+
+
+def _assert_windows_close(windows_batch:np.ndarray, windows, atol:float=1e-6):
+    assert windows_batch.dtype == read.WINDOW_DTYPE
+    assert len(windows_batch) == len(windows)
+    for wb, w in zip(read.windows_to_list(windows_batch), windows):
+        np.testing.assert_allclose([wb.col_off, wb.row_off, wb.width, wb.height],
+                                   [w.col_off, w.row_off, w.width, w.height], atol=atol)
+
+
+def test_windows_batch():
+    data = GeoTensor(np.zeros((3, 300, 200), dtype=np.uint16),
+                     transform=rasterio.Affine(10, 0, 500000, 0, -10, 4500000), crs="EPSG:32630")
+    rng = np.random.default_rng(0)
+    xs = rng.uniform(499000, 503000, size=50)
+    ys = rng.uniform(4496000, 4501000, size=50)
+
+    # Center coords in the crs of the data and in EPSG:4326
+    coords = np.stack([xs, ys], axis=1)
+    windows = read.windows_from_center_coords(data, coords, shape=(32, 16))
+    _assert_windows_close(windows, [read.window_from_center_coords(data, c, (32, 16)) for c in coords])
+
+    lons, lats = rasterio.warp.transform(data.crs, "EPSG:4326", xs, ys)
+    coords_4326 = np.stack([lons, lats], axis=1)
+    windows = read.windows_from_center_coords(data, coords_4326, shape=(32, 16), crs_center_coords="EPSG:4326")
+    _assert_windows_close(windows, [read.window_from_center_coords(data, c, (32, 16), crs_center_coords="EPSG:4326")
+                                    for c in coords_4326])
+
+    # Bounds
+    bounds = np.stack([lons, lats, np.array(lons) + .01, np.array(lats) + .005], axis=1)
+    windows = read.windows_from_bounds(data, bounds, crs_bounds="EPSG:4326")
+    _assert_windows_close(windows, [read.window_from_bounds(data, b, crs_bounds="EPSG:4326") for b in bounds],
+                          atol=1e-3)
+    bounds_utm = np.stack([xs, ys, xs + 105, ys + 52], axis=1)
+    windows = read.windows_from_bounds(data, bounds_utm)
+    _assert_windows_close(windows, [read.window_from_bounds(data, b) for b in bounds_utm])
+
+    # Polygons
+    polygons = [box(*b) for b in bounds]
+    polygons[3] = MultiPolygon([box(*bounds[3]), box(*bounds[4])])
+    windows = read.windows_from_polygons(data, polygons, crs_polygons="EPSG:4326", window_surrounding=True)
+    _assert_windows_close(windows, [read.window_from_polygon(data, p, crs_polygon="EPSG:4326",
+                                                             window_surrounding=True) for p in polygons])
+
+
+def test_read_from_center_coords_batch(tmp_path):
+    from georeader import rasterio_reader
+    path = os.path.join(tmp_path, "raster.tif")
+    create_raster(path, count=2, tiled=True, blockxsize=64, blockysize=64)
+    reader = rasterio_reader.RasterioReader(path)
+    assert reader.block_shape == (64, 64)
+
+    # Points inside, near the edges and outside the raster
+    rng = np.random.default_rng(1)
+    coords = np.stack([rng.uniform(499700, 502300, size=200), rng.uniform(4496700, 4500300, size=200)], axis=1)
+    for data in [reader, reader.read_from_window(rasterio.windows.Window(col_off=30, row_off=50, width=150,
+                                                                           height=200)),
+                 reader.load()]:
+        chips = read.read_from_center_coords_batch(data, coords, shape=(16, 24), max_bytes=100_000)
+        assert chips.shape == (len(coords), 2, 16, 24)
+        expected = np.stack([read.read_from_center_coords(data, c, shape=(16, 24), return_only_data=True,
+                                                          trigger_load=True) for c in coords])
+        np.testing.assert_array_equal(chips, expected)
+
+
+def test_resize_anti_aliasing():
+    from scipy import ndimage as ndi
+    values = np.random.default_rng(0).integers(1, 1000, size=(2, 3, 60, 80)).astype(np.float32)
+    data = GeoTensor(values.copy(), transform=rasterio.Affine(10, 0, 500000, 0, -10, 4500000), crs="EPSG:32630")
+    sigmas = np.random.default_rng(1).uniform(.5, 2, size=(2, 3))
+    for sigma in [1.5, sigmas]:
+        for num_threads in [1, 4]:
+            data_resized = read.resize(data, resolution_dst=35, anti_aliasing_sigma=sigma, num_threads=num_threads,
+                                       resampling=rasterio.warp.Resampling.nearest)
+            # Input is not modified
+            np.testing.assert_array_equal(data.values, values)
+
+            filtered = np.stack([np.stack([ndi.gaussian_filter(values[i, j], sigma if np.ndim(sigma) == 0 else sigma[i, j],
+                                                               cval=0, mode="reflect") for j in range(3)])
+                                 for i in range(2)])
+            expected = read.resize(GeoTensor(filtered, transform=data.transform, crs=data.crs), resolution_dst=35,
+                                   anti_aliasing=False, resampling=rasterio.warp.Resampling.nearest)
+            np.testing.assert_array_equal(data_resized.values, expected.values)
+
+
+def test_resize_anti_aliasing_memmap(tmp_path):
+    from georeader.rasterio_reader import RasterioReader
+    path = os.path.join(tmp_path, "striped.tif")
+    values = create_raster(path, count=2, height=60, width=80)
+
+    # load returns a read only view of the memory map: it is filtered into a new array
+    reader = RasterioReader(path, use_memmap=True)
+    assert not reader.load().values.flags.writeable
+    data_resized = read.resize(reader, 20)
+    expected = read.resize(RasterioReader(path), 20)
+    np.testing.assert_array_equal(data_resized.values, expected.values)
+    np.testing.assert_array_equal(reader.read(), values)
@@ -0,0 +1,144 @@
+from georeader import read, reproject_tiled, rasterio_reader
+from georeader.geotensor import GeoTensor
+import rasterio
+import rasterio.warp
+import numpy as np
+import os
+from conftest import create_raster
+
+
+def _reader(path:str) -> rasterio_reader.RasterioReader:
+    create_raster(path, tiled=True, blockxsize=64, blockysize=64)
+    return rasterio_reader.RasterioReader(path)
+
+
+def test_read_reproject_tiled(tmp_path):
+    reader = _reader(os.path.join(tmp_path, "raster.tif"))
+    # Output larger than the data: some tiles do not intersect it
+    bounds = (499800, 4496800, 502300, 4500200)
+    kwargs = dict(bounds=bounds, resolution_dst_crs=15, resampling=rasterio.warp.Resampling.bilinear)
+    expected = read.read_reproject(reader, **kwargs)
+
+    data_tiled = reproject_tiled.read_reproject_tiled(reader, tile_size=(64, 48), **kwargs)
+    assert isinstance(data_tiled, GeoTensor)
+    assert data_tiled.transform == expected.transform
+    assert data_tiled.fill_value_default == expected.fill_value_default
+    np.testing.assert_array_equal(data_tiled.values, expected.values)
+
+    # np.memmap sink
+    mm = np.lib.format.open_memmap(os.path.join(tmp_path, "out.npy"), mode="w+", dtype=expected.dtype,
+                                   shape=expected.shape)
+    data_tiled = reproject_tiled.read_reproject_tiled(reader, tile_size=(64, 48), sink=mm, **kwargs)
+    assert data_tiled.values is mm
+    np.testing.assert_array_equal(np.load(os.path.join(tmp_path, "out.npy")), expected.values)
+
+    # GeoTIFF sink
+    path_out = os.path.join(tmp_path, "out.tif")
+    data_tiled = reproject_tiled.read_reproject_tiled(reader, tile_size=(64, 48), sink=path_out, **kwargs)
+    assert isinstance(data_tiled, rasterio_reader.RasterioReader)
+    assert data_tiled.transform == expected.transform
+    assert data_tiled.crs == expected.crs
+    np.testing.assert_array_equal(data_tiled.load().values, expected.values)
+
+
+def test_read_reproject_tiled_kernel(tmp_path):
+    reader = _reader(os.path.join(tmp_path, "raster.tif"))
+    # Downsampling widens the kernel: the tiles must read the source pixels under the kernel of their border pixels
+    for resolution_dst_crs in [12, 25]:
+        for resampling in [rasterio.warp.Resampling.cubic_spline, rasterio.warp.Resampling.lanczos]:
+            kwargs = dict(bounds=(500000, 4497000, 502000, 4500000), resolution_dst_crs=resolution_dst_crs,
+                          resampling=resampling)
+            expected = read.read_reproject(reader, **kwargs)
+            data_tiled = reproject_tiled.read_reproject_tiled(reader, tile_size=(64, 48), **kwargs)
+            np.testing.assert_array_equal(data_tiled.values, expected.values,
+                                          err_msg=f"{resampling.name} {resolution_dst_crs}")
+
+
+def test_read_reproject_tiled_crs(tmp_path):
+    reader = _reader(os.path.join(tmp_path, "raster.tif"))
+    kwargs = dict(dst_crs="EPSG:4326", bounds=(-3.0005, 40.618, -2.9972, 40.646), resolution_dst_crs=1e-4,
+                  resampling=rasterio.warp.Resampling.nearest)
+    expected = read.read_reproject(reader, **kwargs)
+    data_tiled = reproject_tiled.read_reproject_tiled(reader, tile_size=(64, 64), **kwargs)
+    assert data_tiled.shape == expected.shape
+    assert data_tiled.transform == expected.transform
+    # GDAL uses an approximate coordinate transformation that depends on the extent of the tile
+    assert np.mean(data_tiled.values != expected.values) < .01
+
+
+def test_read_reproject_tiled_parallel(tmp_path):
+    reader = _reader(os.path.join(tmp_path, "raster.tif"))
+    kwargs = dict(dst_crs="EPSG:4326", bounds=(-3.0005, 40.618, -2.9972, 40.646), resolution_dst_crs=1e-4,
+                  resampling=rasterio.warp.Resampling.cubic_spline, tile_size=(32, 16))
+    expected = reproject_tiled.read_reproject_tiled(reader, **kwargs)
+    # GDAL uses an approximate coordinate transformation that depends on the extent of the tile
+    expected_monolithic = read.read_reproject(reader, **{k: v for k, v in kwargs.items() if k != "tile_size"})
+    assert np.mean(expected.values != expected_monolithic.values) < .01
+
+    for num_workers, executor, ordered in [(4, "thread", True), (4, "thread", False), (2, "process", False)]:
+        data_tiled = reproject_tiled.read_reproject_tiled(reader, num_workers=num_workers, executor=executor,
+                                                          ordered=ordered, **kwargs)
+        np.testing.assert_array_equal(data_tiled.values, expected.values)
+
+    # Same crs: the tiles computed in parallel are equal to a single read_reproject
+    kwargs = dict(bounds=(500000, 4497000, 502000, 4500000), resolution_dst_crs=25,
+                  resampling=rasterio.warp.Resampling.cubic_spline)
+    expected = read.read_reproject(reader, **kwargs)
+    for num_workers, executor, ordered in [(4, "thread", False), (2, "process", False)]:
+        data_tiled = reproject_tiled.read_reproject_tiled(reader, num_workers=num_workers, executor=executor,
+                                                          ordered=ordered, tile_size=(32, 16), **kwargs)
+        np.testing.assert_array_equal(data_tiled.values, expected.values)
+
+
+def test_read_reproject_destination(tmp_path):
+    reader = _reader(os.path.join(tmp_path, "raster.tif"))
+    bounds = (499800, 4496800, 502300, 4500200)
+    kwargs = dict(bounds=bounds, resolution_dst_crs=15, resampling=rasterio.warp.Resampling.bilinear)
+    expected = read.read_reproject(reader, **kwargs)
+
+    # GeoTIFF destination
+    path_out = os.path.join(tmp_path, "out.tif")
+    data_out = read.read_reproject(reader, destination=path_out, tile_size=(64, 48), **kwargs)
+    assert isinstance(data_out, rasterio_reader.RasterioReader)
+    np.testing.assert_array_equal(data_out.load().values, expected.values)
+
+    # np.memmap destination
+    mm = np.lib.format.open_memmap(os.path.join(tmp_path, "out.npy"), mode="w+", dtype=expected.dtype,
+                                   shape=expected.shape)
+    values_out = read.read_reproject(reader, destination=mm, tile_size=(64, 48), return_only_data=True, **kwargs)
+    assert values_out is mm
+    np.testing.assert_array_equal(np.load(os.path.join(tmp_path, "out.npy")), expected.values)
+
+    # Region of an existing GeoTensor (aligned with the output grid)
+    canvas = GeoTensor(np.full((3, 300, 250), 7, dtype=np.uint16), crs=expected.crs,
+                       transform=expected.transform * rasterio.Affine.translation(-20, -30),
+                       fill_value_default=0)
+    data_out = read.read_reproject(reader, destination=canvas, tile_size=(64, 48), **kwargs)
+    assert data_out.transform == expected.transform
+    assert np.shares_memory(data_out.values, canvas.values)
+    np.testing.assert_array_equal(canvas.values[:, 30:30 + expected.shape[-2], 20:20 + expected.shape[-1]],
+                                  expected.values)
+    assert np.all(canvas.values[:, :30] == 7)
+
+    # Grid of the GeoTensor
+    canvas = GeoTensor(np.zeros(expected.shape, dtype=expected.dtype), crs=expected.crs,
+                       transform=expected.transform, fill_value_default=0)
+    data_out = read.read_reproject_like(reader, canvas, resampling=rasterio.warp.Resampling.bilinear,
+                                        destination=canvas, tile_size=(64, 48))
+    np.testing.assert_array_equal(canvas.values, expected.values)
+
+
+def test_read_reproject_destination_cubic_spline(tmp_path):
+    reader = _reader(os.path.join(tmp_path, "raster.tif"))
+    kwargs = dict(bounds=(500000, 4497000, 502000, 4500000), resolution_dst_crs=25,
+                  resampling=rasterio.warp.Resampling.cubic_spline)
+    expected = read.read_reproject(reader, **kwargs)
+
+    path_out = os.path.join(tmp_path, "out.tif")
+    data_out = read.read_reproject(reader, destination=path_out, tile_size=(64, 48), **kwargs)
+    np.testing.assert_array_equal(data_out.load().values, expected.values)
+
+    mm = np.lib.format.open_memmap(os.path.join(tmp_path, "out.npy"), mode="w+", dtype=expected.dtype,
+                                   shape=expected.shape)
+    read.read_reproject(reader, destination=mm, tile_size=(64, 48), return_only_data=True, **kwargs)
+    np.testing.assert_array_equal(mm, expected.values)
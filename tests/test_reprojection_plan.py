@@ -0,0 +1,63 @@
+from georeader import read, reprojection_plan
+from georeader.geotensor import GeoTensor
+import rasterio
+import rasterio.warp
+import numpy as np
+
+
+def _geotensor() -> GeoTensor:
+    values = np.random.default_rng(0).integers(1, 1000, size=(2, 3, 60, 80)).astype(np.float32)
+    values[0, 1, 20:30, 10:40] = 0
+    return GeoTensor(values, transform=rasterio.Affine(10, 0, 500000, 0, -10, 4500000), crs="EPSG:32630",
+                     fill_value_default=0)
+
+
+def _warp(data:GeoTensor, dst_transform:rasterio.Affine, dst_crs:str, dst_shape, resampling) -> np.ndarray:
+    expected = np.zeros(data.shape[:-2] + dst_shape, dtype=data.dtype)
+    rasterio.warp.reproject(data.values.reshape((-1,) + data.shape[-2:]), expected.reshape((-1,) + dst_shape),
+                            src_transform=data.transform, src_crs=data.crs, dst_transform=dst_transform,
+                            dst_crs=dst_crs, src_nodata=0, dst_nodata=0, resampling=resampling,
+                            UNIFIED_SRC_NODATA="NO")
+    return expected
+
+
+def test_reprojection_plan_same_crs():
+    data = _geotensor()
+    # Upsampling x2 shifted 1/4 of pixel and partially outside of the source grid
+    dst_transform = rasterio.Affine(5, 0, 500000 - 102.5, 0, -5, 4500000 + 52.5)
+    dst_shape = (130, 170)
+    plan = reprojection_plan.ReprojectionPlan(data.transform, data.crs, data.shape[-2:],
+                                              dst_transform, data.crs, dst_shape)
+
+    out = plan.apply(data.values, resampling=rasterio.warp.Resampling.nearest, src_nodata=0)
+    np.testing.assert_array_equal(out, _warp(data, dst_transform, data.crs, dst_shape,
+                                             rasterio.warp.Resampling.nearest))
+
+    out = plan.apply(data.values, resampling=rasterio.warp.Resampling.bilinear, src_nodata=0)
+    expected = _warp(data, dst_transform, data.crs, dst_shape, rasterio.warp.Resampling.bilinear)
+    np.testing.assert_array_equal(out == 0, expected == 0)
+    np.testing.assert_allclose(out, expected, rtol=1e-4)
+
+    # Integer arrays and destination argument
+    out_int = np.empty(data.shape[:-2] + dst_shape, dtype=np.uint16)
+    plan.apply(data.values.astype(np.uint16), out_int, resampling=rasterio.warp.Resampling.bilinear,
+               src_nodata=0)
+    np.testing.assert_array_equal(out_int, np.rint(out).astype(np.uint16))
+
+
+def test_read_reproject_cache_plan():
+    reprojection_plan.clear_cache()
+    data = _geotensor()
+    bounds = (-2.999, 40.646, -2.991, 40.65)
+    kwargs = dict(dst_crs="EPSG:4326", bounds=bounds, resolution_dst_crs=5e-5,
+                  resampling=rasterio.warp.Resampling.nearest)
+    data_gdal = read.read_reproject(data, **kwargs)
+    data_plan = read.read_reproject(data, cache_plan=True, **kwargs)
+    assert data_plan.transform == data_gdal.transform
+    assert data_plan.shape == data_gdal.shape
+    # GDAL uses an approximate coordinate transformation: a few pixels on the borders of the source pixels may differ
+    assert np.mean(data_plan.values != data_gdal.values) < .01
+
+    assert len(reprojection_plan._PLANS) == 1
+    read.read_reproject(data, cache_plan=True, **kwargs)
+    assert len(reprojection_plan._PLANS) == 1
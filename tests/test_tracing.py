@@ -0,0 +1,48 @@
+import georeader
+from georeader import rasterio_reader, tracing
+import rasterio
+import numpy as np
+import logging
+import os
+
+
+def test_trace(tmp_path):
+    path = os.path.join(tmp_path, "raster.tif")
+    with rasterio.open(path, "w", driver="GTiff", count=2, height=50, width=40, dtype="uint16", crs="EPSG:32630",
+                       transform=rasterio.Affine(10, 0, 400_000, 0, -10, 4_500_000)) as dst:
+        dst.write(np.ones((2, 50, 40), dtype=np.uint16))
+
+    reader = rasterio_reader.RasterioReader([path, path, path], num_workers=2)
+    with georeader.trace() as t:
+        data = reader.read()
+        reader.read(window=rasterio.windows.Window(0, 0, 10, 10))
+
+    summary = t.summary()["RasterioReader.read"]
+    assert summary["calls"] == 2
+    assert summary["files_opened"] == 6
+    assert summary["output_bytes"] == data.nbytes + 3 * 2 * 10 * 10 * 2
+    assert summary["wall_time"] > 0
+    assert summary["read_time"] > 0
+
+    # Nothing is recorded outside the context
+    reader.read()
+    assert t.summary()["RasterioReader.read"]["calls"] == 2
+
+
+def test_trace_http_requests():
+    logger = logging.getLogger("rasterio._env")
+    level_before = logger.level
+
+    @tracing.traced("fetch")
+    def fetch():
+        # message of GDAL when a range of a remote file is downloaded
+        logger.debug("CPLE_None in VSICURL: Downloading 0-16383 (https://example.com/a.tif)...")
+        logger.debug("CPLE_None in VSICURL: Downloading 16384-16483 (https://example.com/a.tif)...")
+
+    with georeader.trace() as t:
+        fetch()
+
+    assert t.summary()["fetch"]["http_requests"] == 2
+    assert t.summary()["fetch"]["http_bytes"] == 16384 + 100
+    assert logger.level == level_before
+    assert len(logger.filters) == 0